@@ -0,0 +1,477 @@
+"""Замеры времени ответа эндпоинтов API (команда run_benchmark).
+
+Каждый эндпоинт из api/urls.py и users/urls.py вызывается тестовым
+клиентом Django через все middleware, на данных текущей базы (SQLite или
+PostgreSQL), например созданных командой seed_benchmark_data. Изменяющие
+запросы идут парами (добавить - удалить), поэтому после прогона данные
+остаются прежними.
+"""
+import base64
+import io
+import logging
+import math
+import multiprocessing
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from organizer.models import Favorite, ShoppingCart, Subscription
+from PIL import Image
+from recipes.models import Measurement, Recipe, Tag
+from tasks.models import Task
+from users.models import User
+
+# client: anonymous, user, login (отдельный пользователь для входа и
+# выхода) или admin; path и data - значения или функции от контекста;
+# save(response, context) сохраняет данные ответа для следующих шагов
+Step = namedtuple(
+    'Step', 'name client method url_name path data save',
+    defaults=(None, None)
+)
+BULK_SIZE = 20
+LOGIN_PATH = '/api/auth/token/login/'
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    values = sorted(values)
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank - 1, 0)]
+
+
+def get_png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), (40, 120, 200)).save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+def get_recipe_data(context):
+    context['created'] += 1
+    return {
+        'tags': context['tag_ids'],
+        'ingredients': [
+            {'id': measurement_id, 'amount': 10}
+            for measurement_id in context['measurement_ids']
+        ],
+        'name': f'Замер {time.time_ns()} {context["created"]}',
+        'image': context['image'],
+        'text': 'Рецепт для замера производительности.',
+        'cooking_time': 10,
+    }
+
+
+def save_recipe_id(response, context):
+    context['new_recipe_id'] = response.json()['id']
+
+
+def save_login_token(response, context):
+    context['login_token'] = response.json()['auth_token']
+
+
+def get_task_path(context):
+    task_id = Task.objects.filter(user=context['user']).values_list(
+        'id', flat=True
+    ).first()
+    return f'/api/tasks/{task_id}/' if task_id else None
+
+
+STEPS = (
+    Step('api: root', 'anonymous', 'get', 'api-root', '/api/'),
+    Step('recipes: list (anonymous)', 'anonymous', 'get', 'recipes-list',
+         '/api/recipes/'),
+    Step('recipes: list by tag', 'anonymous', 'get', 'recipes-list',
+         lambda context: f'/api/recipes/?tags={context["tag_slug"]}'),
+    Step('recipes: search', 'anonymous', 'get', 'recipes-list',
+         lambda context: f'/api/recipes/?search={context["search"]}'),
+    Step('recipes: detail', 'anonymous', 'get', 'recipes-detail',
+         lambda context: f'/api/recipes/{context["recipe_id"]}/'),
+    Step('tags: list', 'anonymous', 'get', 'tags-list', '/api/tags/'),
+    Step('tags: detail', 'anonymous', 'get', 'tags-detail',
+         lambda context: f'/api/tags/{context["tag_ids"][0]}/'),
+    Step('ingredients: search', 'anonymous', 'get', 'ingredients-list',
+         lambda context: f'/api/ingredients/?name={context["ingredient"]}'),
+    Step('ingredients: detail', 'anonymous', 'get', 'ingredients-detail',
+         lambda context: (
+             f'/api/ingredients/{context["measurement_ids"][0]}/'
+         )),
+    Step('users: list', 'anonymous', 'get', 'users-list', '/api/users/'),
+
+    Step('recipes: list', 'user', 'get', 'recipes-list', '/api/recipes/'),
+    Step('recipes: list (cursor)', 'user', 'get', 'recipes-list',
+         '/api/recipes/?cursor='),
+    Step('recipes: favorited', 'user', 'get', 'recipes-list',
+         '/api/recipes/?is_favorited=1'),
+    Step('recipes: in shopping cart', 'user', 'get', 'recipes-list',
+         '/api/recipes/?is_in_shopping_cart=1'),
+    # пользователю страницы списка не отдаются из кеша анонимных страниц,
+    # поэтому замеряется сама фильтрация по тэгам
+    Step('recipes: list by tags', 'user', 'get', 'recipes-list',
+         lambda context: '/api/recipes/?' + '&'.join(
+             f'tags={slug}' for slug in context['tag_slugs']
+         )),
+    Step('users: me', 'user', 'get', 'users-get-me', '/api/users/me/'),
+    Step('users: detail', 'user', 'get', 'users-detail',
+         lambda context: f'/api/users/{context["author_id"]}/'),
+    Step('subscriptions: list', 'user', 'get', 'subscriptions',
+         '/api/users/subscriptions/?recipes_limit=3'),
+    Step('shopping cart: download', 'user', 'get', 'download_shopping_cart',
+         '/api/recipes/download_shopping_cart/?format=txt'),
+    Step('favorite: add', 'user', 'get', 'favorite-favorites',
+         lambda context: f'/api/recipes/{context["recipe_id"]}/favorite/'),
+    Step('favorite: remove', 'user', 'delete', 'favorite-favorites',
+         lambda context: f'/api/recipes/{context["recipe_id"]}/favorite/'),
+    Step('shopping cart: add', 'user', 'get', 'shopping_cart-shopping-cart',
+         lambda context: (
+             f'/api/recipes/{context["recipe_id"]}/shopping_cart/'
+         )),
+    Step('shopping cart: remove', 'user', 'delete',
+         'shopping_cart-shopping-cart',
+         lambda context: (
+             f'/api/recipes/{context["recipe_id"]}/shopping_cart/'
+         )),
+    Step('favorite: bulk add', 'user', 'post', 'favorite-bulk-favorites',
+         '/api/recipes/favorite/bulk/',
+         lambda context: {'recipes': context['bulk_recipe_ids']}),
+    Step('favorite: bulk remove', 'user', 'delete', 'favorite-bulk-favorites',
+         '/api/recipes/favorite/bulk/',
+         lambda context: {'recipes': context['bulk_recipe_ids']}),
+    Step('shopping cart: bulk add', 'user', 'post',
+         'shopping_cart-bulk-shopping-cart',
+         '/api/recipes/shopping_cart/bulk/',
+         lambda context: {'recipes': context['bulk_recipe_ids']}),
+    Step('shopping cart: bulk remove', 'user', 'delete',
+         'shopping_cart-bulk-shopping-cart',
+         '/api/recipes/shopping_cart/bulk/',
+         lambda context: {'recipes': context['bulk_recipe_ids']}),
+    Step('subscriptions: subscribe', 'user', 'get', 'subscriptions-subscribe',
+         lambda context: f'/api/users/{context["author_id"]}/subscribe/'),
+    Step('subscriptions: unsubscribe', 'user', 'delete',
+         'subscriptions-subscribe',
+         lambda context: f'/api/users/{context["author_id"]}/subscribe/'),
+    Step('recipes: create', 'user', 'post', 'recipes-list', '/api/recipes/',
+         get_recipe_data, save_recipe_id),
+    Step('recipes: update', 'user', 'put', 'recipes-detail',
+         lambda context: f'/api/recipes/{context["new_recipe_id"]}/',
+         get_recipe_data),
+    Step('recipes: delete', 'user', 'delete', 'recipes-detail',
+         lambda context: f'/api/recipes/{context["new_recipe_id"]}/'),
+    Step('tasks: list', 'user', 'get', 'tasks-list', '/api/tasks/'),
+    Step('tasks: detail', 'user', 'get', 'tasks-detail', get_task_path),
+    Step('users: set password', 'user', 'post', 'set_password',
+         '/api/users/set_password/',
+         lambda context: {
+             'current_password': context['password'],
+             'new_password': context['password'],
+         }),
+
+    Step('auth: login', 'anonymous', 'post', 'login', '/api/auth/token/login/',
+         lambda context: {
+             'email': context['login_user'].email,
+             'password': context['password'],
+         },
+         save_login_token),
+    Step('auth: logout', 'login', 'post', 'logout', '/api/auth/token/logout/'),
+
+    Step('recipes: cache stats', 'admin', 'get', 'recipes-cache-stats',
+         '/api/recipes/cache_stats/'),
+    Step('tasks: stats', 'admin', 'get', 'tasks-stats', '/api/tasks/stats/'),
+    Step('auth: token cache stats', 'admin', 'get', 'token_cache_stats',
+         '/api/auth/token/cache_stats/'),
+)
+
+
+def iter_url_patterns(patterns, prefix=''):
+    for pattern in patterns:
+        regex = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_url_patterns(pattern.url_patterns, regex)
+        else:
+            yield regex, pattern
+
+
+def get_api_url_names():
+    """Имена маршрутов api/ (api/urls.py и users/urls.py), которые
+    достижимы: маршруты с тем же шаблоном, что у предыдущего, и варианты
+    с суффиксом формата не учитываются.
+    """
+    names = set()
+    seen = set()
+    for regex, pattern in iter_url_patterns(get_resolver().url_patterns):
+        if regex in seen or '(?P<format>' in regex:
+            continue
+        seen.add(regex)
+        if pattern.name and regex.startswith('api/'):
+            names.add(pattern.name)
+    return names
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def get_context(user, login_user, password):
+    """Объекты, на которых выполняются шаги: рецепт и автор, которых нет
+    в избранном, корзине и подписках пользователя, и т.п.
+    """
+    favorites = Favorite.objects.filter(user=user).values('recipe')
+    cart = ShoppingCart.objects.filter(user=user).values('recipe')
+    free_recipe_ids = list(Recipe.objects.exclude(pk__in=favorites).exclude(
+        pk__in=cart
+    ).order_by('-pk').values_list('pk', flat=True)[:BULK_SIZE + 1])
+    author = User.objects.exclude(pk=user.pk).exclude(
+        pk__in=Subscription.objects.filter(user=user).values('author')
+    ).order_by('pk').first()
+    tags = list(Tag.objects.order_by('pk')[:2])
+    measurements = list(Measurement.objects.order_by('pk')[:3])
+    if not (len(free_recipe_ids) > BULK_SIZE and author and tags
+            and measurements):
+        raise ValueError(
+            'Недостаточно данных для замеров: запустите seed_benchmark_data.'
+        )
+    return {
+        'user': user,
+        'login_user': login_user,
+        'password': password,
+        'recipe_id': free_recipe_ids[0],
+        'bulk_recipe_ids': free_recipe_ids[1:],
+        'author_id': author.pk,
+        'tag_slug': tags[0].slug,
+        'tag_slugs': [tag.slug for tag in tags],
+        'tag_ids': [tag.pk for tag in tags],
+        'measurement_ids': [measurement.pk for measurement in measurements],
+        'ingredient': measurements[0].name[:3],
+        'search': Recipe.objects.get(pk=free_recipe_ids[0]).name.split()[0],
+        'image': get_png(),
+        'created': 0,
+    }
+
+
+class Benchmark:
+    """Выполняет STEPS iterations раз (после warmup прогонов без учёта)
+    и собирает время ответа, число запросов к базе и объём памяти,
+    выделенной при обработке запроса (отдельным прогоном с tracemalloc,
+    чтобы трассировка не влияла на время).
+    """
+
+    def __init__(self, user, login_user, admin, password):
+        self.context = get_context(user, login_user, password)
+        self.clients = {
+            'anonymous': get_client(),
+            'user': get_client(user),
+            'admin': get_client(admin) if admin else None,
+        }
+        # шаги администратора выполняются, только если он есть:
+        self.steps = [
+            step for step in STEPS
+            if step.client != 'admin' or admin is not None
+        ]
+        self.results = {
+            step.name: {
+                'url_name': step.url_name, 'times': [], 'queries': [],
+                'statuses': set(), 'allocated': None,
+            }
+            for step in self.steps
+        }
+
+    def get_uncovered_url_names(self):
+        return sorted(
+            get_api_url_names() - {step.url_name for step in STEPS}
+        )
+
+    def request(self, step):
+        context = self.context
+        path = step.path(context) if callable(step.path) else step.path
+        if path is None:
+            return None
+        data = step.data(context) if callable(step.data) else step.data
+        client = self.clients.get(step.client)
+        if step.client == 'login':
+            client = APIClient()
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {context["login_token"]}'
+            )
+        started_at = time.perf_counter()
+        response = getattr(client, step.method)(path, data, format='json')
+        # тело потокового ответа формируется при чтении:
+        if response.streaming:
+            b''.join(response.streaming_content)
+        duration = time.perf_counter() - started_at
+        if step.save is not None and response.status_code < 400:
+            step.save(response, context)
+        return response, duration
+
+    def trace_request(self, step):
+        """Наибольший объём памяти, выделенной при выполнении шага.
+
+        Трассировка запускается для каждого шага заново: учитываются только
+        выделения после start(), а stop() сбрасывает пиковое значение
+        (tracemalloc.reset_peak() есть только с Python 3.9).
+        """
+        tracemalloc.start()
+        try:
+            measured = self.request(step)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        if measured is None:
+            return None
+        return peak
+
+    def run_iteration(self, record=True, trace=False):
+        for step in self.steps:
+            result = self.results[step.name]
+            if trace:
+                allocated = self.trace_request(step)
+                if allocated is not None:
+                    result['allocated'] = allocated
+                continue
+            with CaptureQueriesContext(connection) as queries:
+                measured = self.request(step)
+            if measured is None:
+                continue
+            response, duration = measured
+            if record:
+                result['times'].append(duration)
+                result['queries'].append(len(queries.captured_queries))
+                result['statuses'].add(response.status_code)
+
+    def run(self, iterations, warmup):
+        request_logger = logging.getLogger('foodgram.requests')
+        level = request_logger.level
+        # строки журнала RequestMetricsMiddleware о каждом запросе
+        # не нужны: число запросов собирается здесь
+        request_logger.setLevel(logging.ERROR)
+        last_task_id = Task.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        try:
+            for _ in range(warmup):
+                self.run_iteration(record=False)
+            for _ in range(iterations):
+                self.run_iteration()
+            self.run_iteration(trace=True)
+        finally:
+            request_logger.setLevel(level)
+            # задачи создания копий изображений для созданных рецептов
+            Task.objects.filter(pk__gt=last_task_id).delete()
+        return self.get_report()
+
+    def get_report(self):
+        report = {}
+        for name, result in self.results.items():
+            times = result['times']
+            if not times:
+                continue
+            report[name] = {
+                'url_name': result['url_name'],
+                'p50_ms': round(percentile(times, 50) * 1000, 2),
+                'p95_ms': round(percentile(times, 95) * 1000, 2),
+                'queries': max(result['queries']),
+                'allocated_kb': (
+                    round(result['allocated'] / 1024, 1)
+                    if result['allocated'] is not None else None
+                ),
+                'statuses': sorted(result['statuses']),
+            }
+        return report
+
+
+def compare(report, baseline, tolerance):
+    """Сравнивает результаты с сохранёнными: регрессия - больше запросов
+    к базе или p95 больше, чем в baseline, более чем на tolerance (доля).
+    Возвращает список описаний регрессий.
+    """
+    regressions = []
+    for name, result in report.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов к базе {result["queries"]} '
+                f'(было {previous["queries"]})'
+            )
+        if result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {result["p95_ms"]} мс '
+                f'(было {previous["p95_ms"]} мс)'
+            )
+    return regressions
+
+
+def measure_logins(email, password, count):
+    """Выполняет count входов подряд в одном процессе; возвращает время
+    каждого входа и статусы ответов.
+    """
+    request_logger = logging.getLogger('foodgram.requests')
+    request_logger.setLevel(logging.ERROR)
+    client = APIClient()
+    times = []
+    statuses = []
+    try:
+        for _ in range(count):
+            started_at = time.perf_counter()
+            response = client.post(
+                LOGIN_PATH, {'email': email, 'password': password},
+                format='json'
+            )
+            times.append(time.perf_counter() - started_at)
+            statuses.append(response.status_code)
+    finally:
+        connection.close()
+    return times, statuses
+
+
+def benchmark_logins(email, password, processes, count):
+    """Замеряет вход (POST /api/auth/token/login/): processes процессов,
+    как процессы gunicorn, одновременно выполняют по count входов.
+
+    Возвращает число успешных входов в секунду на процесс и всего, время
+    ответа и статусы; ответы 429 показывают, что одновременных проверок
+    паролей больше PASSWORD_CHECK_CONCURRENCY.
+    """
+    # процессы не должны использовать соединение с базой родителя:
+    connections.close_all()
+    started_at = time.perf_counter()
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        results = pool.starmap(
+            measure_logins, [(email, password, count)] * processes
+        )
+    duration = time.perf_counter() - started_at
+    statuses = Counter(
+        status for _, process_statuses in results
+        for status in process_statuses
+    )
+    per_process = []
+    login_times = []
+    for times, process_statuses in results:
+        succeeded = [
+            login_time
+            for login_time, status in zip(times, process_statuses)
+            if status == 200
+        ]
+        login_times += succeeded
+        per_process.append(len(succeeded) / sum(times))
+    return {
+        'processes': processes,
+        'logins_per_second': round(statuses[200] / duration, 1),
+        'logins_per_second_per_process': round(
+            sum(per_process) / processes, 1
+        ),
+        'p50_ms': round(percentile(login_times, 50) * 1000, 1)
+        if login_times else None,
+        'p95_ms': round(percentile(login_times, 95) * 1000, 1)
+        if login_times else None,
+        'statuses': dict(sorted(statuses.items())),
+    }
@@ -0,0 +1,149 @@
+import time
+from datetime import datetime, timezone
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = 'recipes_list'
+GENERATION_KEY = f'{CACHE_PREFIX}:generation'
+HITS_KEY = f'{CACHE_PREFIX}:hits'
+MISSES_KEY = f'{CACHE_PREFIX}:misses'
+FAVORITES_GENERATION_KEY = f'{CACHE_PREFIX}:favorites:generation'
+COUNT_PREFIX = 'list_count'
+USER_GENERATION_KEY = 'organizer:{user_id}:generation'
+
+
+def increment(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # ключа ещё нет или он вытеснен из кеша
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_timestamp():
+    return int(time.time() * 1000)
+
+
+def get_generation(key=GENERATION_KEY):
+    # начальное значение - текущее время: если счётчик вытеснен из кеша
+    # или устарел, новое поколение не совпадёт со старыми записями; срок
+    # хранения ограничивает время, за которое изменения из других процессов
+    # становятся видны при кеше в памяти процесса
+    cache.add(
+        key, get_timestamp(),
+        timeout=settings.CACHE_GENERATION_TIMEOUT or None
+    )
+    return cache.get(key)
+
+
+def bump_generation(key=GENERATION_KEY):
+    """Делает недействительными все закешированные страницы списка.
+
+    Поколение увеличивается не меньше чем до текущего времени в
+    миллисекундах, поэтому оно же служит временем последнего изменения
+    (см. get_last_modified), в том числе после удаления, которое не
+    меняет updated_at.
+    """
+    generation = get_generation(key)
+    try:
+        # если поколение уже увеличил другой запрос, оно окажется немного
+        # впереди текущего времени, но всё равно изменится
+        cache.incr(key, max(get_timestamp() - generation, 1))
+    except ValueError:
+        # поколение вытеснено из кеша: новое начнётся с текущего времени
+        get_generation(key)
+
+
+def get_user_generation(user_id):
+    return get_generation(USER_GENERATION_KEY.format(user_id=user_id))
+
+
+def bump_user_generation(user_id):
+    """Делает недействительными закешированные данные пользователя,
+    зависящие от его избранного, списка покупок и подписок.
+    """
+    bump_generation(USER_GENERATION_KEY.format(user_id=user_id))
+
+
+def get_list_generations(query_params):
+    """Поколения, от которых зависит страница списка рецептов."""
+    generations = [get_generation()]
+    # порядок ?ordering=favorites_count меняется при каждом добавлении в
+    # избранное, поэтому такие страницы сбрасываются отдельным поколением
+    if 'favorites_count' in query_params.get('ordering', ''):
+        generations.append(get_generation(FAVORITES_GENERATION_KEY))
+    return generations
+
+
+def get_last_modified(*generations):
+    """Время последнего изменения списка по его поколениям."""
+    timestamp = min(max(generations), get_timestamp()) / 1000
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def get_cache_key(request):
+    # параметры запроса сортируются, чтобы ?a=1&b=2 и ?b=2&a=1 попадали
+    # в одну запись:
+    query = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    ))
+    digest = md5(f'{request.get_host()}?{query}'.encode()).hexdigest()
+    generation = '.'.join(
+        str(generation)
+        for generation in get_list_generations(request.query_params)
+    )
+    return f'{CACHE_PREFIX}:{generation}:{digest}'
+
+
+def get_cached_data(request):
+    key = get_cache_key(request)
+    data = cache.get(key)
+    increment(MISSES_KEY if data is None else HITS_KEY)
+    return key, data
+
+
+def set_cached_data(key, data):
+    cache.set(key, data, settings.RECIPES_CACHE_TIMEOUT)
+
+
+def get_count_cache_key(model, params, user_id=None):
+    """Ключ количества объектов списка для нормализованных фильтров.
+
+    params - словарь {параметр: отсортированный список значений}; если
+    результат зависит от пользователя, в ключ входят его id и поколение.
+    """
+    user_part = '-'
+    if user_id is not None:
+        user_part = f'{user_id}.{get_user_generation(user_id)}'
+    digest = md5(
+        f'{model._meta.label}?{urlencode(sorted(params.items()), True)}'
+        .encode()
+    ).hexdigest()
+    return f'{COUNT_PREFIX}:{get_generation()}:{user_part}:{digest}'
+
+
+def get_cached_count(key):
+    return cache.get(key)
+
+
+def set_cached_count(key, count, is_approximate):
+    cache.set(key, (count, is_approximate), settings.COUNT_CACHE_TIMEOUT)
+
+
+def get_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 3) if total else None,
+        'generation': get_generation(),
+    }
@@ -1,20 +1,167 @@
+import binascii
 from base64 import b64decode
+from tempfile import SpooledTemporaryFile
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from rest_framework import serializers
 
+from PIL import Image
+from recipes.images import ORIGINAL_SIZE, get_image_url
+
+# число символов base64, декодируемых за раз (кратно 4):
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_SIZE_PARAM = 'image_size'
+
+INVALID_IMAGE = 'Загрузите корректное изображение в формате base64.'
+IMAGE_TOO_LARGE = 'Размер изображения не должен превышать {max_size} байт.'
+IMAGE_TOO_MANY_PIXELS = ('Изображение не должно содержать больше '
+                         '{max_pixels} пикселей.')
+
+
+def decode_base64_to_file(base64_string, max_size):
+    """Декодирует base64 по частям во временный файл: в памяти он хранится,
+    пока не превысит FILE_UPLOAD_MAX_MEMORY_SIZE, затем - на диске.
+    Если декодированные данные больше max_size, декодирование прерывается
+    с ValueError.
+    """
+    # 4 символа base64 - 3 байта; строку заведомо большего размера
+    # декодировать не нужно:
+    if len(base64_string) // 4 * 3 > max_size + 3:
+        raise ValueError('image is too large')
+    file = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    size = 0
+    rest = ''
+    try:
+        for start in range(0, len(base64_string), BASE64_CHUNK_SIZE):
+            # пробельные символы допускаются между символами base64;
+            # символы, не вошедшие в группу из 4, переносятся в следующую часть
+            chunk = rest + ''.join(
+                base64_string[start:start + BASE64_CHUNK_SIZE].split()
+            )
+            end = len(chunk) // 4 * 4
+            chunk, rest = chunk[:end], chunk[end:]
+            data = b64decode(chunk, validate=True)
+            size += len(data)
+            if size > max_size:
+                raise ValueError('image is too large')
+            file.write(data)
+        if rest:
+            raise binascii.Error('incorrect padding')
+    except ValueError:
+        # в том числе binascii.Error
+        file.close()
+        raise
+    file.seek(0)
+    return file, size
+
+
+def verify_image(file, max_pixels):
+    """Проверяет изображение по заголовку и структуре файла, не декодируя
+    пиксели; возвращает объект Image с форматом и размерами.
+    """
+    try:
+        image = Image.open(file)
+        width, height = image.size
+        if width * height > max_pixels:
+            raise serializers.ValidationError(
+                IMAGE_TOO_MANY_PIXELS.format(max_pixels=max_pixels)
+            )
+        # для JPEG draft уменьшает масштаб декодирования, verify
+        # проверяет структуру файла без построения bitmap:
+        image.draft(image.mode, (1, 1))
+        image.verify()
+    except serializers.ValidationError:
+        raise
+    except Exception:
+        raise serializers.ValidationError(INVALID_IMAGE)
+    return image
+
+
+def get_image_size(request):
+    """Размер изображений из параметра ?image_size= запроса."""
+    if request is None:
+        return ORIGINAL_SIZE
+    size = request.query_params.get(IMAGE_SIZE_PARAM, ORIGINAL_SIZE)
+    if size not in settings.IMAGE_VARIANT_SIZES:
+        return ORIGINAL_SIZE
+    return size
+
+
+def build_url(request, url):
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+class RecipeImageField(serializers.ImageField):
+    """Ссылка на изображение рецепта в размере, выбранном параметром
+    ?image_size= (thumbnail, medium или original).
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        return build_url(
+            request, get_image_url(value, get_image_size(request))
+        )
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на все размеры изображения рецепта."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        return {
+            size: build_url(request, get_image_url(value, size))
+            for size in (ORIGINAL_SIZE, *settings.IMAGE_VARIANT_SIZES)
+        }
+
+
+class Base64ToImageField(RecipeImageField):
+    """Изображение в виде строки base64 (в том числе data URI).
+
+    Строка декодируется по частям с ограничением размера MAX_IMAGE_SIZE;
+    Pillow читает только заголовок изображения, чтобы проверить формат
+    и число пикселей (MAX_IMAGE_PIXELS), и не декодирует всё изображение.
+    """
 
-class Base64ToImageField(serializers.ImageField):
     def to_internal_value(self, base64_string):
         if not base64_string:
             return super().to_internal_value(None)
+        if not isinstance(base64_string, str):
+            raise serializers.ValidationError(INVALID_IMAGE)
         if base64_string.startswith('data:image'):
-            description, image_string = base64_string.split(';base64,')
-            extension = description.split('/')[-1]  # расширение файла
-            data = ContentFile(
-                b64decode(image_string), name='temp.' + extension
+            base64_string = base64_string.partition(';base64,')[2]
+
+        try:
+            file, size = decode_base64_to_file(
+                base64_string, settings.MAX_IMAGE_SIZE
             )
-        else:
-            image_string = base64_string
-            data = ContentFile(b64decode(image_string), name='temp.jpeg')
-        return super().to_internal_value(data)
+        except binascii.Error:
+            raise serializers.ValidationError(INVALID_IMAGE)
+        except ValueError:
+            raise serializers.ValidationError(
+                IMAGE_TOO_LARGE.format(max_size=settings.MAX_IMAGE_SIZE)
+            )
+
+        try:
+            image = verify_image(file, settings.MAX_IMAGE_PIXELS)
+        except serializers.ValidationError:
+            file.close()
+            raise
+
+        file.seek(0)
+        extension = image.format.lower()
+        data = UploadedFile(
+            file, name='temp.' + extension, size=size,
+            content_type=Image.MIME.get(image.format)
+        )
+        # изображение уже проверено: проверка ImageField Django загрузила
+        # бы файл в память целиком
+        return serializers.FileField.to_internal_value(self, data)
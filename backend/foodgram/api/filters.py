@@ -1,15 +1,52 @@
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import BaseFilterBackend, SearchFilter
 
+from recipes.index import tag_index
 from recipes.models import Recipe
+from recipes.search import search_recipes
 
 
 class IngredientFilter(SearchFilter):
     search_param = 'name'
 
 
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по названию, тексту и ингредиентам рецепта;
+    результаты сортируются по релевантности.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_recipes(queryset, query)
+
+
+class TagSlugsField(forms.MultipleChoiceField):
+    """Slug тэгов из повторяющегося параметра запроса. Значения
+    проверяются по tag_index без запроса к базе; для неизвестного slug -
+    ошибка, как у MultipleChoiceField.
+    """
+
+    def validate(self, value):
+        # тэг мог быть создан в другом процессе после построения индекса:
+        if value and len(tag_index.get_ids(value)) < len(value):
+            tag_index.invalidate()
+        super().validate(value)
+
+    def valid_value(self, value):
+        return bool(tag_index.get_ids([value]))
+
+
+class TagSlugsFilter(filters.Filter):
+    field_class = TagSlugsField
+
+
 class RecipeFilter(FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagSlugsFilter(method='filters_tags')
     is_favorited = filters.BooleanFilter(method='filters_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filters_is_in_shopping_cart'
@@ -19,6 +56,16 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('tags', 'author')
 
+    def filters_tags(self, queryset, name, value):
+        # slug переводятся в id без запроса к базе; EXISTS по таблице связей
+        # не размножает рецепты с несколькими подходящими тэгами:
+        tag_ids = tag_index.get_ids(value)
+        if not tag_ids:
+            return queryset.none()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__in=tag_ids
+        )))
+
     def filters_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorites__user=self.request.user)
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from api.benchmark import benchmark_logins
+from api.management.commands.seed_benchmark_data import (BENCHMARK_PASSWORD,
+                                                         BENCHMARK_PREFIX)
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Замеряет число входов (POST /api/auth/token/login/) в секунду '
+            'на процесс и всего при нескольких одновременно работающих '
+            'процессах, как у gunicorn.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Число одновременно работающих процессов.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Число входов в каждом процессе.'
+        )
+        parser.add_argument(
+            '--prefix',
+            default=BENCHMARK_PREFIX,
+            help='Префикс пользователей, созданных seed_benchmark_data.'
+        )
+        parser.add_argument(
+            '--password',
+            default=BENCHMARK_PASSWORD,
+            help='Пароль этих пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(
+            username__startswith=options['prefix']
+        ).order_by('pk').first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователей для замеров: запустите '
+                'seed_benchmark_data.'
+            )
+        result = benchmark_logins(
+            user.email, options['password'], options['processes'],
+            options['requests']
+        )
+        self.stdout.write(
+            f'Процессов: {result["processes"]}, одновременных проверок '
+            f'паролей: не больше {settings.PASSWORD_CHECK_CONCURRENCY or "-"}'
+        )
+        self.stdout.write(
+            f'Входов в секунду: {result["logins_per_second"]}, на процесс: '
+            f'{result["logins_per_second_per_process"]}'
+        )
+        self.stdout.write(
+            f'p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+            f'статусы {result["statuses"]}'
+        )
@@ -0,0 +1,113 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.benchmark import Benchmark, compare
+from api.management.commands.seed_benchmark_data import (BENCHMARK_PASSWORD,
+                                                         BENCHMARK_PREFIX)
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа, число запросов к базе и выделяемую '
+            'память для каждого эндпоинта API, сохраняет результаты в JSON '
+            'и сравнивает их с сохранёнными ранее.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=2,
+            help='Прогоны без учёта результатов (прогрев кешей).'
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark.json',
+            help='Файл для результатов.'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Файл с результатами прошлого прогона для сравнения.'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Допустимый рост p95 относительно baseline (доля).'
+        )
+        parser.add_argument(
+            '--prefix',
+            default=BENCHMARK_PREFIX,
+            help='Префикс пользователей, созданных seed_benchmark_data.'
+        )
+        parser.add_argument(
+            '--password',
+            default=BENCHMARK_PASSWORD,
+            help='Пароль этих пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(
+            username__startswith=options['prefix']
+        ).order_by('pk')[:2])
+        if len(users) < 2:
+            raise CommandError(
+                'Нет пользователей для замеров: запустите '
+                'seed_benchmark_data.'
+            )
+        admin = User.objects.filter(is_staff=True).order_by('pk').first()
+        if admin is None:
+            self.stderr.write(
+                'Нет администратора: эндпоинты статистики не замеряются.'
+            )
+        try:
+            benchmark = Benchmark(
+                users[0], users[1], admin, options['password']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        uncovered = benchmark.get_uncovered_url_names()
+        if uncovered:
+            self.stderr.write(
+                f'Маршруты без замеров: {", ".join(uncovered)}.'
+            )
+
+        report = benchmark.run(options['iterations'], options['warmup'])
+        for name, result in report.items():
+            self.stdout.write(
+                f'{name:<32} p50 {result["p50_ms"]:>8.2f} мс  '
+                f'p95 {result["p95_ms"]:>8.2f} мс  '
+                f'запросов {result["queries"]:>3}  '
+                f'память {result["allocated_kb"] or 0:>8.1f} КБ  '
+                f'статусы {result["statuses"]}'
+            )
+        Path(options['output']).write_text(json.dumps({
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': options['iterations'],
+            'uncovered_url_names': uncovered,
+            'endpoints': report,
+        }, ensure_ascii=False, indent=2))
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())
+            regressions = compare(
+                report, baseline['endpoints'], options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Ухудшения относительно baseline:\n'
+                    + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS(
+                'Ухудшений относительно baseline нет.'
+            ))
@@ -0,0 +1,281 @@
+import io
+import random
+from collections import Counter
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from organizer.models import (Favorite, ShoppingCart, ShoppingListItem,
+                              Subscription)
+from organizer.utils import BATCH_SIZE, calculate_shopping_lists
+from PIL import Image
+from recipes.models import Measurement, Recipe, RecipeIngredient, Tag
+from recipes.search import update_search_index
+from users.models import User
+
+BENCHMARK_PREFIX = 'bench_'
+BENCHMARK_PASSWORD = 'Benchmark-Passw0rd'
+DISHES = (
+    'борщ', 'суп', 'салат', 'пирог', 'каша', 'омлет', 'рагу', 'плов',
+    'блины', 'котлеты', 'запеканка', 'паста', 'ризотто', 'гуляш', 'сырники',
+)
+KINDS = (
+    'домашний', 'быстрый', 'летний', 'острый', 'постный', 'праздничный',
+    'сытный', 'лёгкий',
+)
+
+
+def create_in_batches(model, objects, batch_size, return_ids=False):
+    """Создаёт объекты через bulk_create частями по batch_size, не собирая
+    их все в памяти (bulk_create превращает объекты в список). Если
+    return_ids=True, возвращает их id в порядке objects.
+    """
+    connection = connections[router.db_for_write(model)]
+    objects = iter(objects)
+    ids = []
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return ids
+        if not return_ids:
+            model.objects.bulk_create(batch)
+            continue
+        if connection.features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(batch)
+            ids += [item.pk for item in batch]
+            continue
+        # SQLite в Django 3.2 не возвращает id из bulk_create: объекты
+        # вставляются по порядку, поэтому их id - следующие за last_id
+        last_id = model.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+        model.objects.bulk_create(batch)
+        ids += list(model.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+
+def get_benchmark_image():
+    """Одно изображение для всех рецептов (хранилище сохраняет файл по
+    хешу содержимого, поэтому повторный запуск не создаёт новых файлов).
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 40)).save(buffer, 'PNG')
+    storage = Recipe._meta.get_field('image').storage
+    return storage.save('recipes/benchmark.png', ContentFile(
+        buffer.getvalue()
+    ))
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетические данные для замеров производительности: '
+            'пользователей, рецепты, тэги, избранное, корзины и подписки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--recipes', type=int, default=200000)
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument(
+            '--measurements',
+            type=int,
+            default=2000,
+            help='Сколько компонентов должно быть в базе; недостающие '
+                 'создаются.'
+        )
+        parser.add_argument('--ingredients-per-recipe', type=int, default=5)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument(
+            '--prefix',
+            default=BENCHMARK_PREFIX,
+            help='Начало имён создаваемых пользователей и тэгов.'
+        )
+        parser.add_argument(
+            '--password',
+            default=BENCHMARK_PASSWORD,
+            help='Пароль всех создаваемых пользователей.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Начальное значение генератора случайных чисел.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество объектов в одном INSERT.'
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix!r} уже есть: укажите '
+                f'другой --prefix.'
+            )
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно не меньше 2 пользователей и 1 рецепта.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            self.seed(options)
+        self.stdout.write(self.style.SUCCESS('Данные созданы.'))
+
+    def sample(self, population, count, exclude=None):
+        count = min(count, len(population) - (exclude is not None))
+        result = set()
+        while len(result) < count:
+            item = population[self.rng.randrange(len(population))]
+            if item != exclude:
+                result.add(item)
+        return result
+
+    def seed(self, options):
+        rng = self.rng
+        prefix = options['prefix']
+        user_count = options['users']
+        recipe_count = options['recipes']
+        user_numbers = range(user_count)
+        recipe_numbers = range(recipe_count)
+
+        # связи генерируются заранее, чтобы сразу заполнить счётчики
+        # (bulk_create не отправляет сигналы, которые их обновляют)
+        authors = [rng.randrange(user_count) for _ in recipe_numbers]
+        subscriptions = {
+            user: self.sample(
+                user_numbers, options['subscriptions_per_user'], user
+            )
+            for user in user_numbers
+        }
+        favorites = {
+            user: self.sample(recipe_numbers, options['favorites_per_user'])
+            for user in user_numbers
+        }
+        carts = {
+            user: self.sample(recipe_numbers, options['cart_per_user'])
+            for user in user_numbers
+        }
+        recipes_count = Counter(authors)
+        followers_count = Counter(
+            author
+            for followed in subscriptions.values() for author in followed
+        )
+        favorites_count = Counter(
+            recipe for recipes in favorites.values() for recipe in recipes
+        )
+
+        password = make_password(options['password'])
+        user_ids = create_in_batches(User, (
+            User(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+                recipes_count=recipes_count[number],
+                followers_count=followers_count[number]
+            )
+            for number in user_numbers
+        ), self.batch_size, True)
+        self.stdout.write(f'Пользователей: {len(user_ids)}.')
+
+        tag_ids = self.create_tags(prefix, options['tags'])
+        measurement_ids = self.get_measurements(
+            prefix, options['measurements']
+        )
+
+        image = get_benchmark_image()
+        recipe_ids = create_in_batches(Recipe, (
+            Recipe(
+                author_id=user_ids[authors[number]],
+                name=f'{rng.choice(KINDS)} {rng.choice(DISHES)} {number}',
+                text=f'Рецепт {number}: '
+                     + ' '.join(rng.choices(DISHES, k=8)),
+                cooking_time=rng.randint(5, 180),
+                image=image,
+                favorites_count=favorites_count[number]
+            )
+            for number in recipe_numbers
+        ), self.batch_size, True)
+        self.stdout.write(f'Рецептов: {len(recipe_ids)}.')
+
+        create_in_batches(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                measurement_id=measurement_id,
+                amount=Decimal(rng.randint(1, 1000))
+            )
+            for recipe_id in recipe_ids
+            for measurement_id in self.sample(
+                measurement_ids, options['ingredients_per_recipe']
+            )
+        ), self.batch_size)
+        create_in_batches(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.sample(tag_ids, options['tags_per_recipe'])
+        ), self.batch_size)
+        for model, relations in ((Favorite, favorites),
+                                 (ShoppingCart, carts)):
+            create_in_batches(model, (
+                model(user_id=user_ids[user], recipe_id=recipe_ids[recipe])
+                for user, recipes in relations.items()
+                for recipe in recipes
+            ), self.batch_size)
+        create_in_batches(Subscription, (
+            Subscription(user_id=user_ids[user], author_id=user_ids[author])
+            for user, followed in subscriptions.items()
+            for author in followed
+        ), self.batch_size)
+        self.stdout.write('Избранное, корзины и подписки созданы.')
+
+        for start in range(0, len(user_ids), self.batch_size):
+            create_in_batches(ShoppingListItem, (
+                ShoppingListItem(
+                    user_id=user_id,
+                    measurement_id=measurement_id,
+                    total_amount=amount
+                )
+                for (user_id, measurement_id), amount
+                in calculate_shopping_lists(
+                    user_ids[start:start + self.batch_size]
+                ).items()
+            ), self.batch_size)
+        for start in range(0, len(recipe_ids), self.batch_size):
+            update_search_index(recipe_ids[start:start + self.batch_size])
+        self.stdout.write('Списки покупок и поисковый индекс заполнены.')
+
+    def create_tags(self, prefix, count):
+        colors = set(Tag.objects.values_list('color', flat=True))
+        tags = []
+        for number in range(count):
+            color = None
+            while color is None or color in colors:
+                color = f'#{self.rng.randrange(0x1000000):06X}'
+            colors.add(color)
+            tags.append(Tag(
+                name=f'{prefix}tag{number}',
+                slug=f'{prefix}tag{number}',
+                color=color
+            ))
+        return create_in_batches(Tag, tags, self.batch_size, True)
+
+    def get_measurements(self, prefix, count):
+        ids = list(Measurement.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )[:count])
+        if len(ids) < count:
+            ids += create_in_batches(Measurement, (
+                Measurement(
+                    name=f'{prefix}компонент {number}', measurement_unit='г'
+                )
+                for number in range(len(ids), count)
+            ), self.batch_size, True)
+        return ids
@@ -0,0 +1,196 @@
+import calendar
+from functools import partial
+from hashlib import md5
+
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from api.cache import (bump_user_generation, get_cached_data, get_generation,
+                       get_last_modified, set_cached_data)
+from api.serializers import RecipeIdsSerializer
+from organizer.utils import (add_user_recipes, add_user_rows,
+                             delete_user_recipes, delete_user_rows)
+from recipes.models import Recipe
+
+# результаты для каждого id в ответе BulkRecipesMixin:
+BULK_ADDED = 'added'
+BULK_EXISTS = 'exists'
+BULK_REMOVED = 'removed'
+BULK_NOT_FOUND = 'not_found'
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы (ETag и Last-Modified) для list и retrieve.
+
+    Валидаторы вычисляются до выборки и сериализации данных: для объекта -
+    по полю updated_at, для списка - по поколению кеша api.cache, которое
+    меняют сигналы api.signals. Если они совпадают с If-None-Match или
+    If-Modified-Since, сразу возвращается ответ 304.
+    """
+
+    def get_validators(self, request):
+        """Возвращает части ETag и дату последнего изменения."""
+        if self.action == 'retrieve':
+            objects = self.get_queryset().model.objects
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            last_modified = objects.filter(
+                pk=self.kwargs.get(lookup_url_kwarg)
+            ).values_list('updated_at', flat=True).first()
+            return (last_modified,), last_modified
+        generation = get_generation()
+        return (generation,), get_last_modified(generation)
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag_parts, last_modified = self.get_validators(request)
+        etag = quote_etag(md5(
+            repr((request.get_full_path(), *etag_parts)).encode()
+        ).hexdigest())
+        timestamp = None
+        if last_modified is not None:
+            timestamp = calendar.timegm(last_modified.utctimetuple())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
+class AnonymousListCacheMixin:
+    """Кеширует данные list для анонимных пользователей.
+
+    Ключ - нормализованная строка запроса и поколение кеша, которое
+    меняется сигналами при изменении рецептов, тэгов и ингредиентов.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        key, data = get_cached_data(request)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_cached_data(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class OrganizerMixin:
+    """Добавление и удаление записей пользователя organizer_model
+    (избранное, корзина, подписки), ссылающихся через organizer_field на
+    рецепт или автора.
+
+    Записи добавляются и удаляются без сигналов, одним запросом каждая;
+    зависящие от них данные (счётчики, списки покупок) обновляют
+    organizer_added и organizer_removed, получающие список id объектов.
+    Изменения выполняются в одной транзакции; внутри внешней транзакции
+    точка сохранения не создаётся: при ошибке откатывается вся внешняя.
+    """
+    organizer_model = None
+    organizer_field = 'recipe'
+
+    def organizer_added(self, user, object_ids):
+        pass
+
+    def organizer_removed(self, user, object_ids):
+        pass
+
+    def organizer_changed(self, user):
+        # сигналы не отправлялись, поэтому поколение данных пользователя
+        # меняется здесь (см. api.signals)
+        transaction.on_commit(partial(bump_user_generation, user.id))
+
+    def add_organizer_object(self, user, object_id):
+        """Добавляет запись; False, если она уже была.
+
+        Из одновременных одинаковых запросов запись добавит только один,
+        остальные получат False (см. add_user_rows).
+        """
+        with transaction.atomic(savepoint=False):
+            is_added = bool(add_user_rows(
+                self.organizer_model, user, self.organizer_field, [object_id]
+            ))
+            if is_added:
+                self.organizer_added(user, [object_id])
+                self.organizer_changed(user)
+        return is_added
+
+    def remove_organizer_object(self, user, object_id):
+        """Удаляет запись; False, если её не было."""
+        with transaction.atomic(savepoint=False):
+            is_removed = delete_user_rows(
+                self.organizer_model, user.id, self.organizer_field,
+                [object_id]
+            ) > 0
+            if is_removed:
+                self.organizer_removed(user, [object_id])
+                self.organizer_changed(user)
+        return is_removed
+
+
+class BulkRecipesMixin(OrganizerMixin):
+    """Добавление (POST) и удаление (DELETE) нескольких рецептов одним
+    запросом {"recipes": [id, ...]}.
+
+    Рецепты проверяются одним запросом IN, записи добавляются одним INSERT
+    и удаляются одним DELETE. В ответе для каждого id указан результат:
+    added, exists, removed или not_found.
+    """
+
+    def bulk_response(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # повторяющиеся id обрабатываются один раз, порядок сохраняется:
+        recipe_ids = list(dict.fromkeys(
+            serializer.validated_data.get('recipes')
+        ))
+        user = request.user
+        if request.method == 'POST':
+            found = Recipe.objects.filter(
+                pk__in=recipe_ids
+            ).values_list('pk', flat=True)
+            statuses = dict.fromkeys(found, BULK_EXISTS)
+            with transaction.atomic(savepoint=False):
+                changed = add_user_recipes(self.organizer_model, user, [
+                    recipe_id for recipe_id in recipe_ids
+                    if recipe_id in statuses
+                ])
+                self.organizer_added(user, changed)
+            statuses.update(dict.fromkeys(changed, BULK_ADDED))
+        else:
+            with transaction.atomic(savepoint=False):
+                changed = delete_user_recipes(
+                    self.organizer_model, user, recipe_ids
+                )
+                self.organizer_removed(user, changed)
+            statuses = dict.fromkeys(changed, BULK_REMOVED)
+        if changed:
+            self.organizer_changed(user)
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': statuses.get(recipe_id, BULK_NOT_FOUND)
+            }
+            for recipe_id in recipe_ids
+        ]})
@@ -1,5 +1,132 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+from api.cache import get_cached_count, get_count_cache_key, set_cached_count
+from foodgram.paginators import get_estimated_count
+
+
+class CountPaginator(Paginator):
+    """Paginator Django, количество объектов которого вычисляет get_count."""
+
+    def __init__(self, object_list, per_page, get_count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.get_count = get_count
+
+    @cached_property
+    def count(self):
+        return self.get_count(self.object_list)
+
+
+class IdCursorPagination(CursorPagination):
+    """Постраничный вывод по курсору (keyset) без подсчёта строк.
+
+    Следующая страница выбирается условием по id вместо OFFSET, поэтому
+    скорость не зависит от глубины страницы. Порядок задаётся атрибутом
+    cursor_ordering представления, по умолчанию - '-id', как в Recipe.Meta.
+    """
+    ordering = '-id'
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        # параметр ?ordering= в режиме курсора не используется: позиция
+        # курсора должна задаваться уникальным полем
+        return (getattr(view, 'cursor_ordering', self.ordering),)
 
 
 class CustomPagination(PageNumberPagination):
+    """Номера страниц (page/limit) или, при наличии ?cursor=, курсор.
+
+    Количество объектов кешируется по набору фильтров запроса. Если
+    представление задаёт count_user_filters, результат зависит от
+    пользователя только при этих фильтрах, иначе - всегда; при
+    cache_count = False количество не кешируется. Поле count_is_approximate
+    (true) есть в ответе, только если count - оценка планировщика.
+    """
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    cursor_pagination_class = IdCursorPagination
+    # параметры, не влияющие на количество объектов:
+    count_ignored_params = ('ordering', 'format', 'recipes_limit')
+
+    cursor_paginator = None
+    count_is_approximate = False
+
+    def __init__(self):
+        self.django_paginator_class = partial(
+            CountPaginator, get_count=self.get_count
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # пустой ?cursor= запрашивает первую страницу в режиме курсора
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        self.request = request
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_params(self):
+        ignored_params = (
+            self.page_query_param, self.page_size_query_param,
+            *self.count_ignored_params
+        )
+        params = {}
+        for key, values in self.request.query_params.lists():
+            values = sorted(value for value in values if value)
+            if key not in ignored_params and values:
+                params[key] = values
+        return params
+
+    def get_count(self, queryset):
+        params = self.get_count_params()
+        user_filters = getattr(self.view, 'count_user_filters', None)
+        is_user_dependent = user_filters is None or any(
+            name in params for name in user_filters
+        )
+        user = self.request.user
+        key = None
+        if getattr(self.view, 'cache_count', True):
+            key = get_count_cache_key(
+                queryset.model, params,
+                user.id if is_user_dependent and user.is_authenticated
+                else None
+            )
+            cached = get_cached_count(key)
+            if cached is not None:
+                self.count_is_approximate = cached[1]
+                return cached[0]
+
+        count = None
+        if not params and not is_user_dependent:
+            # для больших таблиц без фильтров достаточно оценки:
+            count = get_estimated_count(
+                queryset.model, settings.ESTIMATED_COUNT_THRESHOLD
+            )
+        self.count_is_approximate = count is not None
+        if count is None:
+            count = queryset.count()
+        if key is not None:
+            set_cached_count(key, count, self.count_is_approximate)
+        return count
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        count = [('count', self.page.paginator.count)]
+        if self.count_is_approximate:
+            count.append(('count_is_approximate', True))
+        return Response(OrderedDict([
+            *count,
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
@@ -1,13 +1,20 @@
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 
-from api.fields import Base64ToImageField
+from api.fields import Base64ToImageField, ImageVariantsField, RecipeImageField
 from api.utils import (check_id_list, check_ingredients_data,
-                       get_ingredients_objects)
+                       create_recipe_ingredients, get_ingredients_prefetch,
+                       get_objects_by_id)
 from organizer.models import Favorite, ShoppingCart, Subscription
-from recipes.models import Ingredient, Measurement, Recipe, Tag
+from organizer.utils import (delete_recipe_ingredients, get_recipe_amounts,
+                             update_recipe_in_shopping_lists)
+from recipes.models import Measurement, Recipe, RecipeIngredient, Tag
+from tasks.models import Task
 from users.models import User
 
 AMOUNT_ERROR_MESSAGE = ('количество ингредиента укажите числом с точкой в '
@@ -21,6 +28,14 @@ class FavoriteSerializer(serializers.ModelSerializer):
         fields = ('user', 'recipe')
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT
+    )
+
+
 class MeasurementSerializer(serializers.ModelSerializer):
     class Meta:
         model = Measurement
@@ -36,7 +51,7 @@ class IngredientSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='measurement.id')
 
     class Meta:
-        model = Ingredient
+        model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
     def get_amount(self, object):
@@ -55,7 +70,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
     def to_internal_value(self, data):
-        tag_errors = check_id_list(Tag, [data])
+        tag_errors = check_id_list([data])
         if tag_errors:
             raise serializers.ValidationError(tag_errors)
         return data
@@ -88,6 +103,9 @@ class UserSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
     def get_is_subscribed(self, object):
+        # значение может быть заранее вычислено аннотацией queryset:
+        if hasattr(object, 'is_subscribed'):
+            return object.is_subscribed
         user = self.context.get('request').user
         return Subscription.objects.filter(
             user=user.id, author=object
@@ -110,6 +128,8 @@ class UserPasswordSerializer(serializers.Serializer):
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image = RecipeImageField(read_only=True)
+    images = ImageVariantsField(source='image')
 
     class Meta:
         model = Recipe
@@ -117,6 +137,7 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
 
@@ -124,8 +145,11 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
 class RecipeSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True)
-    ingredients = IngredientSerializer(many=True)
+    ingredients = IngredientSerializer(
+        source='recipe_ingredients', many=True
+    )
     image = Base64ToImageField()
+    images = ImageVariantsField(source='image')
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -140,6 +164,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time'
         )
@@ -161,7 +186,20 @@ class RecipeSerializer(serializers.ModelSerializer):
             image = data.pop('image')
         tags = data.pop('tags')
         # ингредиенты не учитываем при проверке уникальности:
-        ingredients = data.pop('ingredients')
+        ingredients = data.pop('recipe_ingredients')
+        # тэги и ингредиенты всего рецепта загружаются из базы двумя
+        # запросами, найденные объекты передаются в validated_data:
+        tags_objects, tag_errors = get_objects_by_id(Tag, tags)
+        measurements, measurement_errors = get_objects_by_id(
+            Measurement, [ingredient.get('id') for ingredient in ingredients]
+        )
+        errors = {}
+        if tag_errors:
+            errors['tags'] = tag_errors
+        if measurement_errors:
+            errors['ingredients'] = {'id': measurement_errors}
+        if errors:
+            raise serializers.ValidationError(errors)
         # проверка уникальности рецепта только при POST-запросе:
         if (self.context.get('request').method == 'POST'
                 and Recipe.objects.filter(tags__id__in=tags, **data).exists()):
@@ -177,44 +215,57 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         if is_image_in_data:
             data['image'] = image
-        data['tags'] = tags
-        data['ingredients'] = ingredients
+        data['tags'] = [tags_objects[int(tag_id)] for tag_id in tags]
+        for ingredient in ingredients:
+            ingredient['measurement'] = measurements[int(ingredient['id'])]
+        data['recipe_ingredients'] = ingredients
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
-        tag_list = validated_data.pop('tags')
-        if tag_list:
-            tags_objects = [
-                get_object_or_404(Tag, pk=tag_id) for tag_id in tag_list
-            ]
-
-        ingredients_list = validated_data.pop('ingredients')
-        ingredients_objects = get_ingredients_objects(ingredients_list)
+        tags_objects = validated_data.pop('tags')
+        ingredients_list = validated_data.pop('recipe_ingredients')
 
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags_objects)
-        recipe.ingredients.set(ingredients_objects)
+        create_recipe_ingredients(recipe, ingredients_list)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tag_list = validated_data.pop('tags')
-        if tag_list:
-            tags_objects = [
-                get_object_or_404(Tag, pk=tag_id) for tag_id in tag_list
-            ]
+        tags_objects = validated_data.pop('tags')
+        if tags_objects:
             instance.tags.set(tags_objects)
 
-        ingredients_list = validated_data.pop('ingredients')
-        ingredients_objects = get_ingredients_objects(ingredients_list)
-        instance.ingredients.set(ingredients_objects)
+        ingredients_list = validated_data.pop('recipe_ingredients')
+        old_amounts = get_recipe_amounts(instance)
+        delete_recipe_ingredients(instance)
+        create_recipe_ingredients(instance, ingredients_list)
+        update_recipe_in_shopping_lists(instance, old_amounts)
 
         return super().update(instance, validated_data)
 
+    def to_representation(self, instance):
+        # передаём автору рецепта аннотацию is_subscribed, чтобы
+        # вложенный UserSerializer не делал отдельный запрос:
+        if hasattr(instance, 'is_subscribed') and instance.author:
+            instance.author.is_subscribed = instance.is_subscribed
+        # после создания или изменения рецепта ингредиенты загружаются
+        # вместе с компонентами одним запросом:
+        prefetched = getattr(instance, '_prefetched_objects_cache', {})
+        if 'recipe_ingredients' not in prefetched:
+            prefetch_related_objects([instance], get_ingredients_prefetch())
+        return super().to_representation(instance)
+
     def get_is_favorited(self, object):
+        if hasattr(object, 'is_favorited'):
+            return object.is_favorited
         user = self.context.get('request').user
         return Favorite.objects.filter(user=user.id, recipe=object.id).exists()
 
     def get_is_in_shopping_cart(self, object):
+        if hasattr(object, 'is_in_shopping_cart'):
+            return object.is_in_shopping_cart
         user = self.context.get('request').user
         return ShoppingCart.objects.filter(
             user=user.id, recipe=object.id
@@ -222,9 +273,12 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 
 class SubscriptionRecipeSerializer(serializers.ModelSerializer):
+    image = RecipeImageField(read_only=True)
+    images = ImageVariantsField(source='image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -251,24 +305,48 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, object):
-        return Subscription.objects.filter(
-            user=object.user, author=object.author
-        ).exists()
+        # сериализуются только подписки текущего пользователя:
+        return True
 
     def get_recipes(self, object):
+        recipes_preview = self.context.get('recipes_preview')
+        if recipes_preview is not None:
+            recipes = recipes_preview.get(object.author_id, [])
+            return SubscriptionRecipeSerializer(
+                recipes, many=True, context=self.context
+            ).data
         recipes_limit = self.context.get('recipes_limit')
         recipes = Recipe.objects.filter(author=object.author)
         if not recipes_limit:
-            return SubscriptionRecipeSerializer(recipes, many=True).data
+            return SubscriptionRecipeSerializer(
+                recipes, many=True, context=self.context
+            ).data
         return SubscriptionRecipeSerializer(
-            recipes[:recipes_limit], many=True
+            recipes[:recipes_limit], many=True, context=self.context
         ).data
 
     def get_recipes_count(self, object):
-        return Recipe.objects.filter(author=object.author).count()
+        return object.author.recipes_count
 
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingCart
         fields = ('id', 'user', 'recipe')
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = (
+            'id',
+            'name',
+            'status',
+            'result',
+            'error',
+            'attempts',
+            'max_attempts',
+            'created_at',
+            'started_at',
+            'finished_at'
+        )
@@ -0,0 +1,65 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import (FAVORITES_GENERATION_KEY, bump_generation,
+                       bump_user_generation)
+from organizer.counters import counters_changed
+from organizer.models import Favorite, ShoppingCart, Subscription
+from recipes.models import Measurement, Recipe, RecipeIngredient, Tag
+from users.models import AUTHOR_FIELDS, User
+
+
+# RecipeIngredient создаются через bulk_create без сигналов, но вместе с
+# ними всегда сохраняется сам рецепт.
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Measurement)
+@receiver(post_delete, sender=Measurement)
+@receiver(post_save, sender=RecipeIngredient)
+def invalidate_recipes_list(sender, **kwargs):
+    # поколение меняется после фиксации транзакции, чтобы в кеш не попала
+    # страница, прочитанная до её завершения
+    transaction.on_commit(bump_generation)
+
+
+@receiver(post_save, sender=User)
+def invalidate_recipes_list_author(sender, created, update_fields, **kwargs):
+    # автор входит в представление рецепта; у нового пользователя ещё нет
+    # рецептов, а при входе сохраняется только last_login
+    if created or (update_fields and not AUTHOR_FIELDS & update_fields):
+        return
+    transaction.on_commit(bump_generation)
+
+
+@receiver(counters_changed)
+def invalidate_recipes_list_counters(sender, field, **kwargs):
+    # из счётчиков на списки рецептов влияет только favorites_count - через
+    # порядок ?ordering=favorites_count; счётчики пользователей в ответы
+    # списка не входят
+    if sender is Recipe and field == 'favorites_count':
+        transaction.on_commit(
+            partial(bump_generation, FAVORITES_GENERATION_KEY)
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes_list_tags(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_generation)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_user_lists(sender, instance, **kwargs):
+    # количества в списках с фильтрами is_favorited, is_in_shopping_cart
+    # и в списке подписок зависят от этих записей пользователя
+    transaction.on_commit(partial(bump_user_generation, instance.user_id))
@@ -0,0 +1,132 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.test import TestCase
+
+from api.tests.utils import APITestMixin
+from organizer.models import Favorite, ShoppingCart, ShoppingListItem
+from organizer.utils import calculate_shopping_lists
+from recipes.models import Recipe
+
+FAVORITE_BULK_PATH = '/api/recipes/favorite/bulk/'
+SHOPPING_CART_BULK_PATH = '/api/recipes/shopping_cart/bulk/'
+
+
+class BulkRecipesTest(APITestMixin, TestCase):
+    """Добавление и удаление нескольких рецептов одним запросом."""
+    recipes_count = 3
+
+    def setUp(self):
+        super().setUp()
+        self.recipe_ids = [recipe.id for recipe in self.recipes]
+        self.missing_id = max(self.recipe_ids) + 100
+
+    def request(self, method, path, recipe_ids):
+        response = getattr(self.user_client, method)(
+            path, {'recipes': recipe_ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [
+            (result['id'], result['status'])
+            for result in response.data['results']
+        ]
+
+    def get_favorites_counts(self):
+        return list(Recipe.objects.filter(
+            pk__in=self.recipe_ids
+        ).order_by('pk').values_list('favorites_count', flat=True))
+
+    def get_shopping_list(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.user
+        ).values_list('measurement', 'total_amount'))
+
+    def test_favorites(self):
+        first, second, third = self.recipe_ids
+        Favorite.objects.create(user=self.user, recipe_id=second)
+        # повторяющиеся id обрабатываются один раз, порядок сохраняется
+        results = self.request('post', FAVORITE_BULK_PATH, [
+            first, second, self.missing_id, first, third
+        ])
+        self.assertEqual(results, [
+            (first, 'added'),
+            (second, 'exists'),
+            (self.missing_id, 'not_found'),
+            (third, 'added'),
+        ])
+        self.assertEqual(self.get_favorites_counts(), [1, 1, 1])
+        results = self.request('delete', FAVORITE_BULK_PATH, [
+            first, first, self.missing_id, third
+        ])
+        self.assertEqual(results, [
+            (first, 'removed'),
+            (self.missing_id, 'not_found'),
+            (third, 'removed'),
+        ])
+        self.assertEqual(self.get_favorites_counts(), [0, 1, 0])
+        self.assertEqual(
+            list(Favorite.objects.filter(user=self.user).values_list(
+                'recipe', flat=True
+            )),
+            [second]
+        )
+
+    def test_shopping_cart(self):
+        first, second, third = self.recipe_ids
+        results = self.request('post', SHOPPING_CART_BULK_PATH, [
+            first, second, second
+        ])
+        self.assertEqual(results, [(first, 'added'), (second, 'added')])
+        self.assertEqual(
+            set(self.get_shopping_list().values()), {Decimal(2)}
+        )
+        # рецепт, уже лежащий в корзине, не учитывается повторно
+        results = self.request('post', SHOPPING_CART_BULK_PATH, [
+            first, third
+        ])
+        self.assertEqual(results, [(first, 'exists'), (third, 'added')])
+        self.assertEqual(
+            set(self.get_shopping_list().values()), {Decimal(3)}
+        )
+        results = self.request('delete', SHOPPING_CART_BULK_PATH, [
+            first, self.missing_id, first
+        ])
+        self.assertEqual(
+            results, [(first, 'removed'), (self.missing_id, 'not_found')]
+        )
+        self.assertEqual(
+            set(self.get_shopping_list().values()), {Decimal(2)}
+        )
+        self.assertEqual(
+            {
+                measurement_id: amount
+                for (_, measurement_id), amount
+                in calculate_shopping_lists([self.user.id]).items()
+            },
+            self.get_shopping_list()
+        )
+        self.request('delete', SHOPPING_CART_BULK_PATH, [second, third])
+        self.assertEqual(self.get_shopping_list(), {})
+        self.assertFalse(ShoppingCart.objects.filter(user=self.user).exists())
+
+    def test_invalid_data(self):
+        for recipe_ids in (
+            [],
+            ['id'],
+            [0],
+            list(range(1, settings.BULK_RECIPES_LIMIT + 2)),
+        ):
+            with self.subTest(recipe_ids=recipe_ids[:3]):
+                response = self.user_client.post(
+                    FAVORITE_BULK_PATH, {'recipes': recipe_ids},
+                    format='json'
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_anonymous(self):
+        response = self.anonymous_client.post(
+            SHOPPING_CART_BULK_PATH, {'recipes': self.recipe_ids},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 401)
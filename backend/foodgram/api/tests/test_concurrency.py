@@ -0,0 +1,102 @@
+import random
+import shutil
+import tempfile
+from threading import Barrier, Thread
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.tests.utils import create_recipes, create_user
+from organizer.models import (Favorite, ShoppingCart, ShoppingListItem,
+                              Subscription)
+from organizer.utils import calculate_shopping_lists
+from recipes.models import Measurement, Tag
+
+THREADS = 8
+REQUESTS_PER_THREAD = 20
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'одновременные транзакции проверяются в PostgreSQL'
+)
+class ConcurrentToggleTest(TransactionTestCase):
+    """Одновременные добавления и удаления одной и той же записи
+    избранного, корзины и подписки не приводят к ошибкам, а счётчики
+    и список покупок совпадают с фактическими записями.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.user = create_user(1)
+        self.author = create_user(2)
+        tag = Tag.objects.create(name='Тэг', slug='tag', color='#000000')
+        measurements = [
+            Measurement.objects.create(
+                name=f'Компонент {number}', measurement_unit='г'
+            )
+            for number in range(2)
+        ]
+        self.recipe = create_recipes(
+            self.author, 1, [tag], measurements
+        )[0]
+
+    def toggle(self, path, barrier, statuses, seed):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        choice = random.Random(seed).choice
+        barrier.wait()
+        try:
+            for _ in range(REQUESTS_PER_THREAD):
+                method = choice((client.get, client.delete))
+                statuses.append(method(path).status_code)
+        finally:
+            connection.close()
+
+    def run_threads(self, path):
+        barrier = Barrier(THREADS)
+        statuses = []
+        threads = [
+            Thread(target=self.toggle, args=(path, barrier, statuses, seed))
+            for seed in range(THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(statuses), THREADS * REQUESTS_PER_THREAD)
+        self.assertLessEqual(set(statuses), {200, 201, 204, 400})
+
+    def test_favorite(self):
+        self.run_threads(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.favorites_count,
+            Favorite.objects.filter(recipe=self.recipe).count()
+        )
+
+    def test_shopping_cart(self):
+        self.run_threads(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        in_cart = ShoppingCart.objects.filter(
+            user=self.user, recipe=self.recipe
+        ).exists()
+        items = {
+            (self.user.id, item.measurement_id): item.total_amount
+            for item in ShoppingListItem.objects.filter(user=self.user)
+        }
+        self.assertEqual(items, calculate_shopping_lists([self.user.id]))
+        self.assertEqual(bool(items), in_cart)
+
+    def test_subscription(self):
+        self.run_threads(f'/api/users/{self.author.id}/subscribe/')
+        self.author.refresh_from_db()
+        self.assertEqual(
+            self.author.followers_count,
+            Subscription.objects.filter(author=self.author).count()
+        )
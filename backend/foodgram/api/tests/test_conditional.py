@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from api.tests.utils import APITestMixin
+from organizer.models import Favorite
+
+
+class RecipeConditionalGetTest(APITestMixin, TestCase):
+    """ETag списка и рецепта меняется вместе с представлением."""
+    recipes_count = 2
+
+    def get_etag(self, client, path):
+        response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        # повторный запрос с тем же ETag - ответ 304 без тела
+        not_modified = client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        return response['ETag']
+
+    def assert_etag_changes(self, client, path, change):
+        etag = self.get_etag(client, path)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertNotEqual(self.get_etag(client, path), etag)
+
+    def test_author_change(self):
+        recipe_path = f'/api/recipes/{self.recipes[0].id}/'
+
+        def rename_author():
+            self.author.first_name = 'Новое имя'
+            self.author.save()
+
+        for path in ('/api/recipes/', recipe_path):
+            for client in (self.anonymous_client, self.user_client):
+                with self.subTest(path=path, client=client):
+                    self.assert_etag_changes(client, path, rename_author)
+
+    def test_author_login_keeps_etag(self):
+        etag = self.get_etag(self.anonymous_client, '/api/recipes/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save(update_fields=['last_login'])
+        self.assertEqual(
+            self.get_etag(self.anonymous_client, '/api/recipes/'), etag
+        )
+
+    def test_favorite(self):
+        recipe = self.recipes[0]
+
+        def add_favorite():
+            Favorite.objects.create(user=self.user, recipe=recipe)
+
+        for path in ('/api/recipes/', f'/api/recipes/{recipe.id}/'):
+            with self.subTest(path=path):
+                Favorite.objects.filter(user=self.user).delete()
+                self.assert_etag_changes(self.user_client, path, add_favorite)
+
+    def test_favorites_ordering(self):
+        # избранное другого пользователя меняет только порядок рецептов
+        self.assert_etag_changes(
+            self.anonymous_client, '/api/recipes/?ordering=-favorites_count',
+            lambda: Favorite.objects.create(
+                user=self.author, recipe=self.recipes[0]
+            )
+        )
+
+    def test_list_without_queries(self):
+        # ETag списка читается из кеша: ни ответ 304, ни страница из кеша
+        # анонимных списков не обращаются к базе
+        for client in (self.anonymous_client, self.user_client):
+            with self.subTest(client=client):
+                etag = client.get('/api/recipes/')['ETag']
+                with self.assertNumQueries(0):
+                    response = client.get(
+                        '/api/recipes/', HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.anonymous_client.get('/api/recipes/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_delete(self):
+        # удаление не меняет updated_at оставшихся рецептов, но сдвигает
+        # Last-Modified списка
+        path = '/api/recipes/'
+        with mock.patch('api.cache.get_timestamp') as get_timestamp:
+            get_timestamp.return_value = 1_700_000_000_000
+            response = self.anonymous_client.get(path)
+            etag = response['ETag']
+            last_modified = response['Last-Modified']
+            get_timestamp.return_value += 2000
+            with self.captureOnCommitCallbacks(execute=True):
+                self.recipes[0].delete()
+            response = self.anonymous_client.get(
+                path, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['count'], self.recipes_count - 1)
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertNotEqual(response['Last-Modified'], last_modified)
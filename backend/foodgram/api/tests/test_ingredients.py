@@ -0,0 +1,52 @@
+from django.test import TestCase, override_settings
+
+from api.tests.utils import APITestMixin
+from recipes.models import Measurement
+
+NAMES = ('сахар', 'сахарная пудра', 'ванильный сахар', 'соль', 'Сало')
+
+
+class IngredientSearchTest(APITestMixin, TestCase):
+    recipes_count = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Measurement.objects.bulk_create(
+            Measurement(name=name, measurement_unit='г') for name in NAMES
+        )
+
+    def get_names(self, query):
+        response = self.anonymous_client.get(f'/api/ingredients/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_prefix_matches_before_contains_matches(self):
+        self.assertEqual(
+            self.get_names('?name=сах'),
+            ['сахар', 'сахарная пудра', 'ванильный сахар']
+        )
+
+    def test_ordering(self):
+        self.assertEqual(
+            self.get_names('?name=са&ordering=name'),
+            ['Сало', 'ванильный сахар', 'сахар', 'сахарная пудра']
+        )
+        self.assertEqual(
+            self.get_names('?name=са&ordering=-name'),
+            ['сахарная пудра', 'сахар', 'ванильный сахар', 'Сало']
+        )
+
+    @override_settings(INGREDIENT_SEARCH_LIMIT=2)
+    def test_limit_applies_after_ordering(self):
+        self.assertEqual(
+            self.get_names('?name=са&ordering=-name'),
+            ['сахарная пудра', 'сахар']
+        )
+
+    def test_index_rebuilt_after_change(self):
+        self.assertEqual(self.get_names('?name=соль'), ['соль'])
+        Measurement.objects.create(name='соль морская', measurement_unit='г')
+        self.assertEqual(
+            self.get_names('?name=соль'), ['соль', 'соль морская']
+        )
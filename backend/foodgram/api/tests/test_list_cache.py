@@ -0,0 +1,62 @@
+from django.test import TestCase
+
+from api.tests.utils import APITestMixin
+from organizer.counters import reconcile_counter
+from organizer.models import Favorite
+from recipes.models import Recipe
+
+POPULAR_PATH = '/api/recipes/?ordering=-favorites_count'
+
+
+class AnonymousListCacheTest(APITestMixin, TestCase):
+    """Закешированные страницы списка рецептов сбрасываются, когда меняются
+    данные, которые в них входят.
+    """
+    recipes_count = 2
+
+    def get_cache_status(self, path='/api/recipes/'):
+        response = self.anonymous_client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache']
+
+    def assert_cache_status(self, change, expected):
+        self.get_cache_status()
+        self.get_cache_status(POPULAR_PATH)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertEqual(
+            (self.get_cache_status(), self.get_cache_status(POPULAR_PATH)),
+            expected
+        )
+
+    def test_author_change(self):
+        def rename_author():
+            self.author.last_name = 'Новая фамилия'
+            self.author.save()
+
+        self.assert_cache_status(rename_author, ('MISS', 'MISS'))
+
+    def test_author_login(self):
+        self.assert_cache_status(
+            lambda: self.author.save(update_fields=['last_login']),
+            ('HIT', 'HIT')
+        )
+
+    def test_favorite(self):
+        self.assert_cache_status(
+            lambda: Favorite.objects.create(
+                user=self.user, recipe=self.recipes[0]
+            ),
+            ('HIT', 'MISS')
+        )
+
+    def test_reconcile_counter(self):
+        recipe = self.recipes[0]
+
+        def reconcile():
+            Recipe.objects.filter(pk=recipe.pk).update(favorites_count=5)
+            reconcile_counter(
+                Recipe, 'favorites_count', Favorite, 'recipe', [recipe.pk]
+            )
+
+        self.assert_cache_status(reconcile, ('HIT', 'MISS'))
@@ -0,0 +1,57 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from api.tests.utils import APITestMixin
+from tasks.models import Task
+
+
+class CountTest(APITestMixin, TestCase):
+    """Количество объектов постраничных списков."""
+    recipes_count = 3
+
+    def get_page(self, client, path):
+        response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_exact_count(self):
+        data = self.get_page(self.anonymous_client, '/api/recipes/')
+        self.assertEqual(data['count'], self.recipes_count)
+        self.assertNotIn('count_is_approximate', data)
+
+    @skipUnless(connection.vendor == 'postgresql', 'нужен PostgreSQL')
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1)
+    def test_estimated_count(self):
+        with connection.cursor() as cursor:
+            # ANALYZE учитывает строки, добавленные в текущей транзакции
+            cursor.execute('ANALYZE recipes_recipe')
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                "WHERE oid = 'recipes_recipe'::regclass"
+            )
+            estimated_count = cursor.fetchone()[0]
+        data = self.get_page(self.anonymous_client, '/api/recipes/')
+        self.assertEqual(data['count'], estimated_count)
+        self.assertIs(data['count_is_approximate'], True)
+        # список с фильтром считается точно
+        data = self.get_page(
+            self.anonymous_client, f'/api/recipes/?author={self.author.id}'
+        )
+        self.assertEqual(data['count'], self.recipes_count)
+        self.assertNotIn('count_is_approximate', data)
+
+    def test_task_count_not_cached(self):
+        self.assertEqual(
+            self.get_page(self.user_client, '/api/tasks/')['count'], 0
+        )
+        task = Task.objects.create(name='test', user=self.user)
+        self.assertEqual(
+            self.get_page(self.user_client, '/api/tasks/')['count'], 1
+        )
+        # статус меняется через update(), как в run_workers
+        Task.objects.filter(pk=task.pk).update(status=Task.SUCCEEDED)
+        self.assertEqual(self.get_page(
+            self.user_client, f'/api/tasks/?status={Task.PENDING}'
+        )['count'], 0)
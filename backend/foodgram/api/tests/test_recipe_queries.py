@@ -0,0 +1,77 @@
+from django.db import connection
+from django.test import TestCase
+
+from api.tests.utils import APITestMixin
+from organizer.models import Favorite, ShoppingCart, Subscription
+
+# запросы списка: количество, страница, тэги, ингредиенты (ETag списка
+# читается из кеша); в PostgreSQL перед COUNT читается оценка числа строк
+# из pg_class
+COUNT_QUERIES = 2 if connection.vendor == 'postgresql' else 1
+ANONYMOUS_LIST_QUERIES = 3 + COUNT_QUERIES
+USER_LIST_QUERIES = 3 + COUNT_QUERIES
+ANONYMOUS_DETAIL_QUERIES = 4
+USER_DETAIL_QUERIES = 4
+
+
+class RecipeQueriesTest(APITestMixin, TestCase):
+    """Число запросов к базе для списка и рецепта постоянно и не зависит
+    от количества рецептов на странице.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # самый новый рецепт - первый в списке
+        cls.recipe = recipe = cls.recipes[-1]
+        Favorite.objects.create(user=cls.user, recipe=recipe)
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscription.objects.create(user=cls.user, author=cls.author)
+
+    def assert_list_queries(self, client, expected):
+        for limit in (2, self.recipes_count):
+            # без кеша анонимных страниц и количества объектов:
+            self.setUp()
+            with self.assertNumQueries(expected):
+                response = client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous_list(self):
+        self.assert_list_queries(self.anonymous_client, ANONYMOUS_LIST_QUERIES)
+
+    def test_user_list(self):
+        self.assert_list_queries(self.user_client, USER_LIST_QUERIES)
+
+    def test_anonymous_detail(self):
+        with self.assertNumQueries(ANONYMOUS_DETAIL_QUERIES):
+            response = self.anonymous_client.get(
+                f'/api/recipes/{self.recipe.id}/'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_favorited'])
+        self.assertFalse(response.data['author']['is_subscribed'])
+
+    def test_user_detail(self):
+        with self.assertNumQueries(USER_DETAIL_QUERIES):
+            response = self.user_client.get(
+                f'/api/recipes/{self.recipe.id}/'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+        self.assertTrue(response.data['is_in_shopping_cart'])
+        self.assertTrue(response.data['author']['is_subscribed'])
+        self.assertEqual(len(response.data['tags']), len(self.tags))
+        self.assertEqual(
+            len(response.data['ingredients']), len(self.measurements)
+        )
+
+    def test_user_list_flags(self):
+        response = self.user_client.get('/api/recipes/')
+        flags = {
+            recipe['id']: (recipe['is_favorited'],
+                           recipe['is_in_shopping_cart'])
+            for recipe in response.data['results']
+        }
+        self.assertEqual(flags.pop(self.recipe.id), (True, True))
+        self.assertEqual(set(flags.values()), {(False, False)})
@@ -0,0 +1,43 @@
+import json
+import logging
+
+from django.test import TestCase, override_settings
+
+from api.tests.utils import APITestMixin
+
+PATH = '/api/tags/'
+
+
+@override_settings(
+    SLOW_REQUEST_MS=10000, SLOW_REQUEST_QUERIES=100,
+    REPEATED_QUERY_THRESHOLD=100
+)
+class RequestLogTest(APITestMixin, TestCase):
+    """Уровень строк журнала foodgram.requests: обычные запросы - DEBUG,
+    долгие - INFO, с большим числом запросов к базе - WARNING.
+    """
+    recipes_count = 0
+
+    def get_record(self):
+        with self.assertLogs('foodgram.requests', 'DEBUG') as logs:
+            self.user_client.get(PATH)
+        record, = logs.records
+        return record.levelno, json.loads(record.getMessage())
+
+    def test_fast_request(self):
+        level, record = self.get_record()
+        self.assertEqual(level, logging.DEBUG)
+        self.assertEqual(record['path'], PATH)
+        self.assertNotIn('top_queries', record)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request(self):
+        level, record = self.get_record()
+        self.assertEqual(level, logging.INFO)
+        self.assertNotIn('top_queries', record)
+
+    @override_settings(SLOW_REQUEST_QUERIES=1)
+    def test_many_queries(self):
+        level, record = self.get_record()
+        self.assertEqual(level, logging.WARNING)
+        self.assertTrue(record['top_queries'])
@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+from api.tests.utils import APITestMixin
+from recipes.models import Measurement, Recipe, RecipeIngredient
+
+
+class RecipeSearchTest(APITestMixin, TestCase):
+    """Полнотекстовый поиск ?search= в той СУБД, на которой идут тесты."""
+    recipes_count = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        potato = Measurement.objects.create(
+            name='картофель', measurement_unit='г'
+        )
+        # поисковый индекс обновляется после фиксации транзакции:
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.mashed = Recipe.objects.create(
+                author=cls.author, name='Пюре', text='Варить долго.',
+                cooking_time=30, image='recipes/test.png'
+            )
+            RecipeIngredient.objects.create(
+                recipe=cls.mashed, measurement=potato, amount=500
+            )
+            cls.mashed.save()
+            cls.soup = Recipe.objects.create(
+                author=cls.author, name='Картофельный суп',
+                text='Добавить пюре в конце.', cooking_time=40,
+                image='recipes/test.png'
+            )
+
+    def search(self, query):
+        response = self.anonymous_client.get(
+            '/api/recipes/', {'search': query}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_before_text(self):
+        self.assertEqual(self.search('пюре'), [self.mashed.id, self.soup.id])
+
+    def test_ingredient(self):
+        self.assertIn(self.mashed.id, self.search('картофель'))
+
+    def test_no_match(self):
+        self.assertEqual(self.search('рыба'), [])
@@ -0,0 +1,53 @@
+from django.test import TestCase
+
+from api.tests.utils import APITestMixin, create_recipes
+from recipes.models import Tag
+
+
+class TagsFilterTest(APITestMixin, TestCase):
+    """Фильтр ?tags= по slug тэгов."""
+    recipes_count = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.first_tag_recipes = create_recipes(
+            cls.user, 1, cls.tags[:1], cls.measurements
+        )
+        cls.empty_tag = Tag.objects.create(
+            name='Без рецептов', slug='empty', color='#FFFFFF'
+        )
+
+    def get_ids(self, query):
+        response = self.anonymous_client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_tags(self):
+        all_ids = {recipe.id for recipe in self.recipes}
+        first_ids = {recipe.id for recipe in self.first_tag_recipes}
+        self.assertEqual(self.get_ids('tags=tag1'), all_ids)
+        self.assertEqual(self.get_ids('tags=tag0'), all_ids | first_ids)
+        # рецепт с обоими тэгами выводится один раз
+        response = self.anonymous_client.get(
+            '/api/recipes/?tags=tag0&tags=tag1'
+        )
+        self.assertEqual(response.data['count'], len(all_ids | first_ids))
+
+    def test_tag_without_recipes(self):
+        self.assertEqual(self.get_ids('tags=empty'), set())
+
+    def test_unknown_tag(self):
+        response = self.anonymous_client.get(
+            '/api/recipes/?tags=tag0&tags=unknown'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.data)
+
+    def test_tag_created_in_other_process(self):
+        self.get_ids('tags=tag0')
+        # bulk_create не отправляет сигналов, индекс тэгов не сброшен
+        Tag.objects.bulk_create([
+            Tag(name='Новый', slug='new', color='#FFFFFE')
+        ])
+        self.assertEqual(self.get_ids('tags=new'), set())
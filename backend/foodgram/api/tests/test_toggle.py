@@ -0,0 +1,51 @@
+from django.test import TestCase
+
+from api.tests.utils import APITestMixin
+from organizer.models import Favorite, ShoppingCart
+from organizer.utils import add_user_recipes
+
+# добавление в избранное: рецепт, INSERT, счётчик favorites_count;
+# повторное добавление: рецепт и INSERT, не добавивший строку
+FAVORITE_ADD_QUERIES = 3
+FAVORITE_EXISTS_QUERIES = 2
+
+
+class ToggleTest(APITestMixin, TestCase):
+    """Добавление записи одним INSERT ... ON CONFLICT DO NOTHING: результат
+    определяется по числу добавленных строк, без предварительного SELECT.
+    """
+    recipes_count = 3
+
+    def test_favorite(self):
+        recipe = self.recipes[0]
+        path = f'/api/recipes/{recipe.id}/favorite/'
+        with self.assertNumQueries(FAVORITE_ADD_QUERIES):
+            response = self.user_client.get(path)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(FAVORITE_EXISTS_QUERIES):
+            response = self.user_client.get(path)
+        self.assertEqual(response.status_code, 400)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(
+            Favorite.objects.filter(user=self.user, recipe=recipe).count(), 1
+        )
+
+    def test_add_user_recipes(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        for model in (Favorite, ShoppingCart):
+            with self.subTest(model=model.__name__):
+                with self.assertNumQueries(1):
+                    added = add_user_recipes(model, self.user, recipe_ids)
+                expected = recipe_ids
+                if model is ShoppingCart:
+                    expected = [recipe_ids[0], recipe_ids[2]]
+                self.assertEqual(added, expected)
+                self.assertEqual(
+                    add_user_recipes(model, self.user, recipe_ids), []
+                )
+                self.assertEqual(
+                    model.objects.filter(user=self.user).count(),
+                    len(recipe_ids)
+                )
@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from api.tests.utils import APITestMixin
+from organizer.models import Subscription
+
+USER_FIELDS = {
+    'email', 'id', 'username', 'first_name', 'last_name', 'is_subscribed'
+}
+
+
+class UserFieldsTest(APITestMixin, TestCase):
+    """Счётчики recipes_count и followers_count пользователя - внутренние:
+    в ответах их нет, кроме recipes_count в списке подписок.
+    """
+    recipes_count = 2
+
+    def test_user_fields(self):
+        response = self.user_client.get(f'/api/users/{self.author.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), USER_FIELDS)
+
+    def test_recipe_author_fields(self):
+        response = self.anonymous_client.get(
+            f'/api/recipes/{self.recipes[0].id}/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['author']), USER_FIELDS)
+
+    def test_subscriptions_recipes_count(self):
+        Subscription.objects.create(user=self.user, author=self.author)
+        response = self.user_client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 200)
+        subscription = response.data['results'][0]
+        self.assertEqual(subscription['recipes_count'], self.recipes_count)
+        self.assertNotIn('followers_count', subscription)
@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from recipes.index import measurement_index, tag_index
+from recipes.models import Measurement, Recipe, RecipeIngredient, Tag
+from users.authentication import token_cache
+from users.models import User
+
+PASSWORD = 'Test-Passw0rd'
+
+
+def create_user(number, **kwargs):
+    return User.objects.create_user(
+        username=f'user{number}',
+        email=f'user{number}@example.com',
+        first_name=f'Имя{number}',
+        last_name=f'Фамилия{number}',
+        password=PASSWORD,
+        **kwargs
+    )
+
+
+def create_recipes(author, count, tags, measurements):
+    recipes = []
+    for number in range(count):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {number}',
+            text=f'Текст рецепта {number}',
+            cooking_time=10,
+            image='recipes/test.png'
+        )
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, measurement=measurement, amount=1)
+            for measurement in measurements
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+class APITestMixin:
+    """Пользователи, тэги, компоненты и рецепты для тестов API; кеши
+    процесса очищаются перед каждым тестом.
+    """
+    recipes_count = 8
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+        cls.author = create_user(2)
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тэг {number}', slug=f'tag{number}',
+                color=f'#00000{number}'
+            )
+            for number in range(2)
+        ]
+        cls.measurements = [
+            Measurement.objects.create(
+                name=f'Компонент {number}', measurement_unit='г'
+            )
+            for number in range(3)
+        ]
+        cls.recipes = create_recipes(
+            cls.author, cls.recipes_count, cls.tags, cls.measurements
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        token_cache.clear()
+        measurement_index.invalidate()
+        tag_index.invalidate()
+        self.anonymous_client = APIClient()
+        self.user_client = APIClient()
+        self.user_client.force_authenticate(self.user)
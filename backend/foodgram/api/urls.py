@@ -3,7 +3,8 @@ from rest_framework import routers
 
 from api.views import (FavoriteViewSet, MeasurementViewSet, RecipeViewSet,
                        ShoppingCartViewSet, SubscriptionViewSet, TagViewSet,
-                       UserViewSet, download_shopping_cart, set_password)
+                       TaskViewSet, UserViewSet, download_shopping_cart,
+                       set_password)
 
 router = routers.DefaultRouter()
 
@@ -15,6 +16,7 @@ router.register('users', UserViewSet, basename='users')
 router.register('users', SubscriptionViewSet, basename='subscriptions')
 
 router.register('ingredients', MeasurementViewSet, basename='ingredients')
+router.register('tasks', TaskViewSet, basename='tasks')
 
 urlpatterns = [
     path(
@@ -1,22 +1,123 @@
-from django.shortcuts import get_object_or_404
+import csv
+import json
 
-from recipes.models import Ingredient, Measurement
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+
+from recipes.models import Recipe, RecipeIngredient
 
 AMOUNT_ERROR_MESSAGE = ('Количество ингредиента укажите числом с точкой в '
                         'качестве разделителя десятичной части.')
+SHOPPING_CART_CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
 
+def normalize_amount(amount):
+    normalized = amount.normalize()
+    sign, digit, exponent = normalized.as_tuple()
+    if exponent <= 0:
+        return normalized
+    return normalized.quantize(1)
 
-def get_ingredients_objects(initial_ingredients_list):
-    ingredients_objects = []
-    for ingredient_dict in initial_ingredients_list:
-        measurement_id = ingredient_dict.get('id')
-        measurement_object = get_object_or_404(Measurement, id=measurement_id)
-        amount = ingredient_dict.get('amount')
-        ingredient_object, created = Ingredient.objects.get_or_create(
-            measurement=measurement_object, amount=amount
+
+def shopping_cart_txt(ingredients):
+    separator = ''
+    for ingredient in ingredients:
+        yield (
+            f"{separator}{ingredient.get('measurement__name')} "
+            f"({ingredient.get('measurement__measurement_unit')})"
+            f"\t{normalize_amount(ingredient.get('amount'))}"
+        )
+        separator = '\n'
+
+
+def shopping_cart_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(SHOPPING_CART_CSV_HEADER)
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient.get('measurement__name'),
+            ingredient.get('measurement__measurement_unit'),
+            normalize_amount(ingredient.get('amount'))
+        ))
+
+
+def shopping_cart_json(ingredients):
+    separator = ''
+    yield '['
+    for ingredient in ingredients:
+        amount = normalize_amount(ingredient.get('amount'))
+        item = json.dumps({
+            'name': ingredient.get('measurement__name'),
+            'measurement_unit': ingredient.get(
+                'measurement__measurement_unit'
+            ),
+            'amount': (int(amount) if amount == amount.to_integral_value()
+                       else float(amount))
+        }, ensure_ascii=False)
+        yield f'{separator}{item}'
+        separator = ','
+    yield ']'
+
+
+SHOPPING_CART_FORMATS = {
+    'txt': shopping_cart_txt,
+    'csv': shopping_cart_csv,
+    'json': shopping_cart_json,
+}
+
+
+def get_ingredients_prefetch():
+    return Prefetch(
+        'recipe_ingredients',
+        queryset=RecipeIngredient.objects.select_related('measurement')
+    )
+
+
+def create_recipe_ingredients(recipe, initial_ingredients_list):
+    # объекты Measurement получены при валидации,
+    # поэтому все строки сохраняются одним INSERT:
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            measurement=ingredient_dict.get('measurement'),
+            amount=ingredient_dict.get('amount')
         )
-        ingredients_objects += [ingredient_object]
-    return ingredients_objects
+        for ingredient_dict in initial_ingredients_list
+    )
+
+
+def get_recipes_preview(author_ids, recipes_limit=None):
+    """Возвращает словарь {id автора: список его последних рецептов}.
+    Рецепты всех авторов загружаются одним запросом; ограничение
+    recipes_limit применяется к каждому автору через ROW_NUMBER().
+    """
+    recipes = Recipe.objects.filter(author__in=author_ids)
+    if recipes_limit:
+        recipes = recipes.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author')],
+                order_by=F('id').desc()
+            )
+        ).order_by()
+        # фильтровать по оконной функции можно только во внешнем запросе:
+        sql, params = recipes.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) AS preview '
+            f'WHERE preview.row_number <= %s ORDER BY preview.id DESC',
+            (*params, recipes_limit)
+        )
+    preview = {author_id: [] for author_id in author_ids}
+    for recipe in recipes:
+        preview[recipe.author_id].append(recipe)
+    return preview
 
 
 def get_integer_list(parameter_list, parameter_name):
@@ -61,26 +162,32 @@ def get_unnatural(id_list):
         try:
             if int(value) <= 0:
                 not_natural.append(value)
-        except ValueError:
+        except (TypeError, ValueError):
             not_natural.append(value)
     return not_natural
 
 
-def check_id_list(object_class, id_list):
-    errors = []
+def check_id_list(id_list):
     unnatural = get_unnatural(id_list)
     if unnatural:
-        errors.append(f'{unnatural} - должны быть натуральными числами.')
-    natural = set(id_list) - set(unnatural)
-    if natural:
-        not_exists = []
-        for object_id in natural:
-            # проверка наличия в базе:
-            if not object_class.objects.filter(pk=object_id).exists():
-                not_exists.append(object_id)
-        if not_exists:
-            errors.append(f'{not_exists} - не существует.')
-    return errors
+        return [f'{unnatural} - должны быть натуральными числами.']
+    return []
+
+
+def get_objects_by_id(object_class, id_list):
+    """Возвращает словарь {id: объект} и список ошибок. Все объекты
+    загружаются одним запросом WHERE id IN (...).
+    """
+    errors = check_id_list(id_list)
+    unnatural = get_unnatural(id_list)
+    natural = {
+        int(object_id) for object_id in id_list if object_id not in unnatural
+    }
+    objects = object_class.objects.in_bulk(natural) if natural else {}
+    not_exists = sorted(natural - set(objects))
+    if not_exists:
+        errors.append(f'{not_exists} - не существует.')
+    return objects, errors
 
 
 def check_amount_list(amount_list):
@@ -100,6 +207,8 @@ def check_amount_list(amount_list):
 
 
 def check_ingredients_data(initial_ingredients_list):
+    # наличие ингредиентов в базе проверяется отдельно, сразу для всего
+    # рецепта (см. get_objects_by_id):
     errors = {}
     measurement_list = []
     amount_list = []
@@ -107,7 +216,7 @@ def check_ingredients_data(initial_ingredients_list):
         measurement_list.append(ingredient.get('id'))
         amount_list.append(ingredient.get('amount'))
 
-    measurement_errors = check_id_list(Measurement, measurement_list)
+    measurement_errors = check_id_list(measurement_list)
     amount_errors = check_amount_list(amount_list)
     if measurement_errors:
         errors['id'] = measurement_errors
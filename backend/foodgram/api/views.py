@@ -1,26 +1,41 @@
-from io import StringIO
-from wsgiref.util import FileWrapper
+from operator import itemgetter
 
-from django.contrib.auth.hashers import make_password
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       renderer_classes)
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from api.filters import IngredientFilter, RecipeFilter
+from api.cache import (get_last_modified, get_list_generations, get_stats,
+                       get_user_generation)
+from api.filters import IngredientFilter, RecipeFilter, RecipeSearchFilter
+from api.mixins import (AnonymousListCacheMixin, BulkRecipesMixin,
+                        ConditionalGetMixin, OrganizerMixin)
 from api.pagination import CustomPagination
+from api.renderers import CSVRenderer, PlainTextRenderer
 from api.serializers import (FavoriteSerializer, MeasurementSerializer,
                              RecipeSerializer, ShoppingCartSerializer,
                              ShortRecipeSerializer, SubscriptionSerializer,
-                             TagSerializer, UserPasswordSerializer,
-                             UserSerializer)
-from api.utils import check_recipes_limit, get_object_if_exists
-from organizer.models import Favorite, ShoppingCart, Subscription
-from recipes.models import Ingredient, Measurement, Recipe, Tag
+                             TagSerializer, TaskSerializer,
+                             UserPasswordSerializer, UserSerializer)
+from api.utils import (SHOPPING_CART_FORMATS, check_recipes_limit,
+                       get_ingredients_prefetch, get_object_if_exists,
+                       get_recipes_preview)
+from organizer.counters import change_counters
+from organizer.models import (Favorite, ShoppingCart, ShoppingListItem,
+                              Subscription)
+from organizer.utils import (add_recipes_to_shopping_list,
+                             remove_recipes_from_shopping_list)
+from recipes.index import measurement_index
+from recipes.models import Measurement, Recipe, Tag
+from tasks.models import Task
+from tasks.queue import get_stats as get_task_stats
 from users.models import User
 from users.permissions import (OrganizerOwner, RecipeAuthorOrReadOnly,
                                UserPermissions)
@@ -28,12 +43,19 @@ from users.permissions import (OrganizerOwner, RecipeAuthorOrReadOnly,
 RECIPES_LIMIT_ERROR_MESSAGE = ("Ошибка: в параметре запроса 'recipes_limit' "
                                "должно быть указано целое неотрицательное "
                                "число.")
-UNKNOWN_REQUEST = {'errors': 'Неизвестный или неразрешенный запрос.'}
+SHOPPING_CART_CHUNK_SIZE = 500
 
 
-class FavoriteViewSet(viewsets.ModelViewSet):
+class FavoriteViewSet(BulkRecipesMixin, viewsets.ModelViewSet):
     serializer_class = FavoriteSerializer
     queryset = Favorite.objects.all()
+    organizer_model = Favorite
+
+    def organizer_added(self, user, recipe_ids):
+        change_counters(Recipe, recipe_ids, 'favorites_count', 1)
+
+    def organizer_removed(self, user, recipe_ids):
+        change_counters(Recipe, recipe_ids, 'favorites_count', -1)
 
     @action(
         methods=['get', 'delete'],
@@ -44,50 +66,49 @@ class FavoriteViewSet(viewsets.ModelViewSet):
     def favorites(self, request, recipe_id):
         user = request.user
 
+        if request.method == 'DELETE':
+            if not self.remove_organizer_object(user, recipe_id):
+                return Response(
+                    {
+                        'errors': 'Ошибка удаления. '
+                        'Этого рецепта нет в избранном.'
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(
+                'Рецепт успешно удалён из избранного.',
+                status=status.HTTP_204_NO_CONTENT
+            )
+
         recipe = get_object_if_exists(Recipe, recipe_id)
         error_message = recipe.get('error_message')
         if error_message:
             return Response(error_message, status=status.HTTP_404_NOT_FOUND)
         recipe = recipe.get('object')
 
-        is_favorites_exists = Favorite.objects.filter(
-            user=user, recipe=recipe
-        ).exists()
-
-        if request.method == 'GET' and is_favorites_exists:
+        if not self.add_organizer_object(user, recipe.id):
             return Response(
                 {
                     'errors': 'Этот рецепт уже есть в избранном.',
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
-        elif request.method == 'GET':
-            Favorite.objects.create(user=user, recipe=recipe)
-            serializer = ShortRecipeSerializer(recipe)
-            return Response(serializer.data)
+        serializer = ShortRecipeSerializer(
+            recipe, context={'request': request}
+        )
+        return Response(serializer.data)
 
-        elif request.method == 'DELETE' and not is_favorites_exists:
-            return Response(
-                {
-                    'errors': 'Ошибка удаления. '
-                    'Этого рецепта нет в избранном.'
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        elif request.method == 'DELETE':
-            Favorite.objects.get(user=user, recipe=recipe).delete()
-            return Response(
-                'Рецепт успешно удалён из избранного.',
-                status=status.HTTP_204_NO_CONTENT
-            )
-        else:
-            return Response(
-                UNKNOWN_REQUEST,
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    @action(
+        methods=['post', 'delete'],
+        url_path='favorite/bulk',
+        permission_classes=[OrganizerOwner],
+        detail=False
+    )
+    def bulk_favorites(self, request):
+        return self.bulk_response(request)
 
 
-class MeasurementViewSet(viewsets.ModelViewSet):
+class MeasurementViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Measurement.objects.all()
     serializer_class = MeasurementSerializer
     filter_backends = (
@@ -97,18 +118,107 @@ class MeasurementViewSet(viewsets.ModelViewSet):
     ordering_fields = ('name',)
     pagination_class = None
 
+    def get_validators(self, request):
+        if self.action == 'list':
+            return (
+                (measurement_index.version,), measurement_index.last_modified
+            )
+        return super().get_validators(request)
+
+    def list(self, request):
+        return self.conditional_response(request, self.search)
+
+    def search(self, request):
+        # поиск выполняется по индексу в памяти, без запросов к базе:
+        name = request.query_params.get(IngredientFilter.search_param, '')
+        ordering = request.query_params.get(
+            filters.OrderingFilter.ordering_param, ''
+        )
+        if ordering.lstrip('-') not in self.ordering_fields:
+            return Response(measurement_index.search(
+                name, settings.INGREDIENT_SEARCH_LIMIT
+            ))
+        # ?ordering=name или -name: сортируются все найденные компоненты,
+        # затем из них берутся первые INGREDIENT_SEARCH_LIMIT
+        items = sorted(
+            measurement_index.search(name),
+            key=itemgetter(ordering.lstrip('-')),
+            reverse=ordering.startswith('-')
+        )
+        return Response(items[:settings.INGREDIENT_SEARCH_LIMIT])
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+
+class RecipeViewSet(ConditionalGetMixin, AnonymousListCacheMixin,
+                    viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     pagination_class = CustomPagination
     permission_classes = (RecipeAuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter,
-                       filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter,
+                       filters.OrderingFilter)
     filter_class = RecipeFilter
     filterset_fields = ('tags', 'author')
-    ordering_fields = ('name',)
-    search_fields = ('ingredients',)
+    ordering_fields = ('name', 'favorites_count')
+    # количество рецептов зависит от пользователя только при этих фильтрах:
+    count_user_filters = ('is_favorited', 'is_in_shopping_cart')
+
+    def get_queryset(self):
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            'tags', get_ingredients_prefetch()
+        )
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                is_subscribed=Value(False)
+            )
+        # флаги для текущего пользователя вычисляются в том же запросе,
+        # что и список рецептов:
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_subscribed=Exists(Subscription.objects.filter(
+                user=user, author=OuterRef('author')
+            ))
+        )
+
+    def get_validators(self, request):
+        # флаги is_favorited, is_in_shopping_cart и is_subscribed зависят от
+        # пользователя, у их записей нет даты изменения, поэтому
+        # пользователю Last-Modified не передаётся, только ETag
+        user = request.user
+        if self.action == 'retrieve':
+            version = self.get_queryset().filter(
+                pk=self.kwargs.get('pk')
+            ).values(
+                'updated_at', 'is_favorited', 'is_in_shopping_cart',
+                'is_subscribed'
+            ).first() or {}
+            etag_parts = (user.id, *sorted(version.items()))
+            if user.is_authenticated:
+                return etag_parts, None
+            return etag_parts, version.get('updated_at')
+        # версия списка читается из кеша, без запросов к базе: поколения
+        # меняются сигналами api.signals при любом изменении рецептов, в том
+        # числе при удалении, и при изменении избранного, корзины и подписок
+        # пользователя
+        generations = get_list_generations(request.query_params)
+        if user.is_authenticated:
+            return (user.id, *generations, get_user_generation(user.id)), None
+        return (None, *generations), get_last_modified(*generations)
+
+    @action(
+        methods=['get'],
+        url_path='cache_stats',
+        permission_classes=[IsAdminUser],
+        detail=False
+    )
+    def cache_stats(self, request):
+        return Response(get_stats())
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -117,11 +227,21 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
 
-class SubscriptionViewSet(viewsets.ModelViewSet):
+class SubscriptionViewSet(OrganizerMixin, viewsets.ModelViewSet):
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
     pagination_class = CustomPagination
     permission_classes = (OrganizerOwner,)
+    # порядок подписок в режиме ?cursor= совпадает с обычным списком:
+    cursor_ordering = 'id'
+    organizer_model = Subscription
+    organizer_field = 'author'
+
+    def organizer_added(self, user, author_ids):
+        change_counters(User, author_ids, 'followers_count', 1)
+
+    def organizer_removed(self, user, author_ids):
+        change_counters(User, author_ids, 'followers_count', -1)
 
     def list(self, request):
         context = super().get_serializer_context()
@@ -137,13 +257,21 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
 
         queryset = Subscription.objects.filter(
             user=request.user.id
-        ).select_related('author')
+        ).select_related('author').order_by('id')
 
         page = self.paginate_queryset(queryset)
         if page is not None:
+            context['recipes_preview'] = get_recipes_preview(
+                [subscription.author_id for subscription in page],
+                context.get('recipes_limit')
+            )
             serializer = self.get_serializer(page, context=context, many=True)
             return self.get_paginated_response(serializer.data)
 
+        context['recipes_preview'] = get_recipes_preview(
+            [subscription.author_id for subscription in queryset],
+            context.get('recipes_limit')
+        )
         serializer = self.get_serializer(queryset, context=context, many=True)
         return Response(serializer.data)
 
@@ -174,54 +302,43 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if request.method == 'DELETE':
+            if not self.remove_organizer_object(user, author_id):
+                return Response(
+                    {
+                        'errors': 'Ошибка удаления. '
+                        'Нет подписки на этого автора.'
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(
+                'Подписка успешно удалёна.',
+                status=status.HTTP_204_NO_CONTENT
+            )
+
         author = get_object_if_exists(User, author_id)
         error_message = author.get('error_message')
         if error_message:
             return Response(error_message, status=status.HTTP_404_NOT_FOUND)
         author = author.get('object')
 
-        is_subscription_exists = Subscription.objects.filter(
-            user=user, author=author
-        ).exists()
-
-        if request.method == 'GET' and is_subscription_exists:
+        if not self.add_organizer_object(user, author.id):
             return Response(
                 {
                     'errors': 'Вы уже подписаны на этого автора.',
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
-        elif request.method == 'GET':
-            subscription = Subscription.objects.create(
-                user=user, author=author
-            )
-            serializer = SubscriptionSerializer(
-                subscription, context=context
-            )
-            return Response(serializer.data)
-
-        elif request.method == 'DELETE' and not is_subscription_exists:
-            return Response(
-                {
-                    'errors': 'Ошибка удаления. '
-                    'Нет подписки на этого автора.'
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        elif request.method == 'DELETE':
-            Subscription.objects.get(user=user, author=author).delete()
-            return Response(
-                'Подписка успешно удалёна.',
-                status=status.HTTP_204_NO_CONTENT
-            )
-        else:
-            return Response(
-                UNKNOWN_REQUEST,
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        context['recipes_preview'] = get_recipes_preview(
+            [author.id], context.get('recipes_limit')
+        )
+        serializer = SubscriptionSerializer(
+            Subscription(user=user, author=author), context=context
+        )
+        return Response(serializer.data)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
@@ -230,6 +347,36 @@ class TagViewSet(viewsets.ModelViewSet):
     ordering_fields = ('name',)
 
 
+class TaskViewSet(viewsets.ReadOnlyModelViewSet):
+    """Статус фоновых задач: пользователь видит свои задачи,
+    администратор - все.
+    """
+    serializer_class = TaskSerializer
+    pagination_class = CustomPagination
+    permission_classes = (IsAuthenticated,)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_fields = ('status', 'name')
+    # задачи создаются и меняют статус в других процессах (run_workers,
+    # через update()), поэтому кеш количества в памяти процесса не
+    # сбросить; COUNT по задачам пользователя использует индекс
+    cache_count = False
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return Task.objects.all()
+        return Task.objects.filter(user=user)
+
+    @action(
+        methods=['get'],
+        url_path='stats',
+        permission_classes=[IsAdminUser],
+        detail=False
+    )
+    def stats(self, request):
+        return Response(get_task_stats())
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -251,9 +398,16 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ShoppingCartViewSet(viewsets.ModelViewSet):
+class ShoppingCartViewSet(BulkRecipesMixin, viewsets.ModelViewSet):
     queryset = ShoppingCart.objects.all()
     serializer_class = ShoppingCartSerializer
+    organizer_model = ShoppingCart
+
+    def organizer_added(self, user, recipe_ids):
+        add_recipes_to_shopping_list(user, recipe_ids)
+
+    def organizer_removed(self, user, recipe_ids):
+        remove_recipes_from_shopping_list(user, recipe_ids)
 
     @action(
         methods=['get', 'delete'],
@@ -263,6 +417,21 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, recipe_id):
         user = request.user
+
+        if request.method == 'DELETE':
+            if not self.remove_organizer_object(user, recipe_id):
+                return Response(
+                    {
+                        'errors': 'Ошибка удаления. '
+                        'Этого рецепта нет в списке покупок.'
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(
+                'Рецепт успешно удалён из списка покупок.',
+                status=status.HTTP_204_NO_CONTENT
+            )
+
         try:
             recipe = Recipe.objects.get(pk=recipe_id)
         except Recipe.DoesNotExist:
@@ -273,71 +442,52 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        is_shopping_cart_exists = ShoppingCart.objects.filter(
-            user=user, recipe=recipe
-        ).exists()
-
-        if request.method == 'GET' and is_shopping_cart_exists:
+        if not self.add_organizer_object(user, recipe.id):
             return Response(
                 {
                     'errors': 'Этот рецепт уже есть в списке покупок.',
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
-        elif request.method == 'GET':
-            ShoppingCart.objects.create(user=user, recipe=recipe)
-            serializer = ShortRecipeSerializer(recipe)
-            return Response(serializer.data)
+        serializer = ShortRecipeSerializer(
+            recipe, context={'request': request}
+        )
+        return Response(serializer.data)
 
-        elif request.method == 'DELETE' and not is_shopping_cart_exists:
-            return Response(
-                {
-                    'errors': 'Ошибка удаления. '
-                    'Этого рецепта нет в списке покупок.'
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        elif request.method == 'DELETE':
-            ShoppingCart.objects.get(user=user, recipe=recipe).delete()
-            return Response(
-                'Рецепт успешно удалён из списка покупок.',
-                status=status.HTTP_204_NO_CONTENT
-            )
-        else:
-            return Response(
-                UNKNOWN_REQUEST,
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    @action(
+        methods=['post', 'delete'],
+        url_path='shopping_cart/bulk',
+        permission_classes=[OrganizerOwner],
+        detail=False
+    )
+    def bulk_shopping_cart(self, request):
+        return self.bulk_response(request)
 
 
 @api_view(['GET'])
 @permission_classes([OrganizerOwner])
+@renderer_classes([PlainTextRenderer, CSVRenderer, JSONRenderer])
 def download_shopping_cart(request):
+    # формат файла выбирается параметром ?format=txt|csv|json
+    # (по умолчанию - txt)
     user = request.user
-
-    ingredients = Ingredient.objects.filter(
-        recipes__shopping_cart__user=user
-    ).values(
-        'measurement__name', 'measurement__measurement_unit'
-    ).annotate(amount=Sum('amount'))
-    ingredient_list = []
-    for ingredient in ingredients:
-        normalized = ingredient.get('amount').normalize()
-        sign, digit, exponent = normalized.as_tuple()
-        if exponent <= 0:
-            amount = normalized
-        else:
-            amount = normalized.quantize(1)
-
-        ingredient_list.append(
-            f"{ingredient.get('measurement__name')} "
-            f"({ingredient.get('measurement__measurement_unit')})"
-            f"\t{amount}"
-        )
-    data = '\n'.join(ingredient_list)
-    file_name = f'{user.username}_shopping_cart.txt'
-    file = StringIO(data)
-    response = HttpResponse(FileWrapper(file), content_type='text/plain')
+    renderer = request.accepted_renderer
+
+    # суммы по ингредиентам поддерживаются в ShoppingListItem при изменении
+    # корзины, поэтому здесь достаточно прочитать записи пользователя:
+    ingredients = ShoppingListItem.objects.filter(user=user).values(
+        'measurement__name', 'measurement__measurement_unit',
+        amount=F('total_amount')
+    ).order_by('measurement__name')
+    # строки файла формируются по мере чтения курсора, файл целиком
+    # в памяти не хранится:
+    lines = SHOPPING_CART_FORMATS[renderer.format](
+        ingredients.iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+    )
+    file_name = f'{user.username}_shopping_cart.{renderer.format}'
+    response = StreamingHttpResponse(
+        lines, content_type=f'{renderer.media_type}; charset=utf-8'
+    )
     response['Content-Disposition'] = f'attachment; filename={file_name}'
 
     return response
@@ -350,7 +500,9 @@ def set_password(request):
         data=request.data, context=request
     )
     serializer.is_valid(raise_exception=True)
-    User.objects.filter(pk=request.user.id).update(
-        password=make_password(request.data.get('new_password'))
-    )
+    # save() вместо update(): сигнал post_save удаляет пользователя из кеша
+    # токенов (users.authentication)
+    user = request.user
+    user.set_password(serializer.validated_data.get('new_password'))
+    user.save(update_fields=['password'])
     return Response('Пароль успешно изменён.')
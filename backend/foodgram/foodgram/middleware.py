@@ -0,0 +1,173 @@
+import json
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('foodgram.requests')
+
+# списки параметров IN (%s, %s, ...) разной длины и числа в тексте запроса
+# (LIMIT 21) не должны давать разные шаблоны одного запроса:
+PARAMETERS_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+NUMBER = re.compile(r'(?<![\w".])\d+(?![\w".])')
+
+
+def get_query_template(sql):
+    return NUMBER.sub('N', PARAMETERS_LIST.sub('%s, ...', sql))
+
+
+class RequestMetrics:
+    """Запросы к базе и время обработки одного HTTP-запроса."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.view_started_at = None
+        self.view_finished_at = None
+        self.finished_at = None
+        self.query_count = 0
+        self.db_time = 0
+        self.view_db_time = 0
+        # {шаблон запроса: [число выполнений, суммарное время]}
+        self.templates = defaultdict(lambda: [0, 0])
+
+    def __call__(self, execute, sql, params, many, context):
+        # обёртка connection.execute_wrapper
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started_at
+            self.query_count += 1
+            self.db_time += duration
+            if (self.view_started_at is not None
+                    and self.view_finished_at is None):
+                self.view_db_time += duration
+            template = self.templates[get_query_template(sql)]
+            template[0] += 1
+            template[1] += duration
+
+    @property
+    def total_time(self):
+        return self.finished_at - self.started_at
+
+    @property
+    def view_time(self):
+        if self.view_started_at is None:
+            return 0
+        return (
+            (self.view_finished_at or self.finished_at)
+            - self.view_started_at
+        )
+
+    @property
+    def render_time(self):
+        if self.view_finished_at is None:
+            return 0
+        return self.finished_at - self.view_finished_at
+
+    def get_repeated_queries(self):
+        """Шаблоны, выполненные не меньше REPEATED_QUERY_THRESHOLD раз за
+        запрос, - вероятно, запросы N+1.
+        """
+        return {
+            template: count
+            for template, (count, _) in self.templates.items()
+            if count >= settings.REPEATED_QUERY_THRESHOLD
+        }
+
+    def get_top_queries(self):
+        """Шаблоны с наибольшим суммарным временем."""
+        top = sorted(
+            self.templates.items(), key=lambda item: item[1][1], reverse=True
+        )[:settings.REQUEST_METRICS_TOP_QUERIES]
+        return [
+            {'sql': template, 'count': count, 'time': round(duration, 4)}
+            for template, (count, duration) in top
+        ]
+
+    def get_server_timing(self):
+        # время в Server-Timing указывается в миллисекундах; app - время
+        # представления без запросов к базе (в DRF - в основном
+        # сериализаторы), render - преобразование ответа в JSON/текст
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.query_count} queries"',
+            f'app;dur={(self.view_time - self.view_db_time) * 1000:.1f}',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ))
+
+
+class RequestMetricsMiddleware:
+    """Считает запросы к базе и время обработки каждого HTTP-запроса.
+
+    Результат передаётся в заголовке Server-Timing (SERVER_TIMING_HEADER)
+    и записывается строкой JSON в журнал foodgram.requests: с уровнем
+    DEBUG, для запросов дольше SLOW_REQUEST_MS - INFO. Если запросов
+    к базе не меньше SLOW_REQUEST_QUERIES или один шаблон запроса
+    повторяется REPEATED_QUERY_THRESHOLD раз, в журнал с уровнем WARNING
+    попадают самые долгие шаблоны запросов. Запросы, выполненные во время
+    передачи StreamingHttpResponse, не учитываются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+        metrics = request.metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        metrics.finished_at = time.perf_counter()
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = metrics.get_server_timing()
+        self.log(request, response, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.view_started_at = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # вызывается после представления, до преобразования ответа
+        # (response.render()) - для всех ответов DRF
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.view_finished_at = time.perf_counter()
+        return response
+
+    def log(self, request, response, metrics):
+        repeated = metrics.get_repeated_queries()
+        if repeated or metrics.query_count >= settings.SLOW_REQUEST_QUERIES:
+            level = logging.WARNING
+        elif metrics.total_time * 1000 >= settings.SLOW_REQUEST_MS:
+            level = logging.INFO
+        else:
+            level = logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+        resolver_match = request.resolver_match
+        record = {
+            'method': request.method,
+            'endpoint': resolver_match.route if resolver_match else None,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.query_count,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'view_ms': round(metrics.view_time * 1000, 1),
+            'render_ms': round(metrics.render_time * 1000, 1),
+            'total_ms': round(metrics.total_time * 1000, 1),
+        }
+        if repeated:
+            record['repeated_queries'] = repeated
+        if level == logging.WARNING:
+            record['top_queries'] = metrics.get_top_queries()
+        logger.log(level, json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+
+def get_estimated_count(model, threshold):
+    """Возвращает оценку числа строк таблицы модели по статистике
+    планировщика PostgreSQL (pg_class.reltuples) или None, если оценка
+    меньше threshold либо недоступна - тогда нужен точный COUNT(*).
+    """
+    if connection.vendor != 'postgresql' or not threshold:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    # до первого ANALYZE reltuples равен -1 (PostgreSQL 14+) или 0:
+    if row is None or row[0] < threshold:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для списков админки: для запроса без фильтров к большой
+    таблице (ESTIMATED_COUNT_THRESHOLD строк и больше) количество берётся
+    из статистики планировщика вместо COUNT(*) по всей таблице.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimated_count = get_estimated_count(
+                queryset.model, settings.ESTIMATED_COUNT_THRESHOLD
+            )
+            if estimated_count is not None:
+                return estimated_count
+        return super().count
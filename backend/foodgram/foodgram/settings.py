@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -19,6 +20,7 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'organizer.apps.OrganizerConfig',
     'recipes.apps.RecipesConfig',
+    'tasks.apps.TasksConfig',
     'users.apps.UsersConfig',
     'rest_framework',
     'rest_framework.authtoken',
@@ -27,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -103,6 +106,27 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# ограничения для изображений рецептов, передаваемых в base64: размер
+# файла в байтах и число пикселей (ширина * высота)
+MAX_IMAGE_SIZE = int(os.getenv('MAX_IMAGE_SIZE', 10 * 1024 * 1024))
+
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', 40_000_000))
+
+# уменьшенные копии изображений рецептов: наибольшая сторона в пикселях
+# для каждого размера и формат (WEBP или JPEG); создаются фоновой задачей
+IMAGE_VARIANT_SIZES = {
+    'thumbnail': 320,
+    'medium': 960,
+}
+
+IMAGE_VARIANT_FORMAT = os.getenv('IMAGE_VARIANT_FORMAT', 'WEBP')
+
+# время (с), в течение которого вариант, не найденный в хранилище, не
+# проверяется повторно: до этого в ответах API ссылка на оригинал
+IMAGE_VARIANT_RECHECK_INTERVAL = int(
+    os.getenv('IMAGE_VARIANT_RECHECK_INTERVAL', 30)
+)
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -116,8 +140,131 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
 }
+
+# автодополнение ингредиентов: максимальное число результатов и время (с),
+# через которое индекс названий перестраивается
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+# время (с), через которое перестраивается соответствие slug -> id тэгов
+TAG_INDEX_TTL = int(os.getenv('TAG_INDEX_TTL', 300))
+
+# кеш по умолчанию; без CACHE_BACKEND - кеш в памяти процесса. Для
+# нескольких процессов и серверов нужен общий кеш, например
+# django.core.cache.backends.memcached.PyMemcacheCache (CACHE_LOCATION -
+# адрес memcached) или django.core.cache.backends.db.DatabaseCache
+# (CACHE_LOCATION - имя таблицы, создаётся командой createcachetable)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# время (с) хранения в кеше страниц списка рецептов для анонимных
+# пользователей; используется кеш по умолчанию из CACHES
+RECIPES_CACHE_TIMEOUT = int(os.getenv('RECIPES_CACHE_TIMEOUT', 60))
+
+# время (с) хранения поколений кеша (api.cache), по которым сбрасываются
+# страницы списков и вычисляются ETag и Last-Modified списков; при кеше в
+# памяти процесса за это время становятся видны изменения, сделанные в
+# других процессах (0 - без ограничения, для общего кеша)
+CACHE_GENERATION_TIMEOUT = int(os.getenv('CACHE_GENERATION_TIMEOUT', 60))
+
+# наибольшее число рецептов в одном запросе к .../favorite/bulk/ и
+# .../shopping_cart/bulk/
+BULK_RECIPES_LIMIT = int(os.getenv('BULK_RECIPES_LIMIT', 100))
+
+# время (с) хранения в кеше количества объектов постраничных списков для
+# набора фильтров; для списков без фильтров, в таблице которых не меньше
+# ESTIMATED_COUNT_THRESHOLD строк, используется оценка планировщика
+# PostgreSQL (0 - всегда точный подсчёт)
+COUNT_CACHE_TIMEOUT = int(os.getenv('COUNT_CACHE_TIMEOUT', 30))
+
+ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ESTIMATED_COUNT_THRESHOLD', 100000))
+
+# кеш проверенных токенов в памяти процесса: наибольшее число записей и
+# время (с), через которое токен снова проверяется по базе (0 - кеш
+# отключён). Выход и изменения пользователя отмечаются в кеше из CACHES и
+# проверяются при каждом попадании; при кеше в памяти процесса (без общего
+# CACHES) выход в другом процессе становится виден только через
+# TOKEN_CACHE_TTL секунд
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 10))
+
+# проверка паролей при входе (хеширование намеренно медленное): число
+# одновременных проверок на сервере, во всех процессах (0 - без
+# ограничения), каталог файлов блокировок, общий для этих процессов, и
+# значение Retry-After (с) ответа 429, когда все места заняты
+PASSWORD_CHECK_CONCURRENCY = int(
+    os.getenv('PASSWORD_CHECK_CONCURRENCY', os.cpu_count() or 1)
+)
+
+PASSWORD_CHECK_LOCK_DIR = os.getenv(
+    'PASSWORD_CHECK_LOCK_DIR',
+    os.path.join(tempfile.gettempdir(), 'foodgram-password-check')
+)
+
+PASSWORD_CHECK_RETRY_AFTER = int(os.getenv('PASSWORD_CHECK_RETRY_AFTER', 1))
+
+# очередь фоновых задач (команда run_workers): число процессов, время (с),
+# после которого выполняемая задача считается прерванной, задержка (с)
+# перед первым повтором задачи и наибольшая задержка, срок (дни) хранения
+# завершённых задач
+TASK_WORKERS = int(os.getenv('TASK_WORKERS', 2))
+
+TASK_TIMEOUT = int(os.getenv('TASK_TIMEOUT', 600))
+
+TASK_RETRY_DELAY = int(os.getenv('TASK_RETRY_DELAY', 10))
+
+TASK_MAX_RETRY_DELAY = int(os.getenv('TASK_MAX_RETRY_DELAY', 3600))
+
+TASK_RESULT_DAYS = int(os.getenv('TASK_RESULT_DAYS', 7))
+
+# учёт запросов к базе и времени обработки HTTP-запросов
+# (foodgram.middleware.RequestMetricsMiddleware): заголовок Server-Timing,
+# время (мс), начиная с которого запрос записывается в журнал с уровнем
+# INFO (остальные - DEBUG), число запросов к базе и число повторений одного
+# шаблона запроса (N+1), начиная с которых в журнал с уровнем WARNING
+# пишутся самые долгие шаблоны, и их количество
+REQUEST_METRICS_ENABLED = (
+    os.getenv('REQUEST_METRICS_ENABLED', 'true').lower() == 'true'
+)
+
+SERVER_TIMING_HEADER = (
+    os.getenv('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+)
+
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+
+SLOW_REQUEST_QUERIES = int(os.getenv('SLOW_REQUEST_QUERIES', 20))
+
+REPEATED_QUERY_THRESHOLD = int(os.getenv('REPEATED_QUERY_THRESHOLD', 5))
+
+REQUEST_METRICS_TOP_QUERIES = int(os.getenv('REQUEST_METRICS_TOP_QUERIES', 5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
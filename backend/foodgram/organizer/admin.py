@@ -1,29 +1,79 @@
 from django.contrib import admin
+from django.db import transaction
 
-from organizer.models import Favorite, ShoppingCart, Subscription
+from foodgram.paginators import EstimatedCountPaginator
+from organizer.models import (Favorite, ShoppingCart, ShoppingListItem,
+                              Subscription)
+from organizer.utils import reconcile_shopping_lists
 
+# поиск по началу имени или адреса пользователя использует их индексы
+USER_SEARCH_FIELDS = ('user__username__startswith', 'user__email__startswith')
 
-class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'user', 'recipe')
-    search_fields = ('user',)
-    list_filter = ('user',)
+
+class OrganizerAdmin(admin.ModelAdmin):
+    """Общие настройки для больших таблиц органайзера: связанные объекты
+    загружаются вместе со списком, выбираются по id (без выпадающих
+    списков на всю таблицу), количество строк без фильтров оценивается.
+    """
+    search_fields = USER_SEARCH_FIELDS
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class FavoriteAdmin(OrganizerAdmin):
     list_display = ('pk', 'user', 'recipe')
-    search_fields = ('user',)
-    list_filter = ('user',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('user', 'recipe')
+    raw_id_fields = ('user', 'recipe')
+
+
+class ShoppingCartAdmin(OrganizerAdmin):
+    list_display = ('pk', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    raw_id_fields = ('user', 'recipe')
+
 
+class ShoppingListItemAdmin(OrganizerAdmin):
+    """Списки покупок вычисляются по корзинам (см. organizer.signals),
+    поэтому позиции доступны только для просмотра; расхождения исправляет
+    действие rebuild или команда rebuild_shopping_lists.
+    """
+    list_display = ('pk', 'user', 'measurement', 'total_amount')
+    list_select_related = ('user', 'measurement')
+    raw_id_fields = ('user', 'measurement')
+    actions = ('rebuild',)
 
-class SubscriptionAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(
+        description='Пересчитать списки покупок выбранных пользователей',
+        permissions=('view',)
+    )
+    def rebuild(self, request, queryset):
+        user_ids = list(
+            queryset.order_by().values_list('user', flat=True).distinct()
+        )
+        with transaction.atomic():
+            broken_users = reconcile_shopping_lists(user_ids)
+        self.message_user(
+            request, f'Исправлено списков покупок: {broken_users}.'
+        )
+
+
+class SubscriptionAdmin(OrganizerAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('user',)
-    list_filter = ('user',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
 
 
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingListItem, ShoppingListItemAdmin)
 admin.site.register(Subscription, SubscriptionAdmin)
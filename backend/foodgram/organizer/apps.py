@@ -5,3 +5,6 @@ class OrganizerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'organizer'
     verbose_name = 'Органайзер'
+
+    def ready(self):
+        import organizer.signals  # noqa: F401
@@ -0,0 +1,73 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.dispatch import Signal
+
+from organizer.models import Favorite, Subscription
+from recipes.models import Recipe
+from users.models import User
+
+# денормализованные счётчики: (модель, поле счётчика, модель подсчитываемых
+# записей, поле этих записей со ссылкой на модель счётчика)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+# счётчики меняются через update(), который не отправляет сигналы модели;
+# после изменения отправляется этот сигнал: sender - модель, field - поле
+# счётчика, pks - id изменённых объектов
+counters_changed = Signal()
+
+
+def change_counter(model, pk, field, delta):
+    """Изменяет счётчик одним UPDATE с F(), без чтения значения;
+    счётчик не становится отрицательным.
+    """
+    if pk is None:
+        return
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+    counters_changed.send(sender=model, field=field, pks=[pk])
+
+
+def change_counters(model, pks, field, delta):
+    """Изменяет счётчик сразу у нескольких объектов одним UPDATE."""
+    if not pks:
+        return
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+    counters_changed.send(sender=model, field=field, pks=pks)
+
+
+def get_actual_count(related_model, related_field):
+    """Подзапрос, считающий записи related_model для каждой строки."""
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def reconcile_counter(model, field, related_model, related_field, ids,
+                      check_only=False):
+    """Сверяет счётчик field у объектов model с id из ids с фактическим
+    количеством записей и исправляет расхождения.
+    Возвращает число объектов с неверным счётчиком.
+    """
+    actual_count = get_actual_count(related_model, related_field)
+    broken_ids = list(
+        model.objects.filter(pk__in=ids).annotate(
+            actual_count=actual_count
+        ).exclude(**{field: F('actual_count')}).values_list('pk', flat=True)
+    )
+    if broken_ids and not check_only:
+        # значение вычисляется в самом UPDATE, чтобы не затереть изменения,
+        # сделанные после проверки:
+        model.objects.filter(pk__in=broken_ids).update(**{field: actual_count})
+        counters_changed.send(sender=model, field=field, pks=broken_ids)
+    return len(broken_ids)
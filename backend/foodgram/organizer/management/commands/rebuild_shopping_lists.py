@@ -0,0 +1,52 @@
+from itertools import islice
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from organizer.utils import BATCH_SIZE, reconcile_shopping_lists
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает списки покупок (ShoppingListItem) по корзинам '
+            'пользователей и исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить таблицу, ничего не исправляя.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество пользователей, обрабатываемых за один проход.'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ).iterator()
+        checked = 0
+        broken_users = 0
+        while True:
+            batch = list(islice(user_ids, options['batch_size']))
+            if not batch:
+                break
+            checked += len(batch)
+            with transaction.atomic():
+                broken_users += reconcile_shopping_lists(
+                    batch, options['check']
+                )
+
+        if options['check'] and broken_users:
+            raise CommandError(
+                f'Расхождения в списках покупок у {broken_users} '
+                f'пользователей из {checked}.'
+            )
+        result = ('Расхождений не найдено.' if options['check']
+                  else f'Исправлено списков покупок: {broken_users}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей проверено: {checked}. {result}'
+        ))
@@ -0,0 +1,56 @@
+from itertools import islice
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from organizer.counters import COUNTERS, reconcile_counter
+from organizer.utils import BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счётчики favorites_count, recipes_count и '
+            'followers_count с фактическим количеством записей и '
+            'исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, ничего не исправляя.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество объектов, проверяемых за один запрос.'
+        )
+
+    def handle(self, *args, **options):
+        total_broken = 0
+        for model, field, related_model, related_field in COUNTERS:
+            ids = model.objects.order_by('pk').values_list(
+                'pk', flat=True
+            ).iterator()
+            checked = 0
+            broken = 0
+            while True:
+                batch = list(islice(ids, options['batch_size']))
+                if not batch:
+                    break
+                checked += len(batch)
+                with transaction.atomic():
+                    broken += reconcile_counter(
+                        model, field, related_model, related_field, batch,
+                        options['check']
+                    )
+            total_broken += broken
+            self.stdout.write(
+                f'{model._meta.label}.{field}: проверено {checked}, '
+                f'расхождений {broken}.'
+            )
+
+        if options['check'] and total_broken:
+            raise CommandError(f'Найдено расхождений: {total_broken}.')
+        result = ('Расхождений не найдено.' if options['check']
+                  else f'Исправлено счётчиков: {total_broken}.')
+        self.stdout.write(self.style.SUCCESS(result))
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:26
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def fill_shopping_list_items(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    ShoppingListItem = apps.get_model('organizer', 'ShoppingListItem')
+    rows = Ingredient.objects.filter(
+        recipes__shopping_cart__isnull=False
+    ).values_list(
+        'recipes__shopping_cart__user', 'measurement'
+    ).annotate(total_amount=Sum('amount')).order_by()
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(
+                user_id=user_id,
+                measurement_id=measurement_id,
+                total_amount=total_amount
+            )
+            for user_id, measurement_id, total_amount in rows.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+def clear_shopping_list_items(apps, schema_editor):
+    ShoppingListItem = apps.get_model('organizer', 'ShoppingListItem')
+    ShoppingListItem.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizer', '0004_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fill_shopping_list_items, clear_shopping_list_items
+        ),
+    ]
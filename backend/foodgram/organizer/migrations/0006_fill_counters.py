@@ -0,0 +1,39 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:46
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# (модель, поле счётчика, модель подсчитываемых записей, поле ссылки)
+COUNTERS = (
+    (('recipes', 'Recipe'), 'favorites_count',
+     ('organizer', 'Favorite'), 'recipe'),
+    (('users', 'User'), 'recipes_count', ('recipes', 'Recipe'), 'author'),
+    (('users', 'User'), 'followers_count',
+     ('organizer', 'Subscription'), 'author'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for model, field, related_model, related_field in COUNTERS:
+        related_objects = apps.get_model(*related_model).objects
+        apps.get_model(*model).objects.update(**{field: Coalesce(Subquery(
+            related_objects.filter(
+                **{related_field: OuterRef('pk')}
+            ).order_by().values(related_field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizer', '0005_fill_shoppinglistitem'),
+        ('recipes', '0008_counters'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 
-from recipes.models import Recipe
+from recipes.models import Measurement, Recipe
 from users.models import User
 
 
@@ -92,3 +92,40 @@ class Favorite(models.Model):
 
     def __str__(self):
         return (f'Избранное {self.user.username}: рецепт id={self.recipe.id}')
+
+
+class ShoppingListItem(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя.
+    Обновляется вместе с записями ShoppingCart и ингредиентами рецептов.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    measurement = models.ForeignKey(
+        Measurement,
+        on_delete=models.PROTECT,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'measurement'],
+                name='unique_shopping_list_item'
+            )
+        ]
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+
+    def __str__(self):
+        return (f'Позиция списка покупок id={self.id}: '
+                f'ингредиент id={self.measurement_id}, {self.total_amount}')
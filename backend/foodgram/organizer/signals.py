@@ -0,0 +1,108 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from organizer.counters import change_counter
+from organizer.models import Favorite, ShoppingCart, Subscription
+from organizer.utils import (apply_recipe_delta, apply_shopping_list_delta,
+                             get_amounts_delta, get_recipes_amounts)
+from recipes.models import Recipe, RecipeIngredient
+from users.models import User
+
+
+@receiver(post_save, sender=Favorite)
+def increase_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrease_favorites_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrease_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Subscription)
+def increase_followers_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrease_followers_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
+
+
+# Списки покупок (ShoppingListItem) при изменении корзины и ингредиентов
+# через API обновляет сам API: записи корзины добавляются и удаляются без
+# сигналов, ингредиенты рецепта заменяются через bulk_create и
+# delete_recipe_ingredients. Сигналы приходят при изменениях в админке,
+# в shell и при каскадном удалении.
+@receiver(pre_save, sender=ShoppingCart)
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_saved_row(sender, instance, raw, **kwargs):
+    # при изменении записи списки покупок меняются на разницу между
+    # прежними и новыми значениями
+    instance.saved_row = None
+    if not raw and not instance._state.adding:
+        instance.saved_row = sender.objects.filter(pk=instance.pk).first()
+
+
+def change_shopping_list(user_id, recipe_id, sign):
+    apply_shopping_list_delta([user_id], {
+        measurement_id: sign * amount
+        for measurement_id, amount
+        in get_recipes_amounts([recipe_id]).items()
+    })
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, raw, **kwargs):
+    saved_row = getattr(instance, 'saved_row', None)
+    if raw or (saved_row is not None
+               and saved_row.user_id == instance.user_id
+               and saved_row.recipe_id == instance.recipe_id):
+        return
+    if saved_row is not None:
+        change_shopping_list(saved_row.user_id, saved_row.recipe_id, -1)
+    change_shopping_list(instance.user_id, instance.recipe_id, 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    change_shopping_list(instance.user_id, instance.recipe_id, -1)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def add_ingredient_to_shopping_lists(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    saved_row = getattr(instance, 'saved_row', None)
+    old_amounts = {}
+    if saved_row is not None:
+        if saved_row.recipe_id == instance.recipe_id:
+            old_amounts = {saved_row.measurement_id: saved_row.amount}
+        else:
+            apply_recipe_delta(
+                saved_row.recipe_id,
+                {saved_row.measurement_id: -saved_row.amount}
+            )
+    apply_recipe_delta(instance.recipe_id, get_amounts_delta(
+        old_amounts, {instance.measurement_id: instance.amount}
+    ))
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def remove_ingredient_from_shopping_lists(sender, instance, **kwargs):
+    apply_recipe_delta(
+        instance.recipe_id, {instance.measurement_id: -instance.amount}
+    )
@@ -0,0 +1,134 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, TestCase
+
+from api.tests.utils import APITestMixin, create_user
+from organizer.models import ShoppingCart, ShoppingListItem
+from organizer.utils import reconcile_shopping_lists
+from recipes.models import RecipeIngredient
+
+
+class ShoppingListsTest(APITestMixin, TestCase):
+    """Списки покупок совпадают с корзинами после изменений корзин и
+    ингредиентов через ORM (админка, shell) и через API.
+    """
+    recipes_count = 3
+
+    def setUp(self):
+        super().setUp()
+        self.other_user = create_user(3)
+        for user in (self.user, self.other_user):
+            self.user_client.force_authenticate(user)
+            response = self.user_client.get(
+                f'/api/recipes/{self.recipes[0].id}/shopping_cart/'
+            )
+            self.assertEqual(response.status_code, 200)
+        self.user_client.force_authenticate(self.user)
+        self.user_ids = [self.user.id, self.other_user.id]
+
+    def get_shopping_list(self, user):
+        return dict(ShoppingListItem.objects.filter(user=user).values_list(
+            'measurement', 'total_amount'
+        ))
+
+    def check_shopping_lists(self):
+        self.assertEqual(
+            reconcile_shopping_lists(self.user_ids, check_only=True), 0
+        )
+
+    def test_cart_changes(self):
+        recipe = self.recipes[1]
+        cart = ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        self.assertEqual(
+            set(self.get_shopping_list(self.user).values()), {Decimal(2)}
+        )
+        self.check_shopping_lists()
+        cart.user = self.other_user
+        cart.save()
+        self.assertEqual(
+            set(self.get_shopping_list(self.user).values()), {Decimal(1)}
+        )
+        self.check_shopping_lists()
+        cart.delete()
+        self.check_shopping_lists()
+        ShoppingCart.objects.filter(user=self.user).delete()
+        self.assertEqual(self.get_shopping_list(self.user), {})
+        self.check_shopping_lists()
+
+    def test_ingredient_changes(self):
+        recipe = self.recipes[0]
+        ingredient = RecipeIngredient.objects.filter(recipe=recipe).first()
+        ingredient.amount = Decimal('2.5')
+        ingredient.save()
+        self.assertEqual(
+            self.get_shopping_list(self.user)[ingredient.measurement_id],
+            Decimal('2.5')
+        )
+        self.check_shopping_lists()
+        RecipeIngredient.objects.filter(
+            recipe=self.recipes[1], measurement=ingredient.measurement
+        ).delete()
+        ingredient.recipe = self.recipes[1]
+        ingredient.save()
+        self.assertNotIn(
+            ingredient.measurement_id, self.get_shopping_list(self.user)
+        )
+        self.check_shopping_lists()
+        RecipeIngredient.objects.create(
+            recipe=recipe, measurement=ingredient.measurement, amount=3
+        )
+        self.check_shopping_lists()
+        RecipeIngredient.objects.filter(recipe=recipe).delete()
+        self.assertEqual(self.get_shopping_list(self.user), {})
+        self.check_shopping_lists()
+
+    def test_api_update(self):
+        # ингредиенты заменяются без сигналов: изменение учитывается
+        # в списках покупок один раз
+        recipe = self.recipes[0]
+        client = self.user_client
+        client.force_authenticate(self.author)
+        response = client.patch(f'/api/recipes/{recipe.id}/', {
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': self.measurements[0].id, 'amount': 5},
+                {'id': self.measurements[1].id, 'amount': 1},
+            ],
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_shopping_list(self.user), {
+            self.measurements[0].id: Decimal(5),
+            self.measurements[1].id: Decimal(1),
+        })
+        self.check_shopping_lists()
+
+    def test_reconcile(self):
+        item = ShoppingListItem.objects.filter(user=self.user).first()
+        item.total_amount += 1
+        item.save()
+        ShoppingListItem.objects.filter(user=self.other_user).delete()
+        self.assertEqual(
+            reconcile_shopping_lists(self.user_ids, check_only=True), 2
+        )
+        with self.assertRaises(CommandError):
+            call_command('rebuild_shopping_lists', '--check')
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.check_shopping_lists()
+        self.assertEqual(
+            set(self.get_shopping_list(self.other_user).values()),
+            {Decimal(1)}
+        )
+
+    def test_admin_read_only(self):
+        model_admin = site._registry[ShoppingListItem]
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.assertFalse(model_admin.has_add_permission(request))
+        self.assertFalse(model_admin.has_change_permission(request))
+        self.assertFalse(model_admin.has_delete_permission(request))
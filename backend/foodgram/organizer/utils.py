@@ -0,0 +1,282 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections, router
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+
+from organizer.models import ShoppingCart, ShoppingListItem
+from recipes.models import RecipeIngredient
+
+BATCH_SIZE = 1000
+# половина шага DecimalField(decimal_places=3): остаток меньше этого значения
+# считается нулевым (SQLite выполняет арифметику над NUMERIC во float):
+ZERO_AMOUNT = Decimal('0.0005')
+AMOUNT_PRECISION = Decimal('0.001')
+
+
+def get_recipe_amounts(recipe):
+    """Возвращает словарь {id ингредиента: количество} для рецепта."""
+    amounts = defaultdict(Decimal)
+    for measurement_id, amount in RecipeIngredient.objects.filter(
+        recipe=recipe
+    ).values_list('measurement', 'amount'):
+        amounts[measurement_id] += amount
+    return amounts
+
+
+def get_recipes_amounts(recipe_ids):
+    """Возвращает словарь {id ингредиента: суммарное количество} для
+    нескольких рецептов (один запрос с группировкой).
+    """
+    return dict(
+        RecipeIngredient.objects.filter(recipe__in=recipe_ids).values_list(
+            'measurement'
+        ).annotate(total_amount=Sum('amount')).order_by()
+    )
+
+
+def get_amounts_delta(old_amounts, new_amounts):
+    delta = {}
+    for measurement_id in set(old_amounts) | set(new_amounts):
+        difference = (new_amounts.get(measurement_id, 0)
+                      - old_amounts.get(measurement_id, 0))
+        if difference:
+            delta[measurement_id] = difference
+    return delta
+
+
+def apply_shopping_list_delta(user_ids, delta):
+    """Прибавляет delta {id ингредиента: количество} к спискам покупок
+    пользователей. Вызывать внутри транзакции вместе с изменением
+    ShoppingCart или ингредиентов рецепта.
+    """
+    if not user_ids or not delta:
+        return
+    # недостающие позиции создаются с нулевым количеством, после чего все
+    # позиции изменяются одним UPDATE:
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(
+                user_id=user_id, measurement_id=measurement_id,
+                total_amount=0
+            )
+            for user_id in user_ids
+            for measurement_id, amount in delta.items() if amount > 0
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    items = ShoppingListItem.objects.filter(
+        user__in=user_ids, measurement__in=delta
+    )
+    items.update(total_amount=F('total_amount') + Case(
+        *[
+            When(measurement=measurement_id, then=Value(amount))
+            for measurement_id, amount in delta.items()
+        ],
+        output_field=DecimalField()
+    ))
+    items.filter(total_amount__lt=ZERO_AMOUNT).delete()
+
+
+def add_recipes_to_shopping_list(user, recipe_ids):
+    apply_shopping_list_delta([user.id], get_recipes_amounts(recipe_ids))
+
+
+def remove_recipes_from_shopping_list(user, recipe_ids):
+    apply_shopping_list_delta([user.id], {
+        measurement_id: -amount
+        for measurement_id, amount in get_recipes_amounts(recipe_ids).items()
+    })
+
+
+def delete_user_rows(model, user_id, field, object_ids):
+    """Удаляет записи model пользователя, у которых field (внешний ключ)
+    ссылается на object_ids, одним DELETE. Объекты не выбираются и сигналы
+    post_delete не отправляются (QuerySet.delete() выбрал бы записи и
+    отправил сигнал для каждой). Возвращает число удалённых записей.
+    """
+    if not object_ids:
+        return 0
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(object_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(model._meta.db_table)} '
+            f'WHERE {quote_name(model._meta.get_field("user").column)} = %s '
+            f'AND {quote_name(model._meta.get_field(field).column)} '
+            f'IN ({placeholders})',
+            [user_id, *object_ids]
+        )
+        return cursor.rowcount
+
+
+def can_return_inserted_rows(connection):
+    # INSERT ... RETURNING: PostgreSQL и SQLite начиная с версии 3.35
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def add_user_rows(model, user, field, object_ids):
+    """Добавляет записи model пользователя, у которых field (внешний ключ)
+    ссылается на object_ids, одним INSERT ... ON CONFLICT DO NOTHING
+    (в SQLite - INSERT OR IGNORE). Возвращает id объектов, записи для
+    которых добавил этот INSERT: из одновременных одинаковых запросов
+    запись добавит только один.
+
+    Объекты не создаются и сигналы post_save не отправляются (как и в
+    delete_user_rows): счётчики, списки покупок и кеш обновляет вызывающий
+    код. Вызывать внутри транзакции.
+    """
+    connection = connections[router.db_for_write(model)]
+    ops = connection.ops
+    quote_name = ops.quote_name
+    column = quote_name(model._meta.get_field(field).column)
+    insert = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{quote_name(model._meta.db_table)} '
+        f'({quote_name(model._meta.get_field("user").column)}, {column}) '
+        f'VALUES '
+    )
+    suffix = ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    added = []
+    with connection.cursor() as cursor:
+        if len(object_ids) == 1 or not can_return_inserted_rows(connection):
+            # для одной строки число добавленных строк точно указывает,
+            # добавлена ли запись
+            for object_id in object_ids:
+                cursor.execute(
+                    f'{insert}(%s, %s) {suffix}', [user.id, object_id]
+                )
+                if cursor.rowcount > 0:
+                    added.append(object_id)
+            return added
+        for start in range(0, len(object_ids), BATCH_SIZE):
+            batch = object_ids[start:start + BATCH_SIZE]
+            cursor.execute(
+                f'{insert}{", ".join(["(%s, %s)"] * len(batch))} {suffix} '
+                f'RETURNING {column}',
+                [
+                    value
+                    for object_id in batch for value in (user.id, object_id)
+                ]
+            )
+            inserted = {object_id for object_id, in cursor.fetchall()}
+            added.extend(
+                object_id for object_id in batch if object_id in inserted
+            )
+    return added
+
+
+def add_user_recipes(model, user, recipe_ids):
+    """Добавляет записи model (Favorite или ShoppingCart) пользователя для
+    существующих рецептов recipe_ids (см. add_user_rows).
+    """
+    return add_user_rows(model, user, 'recipe', recipe_ids)
+
+
+def delete_user_recipes(model, user, recipe_ids):
+    """Удаляет записи model пользователя для рецептов recipe_ids одним
+    DELETE. Возвращает id рецептов, записи для которых были удалены.
+
+    post_delete не отправляется (см. add_user_recipes). Вызывать внутри
+    транзакции.
+    """
+    queryset = model.objects.filter(user=user, recipe__in=recipe_ids)
+    removed = list(
+        queryset.select_for_update().values_list('recipe', flat=True)
+    )
+    delete_user_rows(model, user.id, 'recipe', removed)
+    return removed
+
+
+def apply_recipe_delta(recipe_id, delta):
+    """Прибавляет delta {id ингредиента: количество} к спискам покупок
+    всех пользователей, у которых рецепт лежит в корзине.
+    """
+    if not delta:
+        return
+    user_ids = list(ShoppingCart.objects.filter(
+        recipe=recipe_id
+    ).values_list('user', flat=True))
+    apply_shopping_list_delta(user_ids, delta)
+
+
+def update_recipe_in_shopping_lists(recipe, old_amounts):
+    """Переносит изменение ингредиентов рецепта в списки покупок всех
+    пользователей, у которых рецепт лежит в корзине.
+    """
+    apply_recipe_delta(
+        recipe.id, get_amounts_delta(old_amounts, get_recipe_amounts(recipe))
+    )
+
+
+def delete_recipe_ingredients(recipe):
+    """Удаляет ингредиенты рецепта одним DELETE, без выборки и сигналов
+    post_delete (см. organizer.signals): списки покупок после замены
+    ингредиентов изменяет update_recipe_in_shopping_lists.
+    """
+    connection = connections[router.db_for_write(RecipeIngredient)]
+    quote_name = connection.ops.quote_name
+    column = RecipeIngredient._meta.get_field('recipe').column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(RecipeIngredient._meta.db_table)} '
+            f'WHERE {quote_name(column)} = %s',
+            [recipe.id]
+        )
+
+
+def calculate_shopping_lists(user_ids):
+    """Вычисляет списки покупок заново по содержимому корзин.
+    Возвращает словарь {(id пользователя, id ингредиента): количество}.
+    """
+    rows = RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user__in=user_ids
+    ).values_list(
+        'recipe__shopping_cart__user', 'measurement'
+    ).annotate(total_amount=Sum('amount')).order_by()
+    return {
+        (user_id, measurement_id): total_amount
+        for user_id, measurement_id, total_amount in rows
+    }
+
+
+def reconcile_shopping_lists(user_ids, check_only=False):
+    """Сверяет списки покупок (ShoppingListItem) пользователей user_ids
+    с содержимым их корзин и пересоздаёт списки с расхождениями.
+    Возвращает число пользователей с неверным списком.
+    """
+    expected = {
+        key: amount.quantize(AMOUNT_PRECISION)
+        for key, amount in calculate_shopping_lists(user_ids).items()
+    }
+    actual = {
+        (user_id, measurement_id): amount.quantize(AMOUNT_PRECISION)
+        for user_id, measurement_id, amount
+        in ShoppingListItem.objects.filter(
+            user__in=user_ids
+        ).values_list('user', 'measurement', 'total_amount')
+    }
+    # пользователи, у которых хотя бы одна позиция не совпадает:
+    broken = {
+        user_id for (user_id, measurement_id), amount
+        in set(expected.items()) ^ set(actual.items())
+    }
+    if broken and not check_only:
+        ShoppingListItem.objects.filter(user__in=broken).delete()
+        ShoppingListItem.objects.bulk_create(
+            [
+                ShoppingListItem(
+                    user_id=user_id,
+                    measurement_id=measurement_id,
+                    total_amount=amount
+                )
+                for (user_id, measurement_id), amount
+                in expected.items() if user_id in broken
+            ],
+            batch_size=BATCH_SIZE
+        )
+    return len(broken)
@@ -1,19 +1,23 @@
 from django.contrib import admin
 
-from recipes.models import Ingredient, Measurement, Recipe, Tag
-
-
-class IngredientAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'measurement', 'amount')
-    search_fields = ('measurement__name',)
-    list_filter = ('measurement__name',)
+from foodgram.paginators import EstimatedCountPaginator
+from recipes.models import Measurement, Recipe, RecipeIngredient, Tag
+from recipes.search import search_recipes
+
+
+class RecipeIngredientAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'recipe', 'measurement', 'amount')
+    list_select_related = ('recipe', 'measurement')
+    raw_id_fields = ('recipe',)
+    autocomplete_fields = ('measurement',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
 class MeasurementAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'measurement_unit')
-    search_fields = ('name',)
-    list_filter = ('name',)
+    search_fields = ('^name',)
     empty_value_display = '-пусто-'
 
 
@@ -22,28 +26,24 @@ class RecipeAdmin(admin.ModelAdmin):
         'pk',
         'author',
         'name',
-        'text',
         'cooking_time',
-        'number_of_favorites'
-    )
-    search_fields = (
-        'tags',
-        'author',
-        'ingredients',
-        'name',
-        'text',
-        'cooking_time'
-    )
-    list_filter = (
-        'author',
-        'name',
-        'tags'
+        'favorites_count'
     )
+    list_select_related = ('author',)
+    # поиск выполняется по полнотекстовому индексу (get_search_results)
+    search_fields = ('name',)
+    list_filter = ('tags',)
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('tags',)
+    readonly_fields = ('favorites_count',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
-    @admin.display(description='Добавлений в избранное')
-    def number_of_favorites(self, object):
-        return object.favorites.count()
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_recipes(queryset, search_term), False
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -53,7 +53,7 @@ class TagAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Measurement, MeasurementAdmin)
 admin.site.register(Recipe, RecipeAdmin)
+admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Tag, TagAdmin)
@@ -0,0 +1,319 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from recipes.index import measurement_index
+from recipes.models import Measurement
+
+BATCH_SIZE = 1000
+FIELDS = ('name', 'measurement_unit')
+FORMATS = ('csv', 'json', 'ndjson')
+MAX_LENGTHS = {
+    field: Measurement._meta.get_field(field).max_length for field in FIELDS
+}
+# массив JSON читается из файла частями такого размера; элемент массива
+# не может быть длиннее JSON_MAX_ITEM_SIZE символов
+JSON_CHUNK_SIZE = 1 << 16
+JSON_MAX_ITEM_SIZE = 1 << 20
+# экранирование значений для COPY ... FROM STDIN в текстовом формате:
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'
+})
+
+
+class CatalogueError(ValueError):
+    """Файл каталога невозможно разобрать."""
+
+
+def get_format(path):
+    """Формат каталога по расширению файла; по умолчанию - csv."""
+    extension = str(path).rsplit('.', 1)[-1].lower()
+    if extension == 'json':
+        return 'json'
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    return 'csv'
+
+
+def read_csv(file):
+    """Строки CSV: название, единица измерения. Строка заголовка
+    name,measurement_unit пропускается.
+    """
+    reader = csv.reader(file)
+    for row in reader:
+        if row and row != list(FIELDS):
+            yield reader.line_num, row
+
+
+def read_ndjson(file):
+    """Значения JSON, по одному в строке."""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            yield number, error
+
+
+class JSONArrayReader:
+    """Элементы массива JSON из файла. Файл читается частями, поэтому
+    весь массив не загружается в память.
+    """
+    decoder = json.JSONDecoder()
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def __iter__(self):
+        if self._next_char() != '[':
+            raise CatalogueError(
+                'Каталог в формате JSON должен быть массивом.'
+            )
+        self.position += 1
+        if self._next_char() == ']':
+            return
+        number = 0
+        while True:
+            number += 1
+            yield number, self._decode(number)
+            char = self._next_char()
+            if char == ']':
+                return
+            if not char:
+                raise CatalogueError(
+                    f'Массив JSON оборван после элемента {number}.'
+                )
+            if char != ',':
+                raise CatalogueError(
+                    f'После элемента {number} ожидалась запятая.'
+                )
+            self.position += 1
+
+    def _read_more(self):
+        chunk = self.file.read(JSON_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def _next_char(self):
+        """Следующий непробельный символ (не извлекая его) или пустая
+        строка в конце файла.
+        """
+        while True:
+            while (self.position < len(self.buffer)
+                   and self.buffer[self.position].isspace()):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._read_more():
+                return ''
+
+    def _decode(self, number):
+        self._next_char()
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+            except ValueError as error:
+                # элемент мог оборваться на границе прочитанной части
+                if (len(self.buffer) - self.position > JSON_MAX_ITEM_SIZE
+                        or not self._read_more()):
+                    raise CatalogueError(f'Элемент {number}: {error}')
+                continue
+            # число в конце прочитанной части тоже могло оборваться
+            if end < len(self.buffer) or self.eof or not self._read_more():
+                self.position = end
+                return item
+
+
+def read_catalogue(file, format):
+    """Элементы каталога (номер строки или элемента, значение) в порядке
+    следования в файле.
+    """
+    if format == 'json':
+        return iter(JSONArrayReader(file))
+    if format == 'ndjson':
+        return read_ndjson(file)
+    return read_csv(file)
+
+
+def parse_item(item):
+    """Возвращает (название, единица измерения) из строки CSV, списка
+    или объекта JSON; для неверного элемента вызывает ValueError.
+    """
+    if isinstance(item, Exception):
+        raise ValueError(str(item))
+    if isinstance(item, dict):
+        values = [item.get(field) for field in FIELDS]
+    elif isinstance(item, list) and len(item) == len(FIELDS):
+        values = item
+    else:
+        raise ValueError(
+            'ожидались название и единица измерения, получено '
+            f'{str(item)[:100]!r}.'
+        )
+    result = []
+    for field, value in zip(FIELDS, values):
+        max_length = MAX_LENGTHS[field]
+        if not isinstance(value, str):
+            raise ValueError(f'{field}: ожидалась строка.')
+        value = value.strip()
+        if len(value) > max_length:
+            raise ValueError(f'{field}: длиннее {max_length} символов.')
+        # PostgreSQL не хранит в тексте символ NUL: COPY прервался бы
+        # на нём целиком
+        if '\x00' in value:
+            raise ValueError(f'{field}: недопустимый символ NUL.')
+        result.append(value)
+    # у некоторых компонентов каталога нет единицы измерения
+    # (например, «гастропаб»), но название обязательно
+    if not result[0]:
+        raise ValueError('name: пустое название.')
+    return tuple(result)
+
+
+class CatalogueLoader:
+    """Добавляет в базу компоненты из каталога, которых в ней ещё нет.
+
+    Компонент определяется парой (название, единица измерения), других
+    данных у него нет, поэтому найденные в базе компоненты пропускаются.
+    Неверные элементы не прерывают загрузку: они считаются в invalid и
+    передаются в on_error(номер, сообщение).
+
+    В PostgreSQL каталог передаётся одной командой COPY во временную
+    таблицу и переносится в таблицу компонентов одним
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING. В остальных базах
+    компоненты добавляются частями по batch_size через executemany
+    с INSERT ... ON CONFLICT DO NOTHING (в SQLite - INSERT OR IGNORE).
+
+    Сигналы post_save не отправляются: индекс компонентов этого процесса
+    сбрасывается явно, в остальных процессах он обновится через
+    INGREDIENT_INDEX_TTL. Рецептов новые компоненты не касаются.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, on_error=None):
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.read = 0
+        self.inserted = 0
+        self.invalid = 0
+
+    @property
+    def skipped(self):
+        """Уже были в базе или повторялись в каталоге."""
+        return self.read - self.invalid - self.inserted
+
+    def get_stats(self):
+        return {
+            'read': self.read,
+            'inserted': self.inserted,
+            'skipped': self.skipped,
+            'invalid': self.invalid,
+        }
+
+    def load(self, items):
+        connection = connections[router.db_for_write(Measurement)]
+        with transaction.atomic(using=connection.alias):
+            if connection.vendor == 'postgresql':
+                self.copy(connection, self.parse(items))
+            else:
+                self.insert(connection, self.parse(items))
+        measurement_index.invalidate()
+        return self.get_stats()
+
+    def parse(self, items):
+        for number, item in items:
+            self.read += 1
+            try:
+                yield parse_item(item)
+            except ValueError as error:
+                self.invalid += 1
+                if self.on_error is not None:
+                    self.on_error(number, str(error))
+
+    def insert(self, connection, rows):
+        # один подготовленный INSERT для всех частей: компиляция запроса
+        # ORM для каждого объекта занимала бы большую часть времени
+        ops = connection.ops
+        table = ops.quote_name(Measurement._meta.db_table)
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=True)} {table} '
+            f'(name, measurement_unit, updated_at) VALUES (%s, %s, %s)'
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+        updated_at = ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            while True:
+                # повторы внутри части отбрасываются сразу:
+                batch = dict.fromkeys(islice(rows, self.batch_size))
+                if not batch:
+                    return
+                cursor.executemany(sql, [
+                    (name, measurement_unit, updated_at)
+                    for name, measurement_unit in batch
+                ])
+                self.inserted += cursor.rowcount
+
+    def copy(self, connection, rows):
+        table = connection.ops.quote_name(Measurement._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE measurement_import '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            # CursorWrapper передаёт copy_expert курсору psycopg2 без
+            # преобразования ошибок в django.db.DatabaseError:
+            with connection.wrap_database_errors:
+                cursor.copy_expert(
+                    'COPY measurement_import (name, measurement_unit) '
+                    'FROM STDIN',
+                    CopyStream(rows, self.batch_size)
+                )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit, updated_at) '
+                f'SELECT DISTINCT name, measurement_unit, %s '
+                f'FROM measurement_import ON CONFLICT DO NOTHING',
+                [timezone.now()]
+            )
+            self.inserted = cursor.rowcount
+            cursor.execute('DROP TABLE measurement_import')
+
+
+class CopyStream:
+    """Файлоподобный объект для cursor.copy_expert: строки (название,
+    единица измерения) в текстовом формате COPY, формируемые по мере
+    чтения.
+    """
+
+    def __init__(self, rows, batch_size):
+        self.rows = rows
+        self.batch_size = batch_size
+        self.buffer = bytearray()
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            lines = [
+                '\t'.join(value.translate(COPY_ESCAPES) for value in row)
+                + '\n'
+                for row in islice(self.rows, self.batch_size)
+            ]
+            if not lines:
+                break
+            self.buffer += ''.join(lines).encode()
+        if size < 0:
+            size = len(self.buffer)
+        try:
+            return bytes(self.buffer[:size])
+        finally:
+            del self.buffer[:size]
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import posixpath
+import time
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from PIL import Image, features
+
+ORIGINAL_SIZE = 'original'
+# не больше стольких имён созданных (и отдельно - отсутствующих) вариантов
+# хранится в памяти:
+EXISTING_VARIANTS_LIMIT = 100000
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Файлы сохраняются под именем, равным SHA-256 содержимого.
+
+    Повторная загрузка того же файла не создаёт копию: возвращается имя
+    уже сохранённого файла.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # имя всё равно заменяется хешем в _save
+        return name
+
+    def _write_temporary(self, path, chunks):
+        """Записывает chunks во временный файл рядом с path и возвращает
+        путь к нему.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with NamedTemporaryFile(
+            dir=os.path.dirname(path), suffix='.tmp', delete=False
+        ) as file:
+            for chunk in chunks:
+                file.write(chunk)
+        if self.file_permissions_mode is not None:
+            os.chmod(file.name, self.file_permissions_mode)
+        return file.name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), digest.hexdigest() + extension
+        )
+        if self.exists(name):
+            return name
+        # FileSystemStorage._save при FileExistsError повторяет запись под
+        # именем из get_available_name, то есть под тем же именем, без
+        # конца. Поэтому файл пишется во временный и появляется под своим
+        # именем через os.link, которая не заменяет существующий файл.
+        path = self.path(name)
+        temporary_path = self._write_temporary(path, content.chunks())
+        try:
+            os.link(temporary_path, path)
+        except FileExistsError:
+            # тот же файл успел сохранить другой процесс
+            pass
+        finally:
+            os.unlink(temporary_path)
+        return name
+
+    def save_as(self, name, data):
+        """Записывает data под именем name без замены имени хешем.
+
+        Файл пишется во временный и переименовывается, поэтому другие
+        процессы не увидят его записанным частично.
+        """
+        path = self.path(name)
+        os.replace(self._write_temporary(path, [data]), path)
+
+
+def get_variant_format():
+    if settings.IMAGE_VARIANT_FORMAT == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return settings.IMAGE_VARIANT_FORMAT
+
+
+def get_variant_name(name, size):
+    """recipes/<хеш>.png -> recipes/<size>/<хеш>.webp"""
+    directory, file_name = posixpath.split(name)
+    extension = 'jpg' if get_variant_format() == 'JPEG' else 'webp'
+    return posixpath.join(
+        directory, size, f'{posixpath.splitext(file_name)[0]}.{extension}'
+    )
+
+
+class VariantRegistry:
+    """Имена уже созданных вариантов изображений.
+
+    Имя варианта определяется содержимым оригинала, поэтому созданный
+    вариант не меняется и проверять его наличие в хранилище повторно
+    не нужно. Отсутствующий вариант проверяется снова не раньше чем через
+    IMAGE_VARIANT_RECHECK_INTERVAL секунд: пока задача его не создала,
+    сериализация рецептов не обращается к хранилищу.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._names = set()
+        # {имя: время (time.monotonic()) следующей проверки}
+        self._missing = {}
+
+    def exists(self, storage, name):
+        if name in self._names:
+            return True
+        recheck_at = self._missing.get(name)
+        if recheck_at is not None and recheck_at > time.monotonic():
+            return False
+        if storage.exists(name):
+            self.add(name)
+            return True
+        with self._lock:
+            if len(self._missing) >= EXISTING_VARIANTS_LIMIT:
+                self._missing.clear()
+            self._missing[name] = (
+                time.monotonic() + settings.IMAGE_VARIANT_RECHECK_INTERVAL
+            )
+        return False
+
+    def add(self, name):
+        """Отмечает вариант созданным."""
+        with self._lock:
+            if len(self._names) >= EXISTING_VARIANTS_LIMIT:
+                self._names.clear()
+            self._names.add(name)
+            self._missing.pop(name, None)
+
+
+existing_variants = VariantRegistry()
+
+
+def get_image_url(image, size=ORIGINAL_SIZE):
+    """URL варианта изображения; пока вариант не создан - оригинала."""
+    if size != ORIGINAL_SIZE:
+        variant_name = get_variant_name(image.name, size)
+        if existing_variants.exists(image.storage, variant_name):
+            return image.storage.url(variant_name)
+    return image.url
+
+
+def has_all_variants(image):
+    return all(
+        existing_variants.exists(
+            image.storage, get_variant_name(image.name, size)
+        )
+        for size in settings.IMAGE_VARIANT_SIZES
+    )
+
+
+def generate_variants(storage, name):
+    """Создаёт уменьшенные копии изображения для всех размеров из
+    IMAGE_VARIANT_SIZES, которых ещё нет в хранилище, и отмечает их в
+    existing_variants.
+    """
+    variant_format = get_variant_format()
+    missing = {
+        size: get_variant_name(name, size)
+        for size in settings.IMAGE_VARIANT_SIZES
+        if not storage.exists(get_variant_name(name, size))
+    }
+    for size in settings.IMAGE_VARIANT_SIZES:
+        if size not in missing:
+            existing_variants.add(get_variant_name(name, size))
+    if not missing:
+        return
+    with storage.open(name) as file:
+        original = Image.open(file)
+        original.load()
+    if variant_format == 'JPEG' or original.mode not in ('RGB', 'RGBA'):
+        original = original.convert(
+            'RGB' if variant_format == 'JPEG' else 'RGBA'
+        )
+    for size, variant_name in missing.items():
+        dimension = settings.IMAGE_VARIANT_SIZES[size]
+        variant = original.copy()
+        variant.thumbnail((dimension, dimension))
+        buffer = BytesIO()
+        variant.save(buffer, variant_format, quality=85)
+        storage.save_as(variant_name, buffer.getvalue())
+        existing_variants.add(variant_name)
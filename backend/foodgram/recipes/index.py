@@ -0,0 +1,144 @@
+import time
+from bisect import bisect_left
+from hashlib import md5
+from threading import Lock
+
+from django.conf import settings
+
+from recipes.models import Measurement, Tag
+
+# символ, больший любого символа в названиях, - верхняя граница префикса:
+PREFIX_UPPER_BOUND = chr(0x10FFFF)
+
+
+class ProcessIndex:
+    """Данные из базы, закешированные в памяти процесса.
+
+    Строятся при первом обращении и перестраиваются после invalidate()
+    (сигналы) или по истечении ttl секунд - чтобы увидеть изменения,
+    сделанные в других процессах.
+    """
+    ttl = 0
+
+    def __init__(self):
+        self._lock = Lock()
+        self._built_at = 0
+        self._is_built = False
+
+    def invalidate(self):
+        self._is_built = False
+
+    def _is_stale(self):
+        return (not self._is_built
+                or time.monotonic() - self._built_at > self.ttl)
+
+    def _ensure_built(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._build()
+                    self._built_at = time.monotonic()
+                    self._is_built = True
+
+    def _build(self):
+        raise NotImplementedError
+
+
+class MeasurementIndex(ProcessIndex):
+    """Индекс названий компонентов в памяти процесса для автодополнения.
+
+    Названия хранятся в отсортированном списке: совпадения по префиксу
+    находятся двоичным поиском, после них добавляются совпадения по
+    вхождению, ранжированные по позиции вхождения. Индекс строится при
+    первом запросе и перестраивается после изменения компонентов (сигналы)
+    или по истечении INGREDIENT_INDEX_TTL - чтобы увидеть изменения,
+    сделанные в других процессах.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # (названия, элементы, версия, дата изменения) заменяются одним
+        # присваиванием, поэтому читающий без блокировки поток не увидит
+        # списки из разных построений
+        self._snapshot = ([], [], None, None)
+
+    @property
+    def ttl(self):
+        return settings.INGREDIENT_INDEX_TTL
+
+    @property
+    def version(self):
+        """Хеш содержимого индекса - для ETag списка компонентов."""
+        return self._get_snapshot()[2]
+
+    @property
+    def last_modified(self):
+        return self._get_snapshot()[3]
+
+    def _get_snapshot(self):
+        self._ensure_built()
+        return self._snapshot
+
+    def _build(self):
+        last_modified = None
+        rows = []
+        for pk, name, measurement_unit, updated_at in (
+            Measurement.objects.values_list(
+                'id', 'name', 'measurement_unit', 'updated_at'
+            ).iterator()
+        ):
+            rows.append((name.lower(), pk, name, measurement_unit))
+            if last_modified is None or updated_at > last_modified:
+                last_modified = updated_at
+        rows.sort()
+        self._snapshot = (
+            [row[0] for row in rows],
+            [
+                {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+                for key, pk, name, measurement_unit in rows
+            ],
+            md5(repr(rows).encode()).hexdigest(),
+            last_modified
+        )
+
+    def search(self, query, limit=None):
+        names, items, _, _ = self._get_snapshot()
+        query = query.lower()
+        start = bisect_left(names, query)
+        end = bisect_left(names, query + PREFIX_UPPER_BOUND, lo=start)
+        result = items[start:end][:limit]
+        if not query or (limit is not None and len(result) >= limit):
+            return result
+        contains = sorted(
+            (name.find(query), name, position)
+            for position, name in enumerate(names)
+            if (position < start or position >= end) and query in name
+        )
+        result += [items[position] for _, _, position in contains]
+        return result[:limit]
+
+
+class TagIndex(ProcessIndex):
+    """Соответствие slug -> id тэгов для фильтрации рецептов по тэгам
+    без запросов к таблице тэгов.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._ids = {}
+
+    @property
+    def ttl(self):
+        return settings.TAG_INDEX_TTL
+
+    def _build(self):
+        self._ids = dict(Tag.objects.values_list('slug', 'id'))
+
+    def get_ids(self, slugs):
+        """Возвращает id тэгов с указанными slug; неизвестные пропускаются."""
+        self._ensure_built()
+        return [self._ids[slug] for slug in slugs if slug in self._ids]
+
+
+measurement_index = MeasurementIndex()
+tag_index = TagIndex()
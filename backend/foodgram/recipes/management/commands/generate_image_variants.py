@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from recipes.images import generate_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Создаёт недостающие уменьшенные копии изображений рецептов, '
+            'например для рецептов, загруженных до их появления.')
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        names = Recipe.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        processed = 0
+        failed = 0
+        for name in names.iterator():
+            try:
+                generate_variants(storage, name)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Изображений обработано: {processed}, с ошибками: {failed}.'
+        ))
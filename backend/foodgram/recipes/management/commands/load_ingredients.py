@@ -1,34 +1,65 @@
-import csv
-from itertools import islice
+import sys
+import time
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 
-from recipes.models import Measurement
+from recipes.catalogue import (BATCH_SIZE, FORMATS, CatalogueError,
+                               CatalogueLoader, get_format, read_catalogue)
 
-BATCH_SIZE = 100
+# сколько сообщений о неверных элементах выводится:
+MAX_ERRORS = 20
 
 
 class Command(BaseCommand):
-    help = 'Read .csv'
-
-    def handle(self, *args, **kwargs):
-        project_dir = settings.BASE_DIR
-        with open(
-            f'{project_dir}/data/ingredients.csv',
-            'r', encoding='utf-8'
-        ) as csv_file:
-            reader = csv.DictReader(
-                csv_file, fieldnames=['name', 'measurement_unit']
-            )
-            objects = (Measurement(
-                name=line['name'],
-                measurement_unit=line['measurement_unit']) for line in reader
-            )
-            while True:
-                batch = list(islice(objects, BATCH_SIZE))
-                if not batch:
-                    break
-                Measurement.objects.bulk_create(batch, BATCH_SIZE)
-
-        self.stdout.write(self.style.SUCCESS('Ingredients loaded'))
+    help = ('Добавляет компоненты из каталога в формате CSV, JSON или NDJSON; '
+            'уже существующие компоненты пропускаются, поэтому команду можно '
+            'запускать повторно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(settings.BASE_DIR / 'data' / 'ingredients.csv'),
+            help='Путь к файлу каталога; "-" - стандартный ввод. По '
+                 'умолчанию - data/ingredients.csv.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат каталога; по умолчанию определяется по расширению '
+                 'файла (.json, .ndjson, .jsonl), иначе - csv.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество компонентов в одном INSERT.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or get_format(path)
+        self.errors = 0
+        # в массиве JSON элементы нумеруются, в CSV и NDJSON - строки файла
+        self.position_name = 'Элемент' if format == 'json' else 'Строка'
+        loader = CatalogueLoader(options['batch_size'], self.report_error)
+        started_at = time.monotonic()
+        try:
+            if path == '-':
+                stats = loader.load(read_catalogue(sys.stdin, format))
+            else:
+                with open(path, encoding='utf-8', newline='') as file:
+                    stats = loader.load(read_catalogue(file, format))
+        except (OSError, UnicodeDecodeError, CatalogueError) as error:
+            raise CommandError(f'{path}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            'Компонентов прочитано: {read}, добавлено: {inserted}, '
+            'пропущено: {skipped}, с ошибками: {invalid}.'.format(**stats)
+            + f' Время: {time.monotonic() - started_at:.1f} с.'
+        ))
+
+    def report_error(self, number, message):
+        self.errors += 1
+        if self.errors <= MAX_ERRORS:
+            self.stderr.write(f'{self.position_name} {number}: {message}')
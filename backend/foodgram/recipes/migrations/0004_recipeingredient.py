@@ -0,0 +1,93 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_ingredients(apps, schema_editor):
+    # переносит пары (рецепт, Ingredient) из прежней таблицы m2m в
+    # RecipeIngredient, разворачивая общие строки (ингредиент, количество):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    amounts = {}
+    rows = Recipe.ingredients.through.objects.values_list(
+        'recipe_id', 'ingredient__measurement_id', 'ingredient__amount'
+    )
+    for recipe_id, measurement_id, amount in rows.iterator():
+        key = (recipe_id, measurement_id)
+        amounts[key] = amounts.get(key, 0) + amount
+    RecipeIngredient.objects.bulk_create(
+        [
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                measurement_id=measurement_id,
+                amount=amount
+            )
+            for (recipe_id, measurement_id), amount in amounts.items()
+        ],
+        batch_size=1000
+    )
+
+
+def restore_ingredients(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    Through = Recipe.ingredients.through
+    links = []
+    for recipe_ingredient in RecipeIngredient.objects.iterator():
+        ingredient, created = Ingredient.objects.get_or_create(
+            measurement_id=recipe_ingredient.measurement_id,
+            amount=recipe_ingredient.amount
+        )
+        links.append(Through(
+            recipe_id=recipe_ingredient.recipe_id,
+            ingredient_id=ingredient.id
+        ))
+    Through.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_auto_20211208_2133'),
+        # миграция заполняет ShoppingListItem по модели Ingredient:
+        ('organizer', '0005_fill_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=3, max_digits=9, verbose_name='Количество')),
+                ('measurement', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='recipe_ingredients', to='recipes.measurement', verbose_name='Ингредиент')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент рецепта',
+                'verbose_name_plural': 'Ингредиенты рецептов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'measurement'), name='unique_recipe_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.CheckConstraint(check=models.Q(('amount__gt', 0)), name='recipe_ingredient_amount__gt_0'),
+        ),
+        migrations.RunPython(copy_ingredients, restore_ingredients),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='ingredients',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(related_name='recipes', through='recipes.RecipeIngredient', to='recipes.Measurement', verbose_name='Ингредиенты'),
+        ),
+        migrations.DeleteModel(
+            name='Ingredient',
+        ),
+    ]
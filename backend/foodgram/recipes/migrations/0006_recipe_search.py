@@ -0,0 +1,72 @@
+# Generated by Django 3.2.9 on 2026-10-18 19:20
+
+from django.db import migrations
+
+# SQL указан здесь полностью, без импорта из recipes.search: миграция должна
+# создавать индекс в том виде, который был на момент её написания.
+FTS_TABLE = 'recipes_recipe_fts'
+INGREDIENT_NAMES_SQL = (
+    'SELECT {aggregate} FROM recipes_recipeingredient '
+    'INNER JOIN recipes_measurement '
+    'ON recipes_measurement.id = recipes_recipeingredient.measurement_id '
+    'WHERE recipes_recipeingredient.recipe_id = recipes_recipe.id'
+)
+POSTGRESQL_UPDATE_SQL = (
+    "UPDATE recipes_recipe SET search_vector = "
+    "setweight(to_tsvector('russian', name), 'A') "
+    "|| setweight(to_tsvector('russian', coalesce(("
+    + INGREDIENT_NAMES_SQL.format(
+        aggregate="string_agg(recipes_measurement.name, ' ')"
+    )
+    + "), '')), 'B') "
+    "|| setweight(to_tsvector('russian', text), 'C')"
+)
+SQLITE_INSERT_SQL = (
+    f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+    'SELECT recipes_recipe.id, recipes_recipe.name, coalesce(('
+    + INGREDIENT_NAMES_SQL.format(
+        aggregate="group_concat(recipes_measurement.name, ' ')"
+    )
+    + "), ''), recipes_recipe.text FROM recipes_recipe"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector'
+        )
+        schema_editor.execute(
+            'CREATE INDEX recipes_recipe_search_vector_gin '
+            'ON recipes_recipe USING gin (search_vector)'
+        )
+        schema_editor.execute(POSTGRESQL_UPDATE_SQL)
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            f"name, ingredients, text, "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(SQLITE_INSERT_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE recipes_recipe DROP COLUMN search_vector'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:40
+
+from django.db import migrations, models
+import recipes.images
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.images.ContentHashStorage(), upload_to='recipes/', verbose_name='Изображение'),
+        ),
+    ]
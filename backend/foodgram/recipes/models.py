@@ -1,5 +1,6 @@
 from django.db import models
 
+from recipes.images import ContentHashStorage
 from users.models import User
 
 RECIPE_MIN_COOKING_TIME = 1
@@ -20,17 +21,32 @@ class Recipe(models.Model):
         verbose_name='Автор рецепта'
     )
     ingredients = models.ManyToManyField(
-        'Ingredient',
+        'Measurement',
+        through='RecipeIngredient',
         related_name='recipes',
         verbose_name='Ингредиенты'
     )
     name = models.CharField(max_length=200, verbose_name='Название блюда')
-    image = models.ImageField(upload_to='recipes/', verbose_name='Изображение')
+    image = models.ImageField(
+        upload_to='recipes/',
+        storage=ContentHashStorage(),
+        verbose_name='Изображение'
+    )
     text = models.TextField(verbose_name='Рецепт')
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время приготовления, мин.',
         default=RECIPE_MIN_COOKING_TIME
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='Добавлений в избранное'
+    )
 
     class Meta:
         constraints = [
@@ -61,6 +77,10 @@ class Tag(models.Model):
     )
     color = models.CharField(unique=True, max_length=7, verbose_name='Цвет')
     slug = models.SlugField(unique=True, max_length=200, verbose_name='Слаг')
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         verbose_name = 'Тэг'
@@ -70,11 +90,17 @@ class Tag(models.Model):
         return self.name
 
 
-class Ingredient(models.Model):
+class RecipeIngredient(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
+        verbose_name='Рецепт'
+    )
     measurement = models.ForeignKey(
         'Measurement',
         on_delete=models.PROTECT,
-        related_name='ingredients',
+        related_name='recipe_ingredients',
         verbose_name='Ингредиент'
     )
     amount = models.DecimalField(
@@ -86,16 +112,16 @@ class Ingredient(models.Model):
     class Meta:
         constraints = [
             models.UniqueConstraint(
-                fields=['measurement', 'amount'],
-                name='unique_ingredient_amount'
+                fields=['recipe', 'measurement'],
+                name='unique_recipe_ingredient'
             ),
             models.CheckConstraint(
                 check=models.Q(amount__gt=INGREDIENT_MIN_AMOUNT),
-                name=f'amount__gt_{INGREDIENT_MIN_AMOUNT}'
+                name=f'recipe_ingredient_amount__gt_{INGREDIENT_MIN_AMOUNT}'
             )
         ]
-        verbose_name = 'Ингредиент'
-        verbose_name_plural = 'Ингредиенты'
+        verbose_name = 'Ингредиент рецепта'
+        verbose_name_plural = 'Ингредиенты рецептов'
 
     def __str__(self):
         return f'{str(self.measurement)}, {self.amount}'
@@ -110,6 +136,10 @@ class Measurement(models.Model):
         max_length=100,
         verbose_name='Единица измерения'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         constraints = [
@@ -0,0 +1,133 @@
+"""Полнотекстовый поиск рецептов по названию, тексту и ингредиентам.
+
+PostgreSQL: столбец recipes_recipe.search_vector (tsvector, конфигурация
+russian) с GIN-индексом. SQLite: виртуальная таблица FTS5
+recipes_recipe_fts, rowid которой совпадает с id рецепта. Обе структуры
+создаются миграцией 0006_recipe_search и обновляются сигналами после
+сохранения рецепта. Для остальных СУБД используется поиск по вхождению.
+"""
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+POSTGRESQL_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+# веса столбцов FTS5 для bm25(): название, ингредиенты, текст
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+INGREDIENT_NAMES_SQL = (
+    'SELECT {aggregate} FROM recipes_recipeingredient '
+    'INNER JOIN recipes_measurement '
+    'ON recipes_measurement.id = recipes_recipeingredient.measurement_id '
+    'WHERE recipes_recipeingredient.recipe_id = recipes_recipe.id'
+)
+POSTGRESQL_UPDATE_SQL = (
+    "UPDATE recipes_recipe SET search_vector = "
+    "setweight(to_tsvector(%(config)s, name), 'A') "
+    "|| setweight(to_tsvector(%(config)s, coalesce(("
+    + INGREDIENT_NAMES_SQL.format(
+        aggregate="string_agg(recipes_measurement.name, ' ')"
+    )
+    + "), '')), 'B') "
+    "|| setweight(to_tsvector(%(config)s, text), 'C') "
+)
+SQLITE_INSERT_SQL = (
+    f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+    'SELECT recipes_recipe.id, recipes_recipe.name, coalesce(('
+    + INGREDIENT_NAMES_SQL.format(
+        aggregate="group_concat(recipes_measurement.name, ' ')"
+    )
+    + "), ''), recipes_recipe.text FROM recipes_recipe "
+)
+
+
+def update_search_index(recipe_ids=None, db_connection=None):
+    """Обновляет поисковый индекс рецептов (всех, если recipe_ids=None)."""
+    db_connection = db_connection or connection
+    vendor = db_connection.vendor
+    with db_connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            sql = POSTGRESQL_UPDATE_SQL
+            params = {'config': POSTGRESQL_CONFIG}
+            if recipe_ids is not None:
+                sql += 'WHERE id = ANY(%(ids)s::bigint[])'
+                params['ids'] = list(recipe_ids)
+            cursor.execute(sql, params)
+        elif vendor == 'sqlite':
+            if recipe_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+                cursor.execute(SQLITE_INSERT_SQL)
+                return
+            recipe_ids = list(recipe_ids)
+            if not recipe_ids:
+                return
+            placeholders = ', '.join(['%s'] * len(recipe_ids))
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                recipe_ids
+            )
+            cursor.execute(
+                SQLITE_INSERT_SQL
+                + f'WHERE recipes_recipe.id IN ({placeholders})',
+                recipe_ids
+            )
+
+
+def remove_from_search_index(recipe_id):
+    # в PostgreSQL вектор хранится в строке рецепта и удаляется вместе с ней
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id]
+            )
+
+
+def get_fts_query(query):
+    # каждое слово - отдельная фраза в кавычках с поиском по префиксу,
+    # так пользовательский ввод не интерпретируется как синтаксис FTS5
+    return ' '.join(
+        '"{}"*'.format(word.replace('"', '""')) for word in query.split()
+    )
+
+
+def search_recipes(queryset, query):
+    """Оставляет рецепты, подходящие под запрос, и сортирует их по
+    релевантности (аннотация search_rank).
+    """
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        tsquery = 'plainto_tsquery(%s, %s)'
+        queryset = queryset.annotate(
+            search_match=RawSQL(
+                f'recipes_recipe.search_vector @@ {tsquery}',
+                (POSTGRESQL_CONFIG, query),
+                output_field=BooleanField()
+            ),
+            search_rank=RawSQL(
+                f'ts_rank(recipes_recipe.search_vector, {tsquery})',
+                (POSTGRESQL_CONFIG, query),
+                output_field=FloatField()
+            )
+        ).filter(search_match=True)
+    elif vendor == 'sqlite':
+        fts_query = get_fts_query(query)
+        if not fts_query:
+            return queryset
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (fts_query,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = recipes_recipe.id',
+            (fts_query,),
+            output_field=FloatField()
+        ))
+    else:
+        queryset = queryset.filter(
+            Q(name__icontains=query)
+            | Q(text__icontains=query)
+            | Q(ingredients__name__icontains=query)
+        ).distinct().annotate(search_rank=Value(0.0))
+    return queryset.order_by('-search_rank', '-id')
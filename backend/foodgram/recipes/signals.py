@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.images import has_all_variants
+from recipes.index import measurement_index, tag_index
+from recipes.models import Measurement, Recipe, Tag
+from recipes.search import remove_from_search_index, update_search_index
+from recipes.tasks import generate_image_variants
+from users.models import AUTHOR_FIELDS, User
+
+
+@receiver(post_save, sender=Measurement)
+@receiver(post_delete, sender=Measurement)
+def invalidate_measurement_index(sender, **kwargs):
+    measurement_index.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_index(sender, **kwargs):
+    tag_index.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(sender, instance, **kwargs):
+    # тэг входит в представление рецепта: меняем updated_at рецептов,
+    # чтобы изменились их ETag и Last-Modified
+    Recipe.objects.filter(tags=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Measurement)
+def touch_measurement_recipes(sender, instance, created, **kwargs):
+    if not created:
+        recipes = Recipe.objects.filter(ingredients=instance)
+        recipes.update(updated_at=timezone.now())
+        # название ингредиента входит в поисковый индекс рецепта:
+        update_search_index(recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields, **kwargs):
+    # автор входит в представление рецепта; при входе пользователя
+    # сохраняется только last_login, и рецепты не затрагиваются
+    if created or (update_fields and not AUTHOR_FIELDS & update_fields):
+        return
+    Recipe.objects.filter(author=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(sender, instance, **kwargs):
+    # индекс обновляется после фиксации транзакции, когда ингредиенты
+    # рецепта уже записаны
+    transaction.on_commit(lambda: update_search_index([instance.id]))
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_image_variants(sender, instance, **kwargs):
+    # уменьшенные копии создаются фоновой задачей; задача сохраняется
+    # в той же транзакции, что и рецепт
+    if instance.image and not has_all_variants(instance.image):
+        generate_image_variants.delay(
+            instance.image.name, user=instance.author
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_search_index(sender, instance, **kwargs):
+    remove_from_search_index(instance.id)
@@ -0,0 +1,8 @@
+from recipes.images import generate_variants
+from recipes.models import Recipe
+from tasks.queue import task
+
+
+@task(max_attempts=3)
+def generate_image_variants(name):
+    generate_variants(Recipe._meta.get_field('image').storage, name)
@@ -0,0 +1,104 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from recipes.catalogue import CatalogueLoader, CopyStream
+from recipes.models import Measurement
+
+# значения, которые в текстовом формате COPY нужно экранировать
+SPECIAL_NAMES = (
+    'соль\tкрупная',
+    'сахар\\ванильный',
+    '\\N',
+    'мука\nпшеничная',
+    'перец\rчёрный',
+    'ёжевика «лесная»',
+)
+
+
+class CopyStreamTest(SimpleTestCase):
+    """Строки каталога в текстовом формате COPY."""
+
+    def test_escaping(self):
+        stream = CopyStream(iter([('a\tb', 'c\\d'), ('e\nf', 'g\rh')]), 1)
+        self.assertEqual(
+            stream.read(),
+            b'a\\tb\tc\\\\d\ne\\nf\tg\\rh\n'
+        )
+
+    def test_read_by_size(self):
+        rows = [(f'компонент {number}', 'г') for number in range(10)]
+        expected = ''.join(f'{name}\t{unit}\n' for name, unit in rows)
+        stream = CopyStream(iter(rows), 3)
+        chunks = []
+        while True:
+            chunk = stream.read(7)
+            if not chunk:
+                break
+            self.assertLessEqual(len(chunk), 7)
+            chunks.append(chunk)
+        # части могут разрезать многобайтовые символы UTF-8
+        self.assertEqual(b''.join(chunks).decode(), expected)
+
+
+class CatalogueLoaderTest(TestCase):
+    """Загрузка каталога компонентов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Measurement.objects.create(name='соль', measurement_unit='г')
+
+    def load(self, items, **kwargs):
+        self.errors = []
+        loader = CatalogueLoader(
+            on_error=lambda *error: self.errors.append(error), **kwargs
+        )
+        return loader.load(enumerate(items, 1))
+
+    def get_names(self):
+        return set(Measurement.objects.values_list('name', 'measurement_unit'))
+
+    def test_load(self):
+        stats = self.load([
+            ['соль', 'г'],
+            ['сахар', 'г'],
+            {'name': ' молоко ', 'measurement_unit': 'мл'},
+            ['сахар', 'г'],
+            ['гастропаб', ''],
+            ['', 'г'],
+            ['вода', None],
+            ['мука\x00', 'г'],
+        ], batch_size=2)
+        self.assertEqual(
+            stats, {'read': 8, 'inserted': 3, 'skipped': 2, 'invalid': 3}
+        )
+        self.assertEqual([number for number, _ in self.errors], [6, 7, 8])
+        self.assertEqual(self.get_names(), {
+            ('соль', 'г'), ('сахар', 'г'), ('молоко', 'мл'), ('гастропаб', '')
+        })
+
+    def test_repeated_load(self):
+        items = [['сахар', 'г'], ['молоко', 'мл']]
+        self.assertEqual(self.load(items)['inserted'], 2)
+        self.assertEqual(
+            self.load(items),
+            {'read': 2, 'inserted': 0, 'skipped': 2, 'invalid': 0}
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'нужен PostgreSQL')
+    def test_copy_special_characters(self):
+        items = [[name, 'г'] for name in SPECIAL_NAMES]
+        # повторы внутри каталога и уже существующий компонент:
+        items += [[SPECIAL_NAMES[0], 'г'], ['соль', 'г']]
+        stats = self.load(items, batch_size=2)
+        self.assertEqual(stats, {
+            'read': len(items),
+            'inserted': len(SPECIAL_NAMES),
+            'skipped': 2,
+            'invalid': 0,
+        })
+        names = Measurement.objects.exclude(name='соль').values_list(
+            'name', flat=True
+        )
+        self.assertEqual(sorted(names), sorted(SPECIAL_NAMES))
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from PIL import Image
+from recipes.images import (ContentHashStorage, VariantRegistry,
+                            existing_variants, generate_variants,
+                            get_variant_name)
+
+
+class ContentHashStorageTest(SimpleTestCase):
+    """Файл с тем же содержимым сохраняется один раз."""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.storage = ContentHashStorage(location=self.location)
+
+    def get_files(self):
+        return sorted(os.listdir(os.path.join(self.location, 'recipes')))
+
+    def test_same_content(self):
+        first = self.storage.save('recipes/a.png', ContentFile(b'image'))
+        second = self.storage.save('recipes/b.PNG', ContentFile(b'image'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.endswith('.png'))
+        self.assertEqual(self.get_files(), [os.path.basename(first)])
+
+    def test_other_content(self):
+        first = self.storage.save('recipes/a.png', ContentFile(b'image'))
+        second = self.storage.save('recipes/a.png', ContentFile(b'other'))
+        self.assertNotEqual(first, second)
+        self.assertEqual(len(self.get_files()), 2)
+
+    def test_file_created_after_check(self):
+        name = self.storage.save('recipes/a.png', ContentFile(b'image'))
+        # другой процесс записал файл между exists() и записью:
+        with mock.patch.object(self.storage, 'exists', return_value=False):
+            second = self.storage.save('recipes/a.png', ContentFile(b'image'))
+        self.assertEqual(second, name)
+        # временный файл удалён, сохранённый не изменился
+        self.assertEqual(self.get_files(), [os.path.basename(name)])
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'image')
+
+
+@override_settings(IMAGE_VARIANT_RECHECK_INTERVAL=30)
+class VariantRegistryTest(SimpleTestCase):
+    """Наличие вариантов изображений проверяется в хранилище редко."""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.storage = ContentHashStorage(location=self.location)
+
+    def test_missing_variant_rechecked_after_interval(self):
+        registry = VariantRegistry()
+        storage = mock.Mock()
+        storage.exists.return_value = False
+        with mock.patch('recipes.images.time') as clock:
+            clock.monotonic.return_value = 100
+            self.assertFalse(registry.exists(storage, 'recipes/a.webp'))
+            clock.monotonic.return_value = 129
+            self.assertFalse(registry.exists(storage, 'recipes/a.webp'))
+            self.assertEqual(storage.exists.call_count, 1)
+            clock.monotonic.return_value = 130
+            storage.exists.return_value = True
+            self.assertTrue(registry.exists(storage, 'recipes/a.webp'))
+            self.assertTrue(registry.exists(storage, 'recipes/a.webp'))
+        self.assertEqual(storage.exists.call_count, 2)
+
+    def test_generated_variants_recorded(self):
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480)).save(buffer, 'PNG')
+        name = self.storage.save(
+            'recipes/a.png', ContentFile(buffer.getvalue())
+        )
+        generate_variants(self.storage, name)
+        with mock.patch.object(self.storage, 'exists') as exists:
+            for size in settings.IMAGE_VARIANT_SIZES:
+                self.assertTrue(existing_variants.exists(
+                    self.storage, get_variant_name(name, size)
+                ))
+        exists.assert_not_called()
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from foodgram.paginators import EstimatedCountPaginator
+from tasks.models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'attempts', 'user', 'created_at',
+        'finished_at'
+    )
+    list_select_related = ('user',)
+    search_fields = ('name__startswith',)
+    list_filter = ('status',)
+    raw_id_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,90 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connections
+
+from tasks.queue import delete_finished_tasks, discover_tasks, run_worker
+
+# как часто (с) основной процесс удаляет старые завершённые задачи:
+CLEANUP_INTERVAL = 3600
+
+
+def worker_main(poll_interval, burst, stop_event, processed):
+    # остановку обрабатывает основной процесс и сообщает через stop_event:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    count = run_worker(poll_interval, burst, stop_event)
+    with processed.get_lock():
+        processed.value += count
+
+
+class Command(BaseCommand):
+    help = ('Запускает процессы, выполняющие фоновые задачи из очереди '
+            'в базе данных.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.TASK_WORKERS,
+            help='Количество процессов-исполнителей.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза (с) между проверками пустой очереди.'
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда в очереди не останется готовых задач.'
+        )
+
+    def handle(self, *args, **options):
+        discover_tasks()
+        # процессы создаются через fork: у них не должно быть общих
+        # с родителем соединений с базой
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop_event = context.Event()
+        processed = context.Value('i', 0)
+        workers = [
+            context.Process(
+                target=worker_main,
+                args=(options['poll_interval'], options['burst'],
+                      stop_event, processed),
+                name=f'task-worker-{number}'
+            )
+            for number in range(options['processes'])
+        ]
+
+        def stop(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        started_at = time.monotonic()
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            f'Запущено исполнителей: {len(workers)}.'
+        )
+        while any(worker.is_alive() for worker in workers):
+            deleted = delete_finished_tasks(settings.TASK_RESULT_DAYS)
+            if deleted:
+                self.stdout.write(f'Удалено старых задач: {deleted}.')
+            connections.close_all()
+            deadline = time.monotonic() + CLEANUP_INTERVAL
+            for worker in workers:
+                worker.join(max(deadline - time.monotonic(), 0))
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {processed.value} за {elapsed:.1f} с '
+            f'({processed.value / elapsed if elapsed else 0:.1f} в секунду).'
+        ))
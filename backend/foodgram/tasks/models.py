@@ -0,0 +1,75 @@
+from django.db import models
+from django.utils import timezone
+
+from users.models import User
+
+
+class Task(models.Model):
+    """Фоновая задача: вызов зарегистрированной функции с аргументами.
+
+    Задачи выбирает и выполняет команда run_workers.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает выполнения'),
+        (RUNNING, 'Выполняется'),
+        (SUCCEEDED, 'Выполнена'),
+        (FAILED, 'Завершилась ошибкой'),
+    )
+
+    name = models.CharField(max_length=200, verbose_name='Функция')
+    args = models.JSONField(default=list, verbose_name='Аргументы')
+    kwargs = models.JSONField(
+        default=dict, verbose_name='Именованные аргументы'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    result = models.JSONField(null=True, blank=True, verbose_name='Результат')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    attempts = models.PositiveIntegerField(
+        default=0, verbose_name='Число попыток'
+    )
+    max_attempts = models.PositiveIntegerField(
+        default=3, verbose_name='Наибольшее число попыток'
+    )
+    user = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='tasks',
+        verbose_name='Пользователь'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить не раньше'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата создания'
+    )
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Начало выполнения'
+    )
+    finished_at = models.DateTimeField(
+        null=True, blank=True, db_index=True, verbose_name='Завершение'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='task_status_run_at'
+            ),
+        ]
+        ordering = ['-id']
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'Задача id={self.id}: {self.name} ({self.status})'
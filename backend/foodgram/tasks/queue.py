@@ -0,0 +1,218 @@
+import logging
+import time
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Avg, Count, DurationField, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules, import_string
+
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+# зарегистрированные функции-задачи: {имя: функция}
+TASKS = {}
+
+
+def task(max_attempts=3):
+    """Регистрирует функцию как фоновую задачу.
+
+    Функция получает метод delay(*args, user=None, **kwargs), который
+    сохраняет задачу в базе; аргументы должны сериализоваться в JSON.
+    Задача сохраняется в текущей транзакции и станет видна исполнителям
+    только после её фиксации.
+    """
+    def decorator(function):
+        function.task_name = f'{function.__module__}.{function.__name__}'
+        function.max_attempts = max_attempts
+        function.delay = partial(enqueue, function)
+        TASKS[function.task_name] = function
+        return function
+    return decorator
+
+
+def enqueue(function, *args, user=None, **kwargs):
+    return Task.objects.create(
+        name=function.task_name,
+        args=list(args),
+        kwargs=kwargs,
+        user=user,
+        max_attempts=function.max_attempts
+    )
+
+
+def discover_tasks():
+    """Импортирует модули tasks всех приложений, чтобы задачи
+    зарегистрировались.
+    """
+    autodiscover_modules('tasks')
+
+
+def get_task_function(name):
+    if name not in TASKS:
+        # модуль задачи мог быть не импортирован исполнителем:
+        function = import_string(name)
+        if TASKS.get(getattr(function, 'task_name', None)) is not function:
+            raise LookupError(f'{name} не зарегистрирована как задача.')
+    return TASKS[name]
+
+
+def get_retry_delay(attempts):
+    """Экспоненциальная задержка перед повтором: TASK_RETRY_DELAY,
+    затем вдвое больше после каждой неудачной попытки.
+    """
+    return min(
+        settings.TASK_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.TASK_MAX_RETRY_DELAY
+    )
+
+
+def claim_task():
+    """Выбирает задачу, готовую к выполнению, и помечает её выполняемой.
+
+    Ожидающие задачи блокируются через SELECT ... FOR UPDATE SKIP LOCKED,
+    поэтому исполнители не ждут друг друга. Задачи, выполнение которых
+    дольше TASK_TIMEOUT (например, исполнитель был остановлен), выбираются
+    повторно. Возвращает None, если задач нет.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASK_TIMEOUT)
+    with transaction.atomic():
+        task = Task.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Task.PENDING, run_at__lte=now)
+            | Q(status=Task.RUNNING, started_at__lt=stale)
+        ).order_by('run_at', 'id').first()
+        if task is None:
+            return None
+        # без SELECT ... FOR UPDATE (SQLite) задачу мог уже выбрать
+        # другой исполнитель - тогда строка не обновится:
+        claimed = Task.objects.filter(
+            pk=task.pk, status=task.status, attempts=task.attempts
+        ).update(
+            status=Task.RUNNING, started_at=now, attempts=F('attempts') + 1
+        )
+    if not claimed:
+        return None
+    task.status = Task.RUNNING
+    task.started_at = now
+    task.attempts += 1
+    return task
+
+
+def execute_task(task):
+    """Выполняет выбранную задачу и сохраняет результат.
+
+    При ошибке задача возвращается в очередь с задержкой, пока не
+    исчерпано число попыток. Результат не записывается, если задачу
+    за это время выбрал другой исполнитель.
+    """
+    current = Task.objects.filter(
+        pk=task.pk, status=Task.RUNNING, attempts=task.attempts
+    )
+    try:
+        result = get_task_function(task.name)(*task.args, **task.kwargs)
+    except Exception as error:
+        logger.exception('Задача id=%s (%s) завершилась ошибкой',
+                         task.id, task.name)
+        now = timezone.now()
+        if task.attempts < task.max_attempts:
+            current.update(
+                status=Task.PENDING,
+                error=repr(error),
+                run_at=now + timedelta(
+                    seconds=get_retry_delay(task.attempts)
+                )
+            )
+        else:
+            current.update(
+                status=Task.FAILED, error=repr(error), finished_at=now
+            )
+        return False
+    current.update(
+        status=Task.SUCCEEDED, result=result, error='',
+        finished_at=timezone.now()
+    )
+    return True
+
+
+def run_worker(poll_interval, burst=False, stop_event=None):
+    """Выполняет задачи, пока не установлен stop_event; если задач нет,
+    ждёт poll_interval секунд или, при burst=True, завершается.
+    Возвращает число выполненных задач.
+    """
+    def wait():
+        if stop_event is None:
+            time.sleep(poll_interval)
+        else:
+            stop_event.wait(poll_interval)
+
+    processed = 0
+    while stop_event is None or not stop_event.is_set():
+        close_old_connections()
+        try:
+            task = claim_task()
+        except DatabaseError:
+            # например, потеряно соединение или база заблокирована (SQLite):
+            # исполнитель не завершается, а повторяет попытку позже
+            logger.exception('Не удалось выбрать задачу из очереди')
+            wait()
+            continue
+        if task is None:
+            if burst:
+                break
+            wait()
+            continue
+        execute_task(task)
+        processed += 1
+    close_old_connections()
+    return processed
+
+
+def delete_finished_tasks(days):
+    """Удаляет завершённые задачи старше days дней."""
+    deleted, _ = Task.objects.filter(
+        status__in=(Task.SUCCEEDED, Task.FAILED),
+        finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
+
+
+def get_stats():
+    """Состояние очереди и пропускная способность за последний час."""
+    now = timezone.now()
+    counts = dict(
+        Task.objects.order_by().values_list('status').annotate(Count('id'))
+    )
+    oldest = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=now
+    ).aggregate(run_at=Min('run_at'))['run_at']
+    last_hour = Task.objects.filter(
+        finished_at__gte=now - timedelta(hours=1)
+    ).aggregate(
+        succeeded=Count('id', filter=Q(status=Task.SUCCEEDED)),
+        failed=Count('id', filter=Q(status=Task.FAILED)),
+        duration=Avg(
+            F('finished_at') - F('started_at'), output_field=DurationField()
+        )
+    )
+    duration = last_hour['duration']
+    return {
+        'statuses': {
+            status: counts.get(status, 0) for status, _ in Task.STATUSES
+        },
+        # сколько секунд ждёт самая старая готовая к выполнению задача:
+        'queue_lag': (now - oldest).total_seconds() if oldest else 0,
+        'last_hour': {
+            'succeeded': last_hour['succeeded'],
+            'failed': last_hour['failed'],
+            'per_minute': round(
+                (last_hour['succeeded'] + last_hour['failed']) / 60, 2
+            ),
+            'average_duration': (
+                duration.total_seconds() if duration is not None else None
+            ),
+        },
+    }
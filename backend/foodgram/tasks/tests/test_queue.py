@@ -0,0 +1,177 @@
+import signal
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.utils import timezone
+
+from api.tests.utils import create_user
+from tasks.models import Task
+from tasks.queue import (claim_task, execute_task, get_retry_delay, run_worker,
+                         task)
+
+
+@task()
+def add(first, second, scale=1):
+    return (first + second) * scale
+
+
+@task(max_attempts=2)
+def fail():
+    raise ValueError('ошибка задачи')
+
+
+def run_ready_task():
+    claimed = claim_task()
+    execute_task(claimed)
+    claimed.refresh_from_db()
+    return claimed
+
+
+class RetryDelayTest(SimpleTestCase):
+
+    @override_settings(TASK_RETRY_DELAY=10, TASK_MAX_RETRY_DELAY=60)
+    def test_delay(self):
+        self.assertEqual(
+            [get_retry_delay(attempts) for attempts in range(1, 6)],
+            [10, 20, 40, 60, 60]
+        )
+
+
+@override_settings(TASK_RETRY_DELAY=10, TASK_TIMEOUT=60)
+class QueueTest(TestCase):
+    """Очередь задач в базе: добавление, выбор, повторы и ошибки."""
+
+    def test_enqueue(self):
+        user = create_user(1)
+        queued = add.delay(1, 2, user=user, scale=3)
+        queued.refresh_from_db()
+        self.assertEqual(
+            (queued.name, queued.args, queued.kwargs, queued.user),
+            (add.task_name, [1, 2], {'scale': 3}, user)
+        )
+        self.assertEqual(queued.status, Task.PENDING)
+        self.assertEqual(queued.attempts, 0)
+        self.assertEqual(fail.delay().max_attempts, 2)
+
+    def test_claim(self):
+        Task.objects.create(
+            name=add.task_name, args=[1, 1],
+            run_at=timezone.now() + timedelta(minutes=1)
+        )
+        ready = add.delay(1, 2)
+        claimed = claim_task()
+        self.assertEqual(claimed.pk, ready.pk)
+        self.assertEqual((claimed.status, claimed.attempts), (Task.RUNNING, 1))
+        # выбранная задача и задача, время которой не наступило, не
+        # выбираются повторно
+        self.assertIsNone(claim_task())
+        self.assertTrue(execute_task(claimed))
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Task.SUCCEEDED)
+        self.assertEqual(claimed.result, 3)
+        self.assertIsNotNone(claimed.finished_at)
+
+    def test_stale_task_claimed_again(self):
+        queued = add.delay(1, 2)
+        claim_task()
+        Task.objects.filter(pk=queued.pk).update(
+            started_at=timezone.now() - timedelta(seconds=61)
+        )
+        claimed = claim_task()
+        self.assertEqual(claimed.pk, queued.pk)
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_retry_and_fail(self):
+        queued = fail.delay()
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            failed = run_ready_task()
+        self.assertEqual((failed.status, failed.attempts), (Task.PENDING, 1))
+        self.assertIn('ошибка задачи', failed.error)
+        self.assertGreater(
+            failed.run_at, timezone.now() + timedelta(seconds=9)
+        )
+        self.assertIsNone(claim_task())
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        # попытки исчерпаны (max_attempts=2)
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            failed = run_ready_task()
+        self.assertEqual((failed.status, failed.attempts), (Task.FAILED, 2))
+        self.assertIsNotNone(failed.finished_at)
+        self.assertIsNone(claim_task())
+
+    def test_result_of_reclaimed_task_ignored(self):
+        add.delay(1, 2)
+        claimed = claim_task()
+        # задачу выбрал другой исполнитель (попытка 2)
+        Task.objects.filter(pk=claimed.pk).update(attempts=2)
+        execute_task(claimed)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Task.RUNNING)
+
+    def test_run_worker(self):
+        for number in range(3):
+            add.delay(number, 1)
+        fail.delay()
+        # соединение теста открыто в транзакции и не должно закрываться
+        with mock.patch('tasks.queue.close_old_connections'):
+            with self.assertLogs('tasks.queue', 'ERROR'):
+                self.assertEqual(run_worker(0, burst=True), 4)
+        self.assertEqual(
+            sorted(Task.objects.values_list('status', flat=True)),
+            [Task.PENDING] + [Task.SUCCEEDED] * 3
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'нужен PostgreSQL')
+class ConcurrentQueueTest(TransactionTestCase):
+    """Исполнители в разных соединениях и процессах."""
+
+    def test_locked_task_skipped(self):
+        locked = add.delay(1, 1)
+        free = add.delay(1, 2)
+        is_locked = threading.Event()
+        release = threading.Event()
+
+        def lock_task():
+            # другой исполнитель держит блокировку строки задачи
+            try:
+                with transaction.atomic():
+                    Task.objects.select_for_update().get(pk=locked.pk)
+                    is_locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=lock_task)
+        thread.start()
+        try:
+            self.assertTrue(is_locked.wait(10))
+            claimed = claim_task()
+            self.assertEqual(claimed.pk, free.pk)
+            self.assertIsNone(claim_task())
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(claim_task().pk, locked.pk)
+
+    def test_run_workers(self):
+        # команда устанавливает обработчики сигналов остановки
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        for number in range(5):
+            add.delay(number, 1)
+        stdout = StringIO()
+        call_command(
+            'run_workers', processes=2, burst=True, poll_interval=0.1,
+            stdout=stdout
+        )
+        self.assertIn('Выполнено задач: 5', stdout.getvalue())
+        self.assertEqual(
+            Task.objects.filter(status=Task.SUCCEEDED).count(), 5
+        )
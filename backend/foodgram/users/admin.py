@@ -1,12 +1,20 @@
 from django.contrib import admin
 
+from foodgram.paginators import EstimatedCountPaginator
 from users.models import User
 
 
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'username', 'email', 'first_name', 'last_name')
-    search_fields = ('username', 'email')
-    list_filter = ('username', 'email')
+    list_display = (
+        'pk', 'username', 'email', 'first_name', 'last_name',
+        'recipes_count', 'followers_count'
+    )
+    readonly_fields = ('recipes_count', 'followers_count')
+    # поиск по началу имени или адреса использует индексы уникальных полей
+    search_fields = ('username__startswith', 'email__startswith')
+    list_filter = ('is_staff', 'is_active')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
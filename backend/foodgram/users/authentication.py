@@ -0,0 +1,155 @@
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+
+def get_revoked_key(user_id):
+    return f'token-revoked:{user_id}'
+
+
+class TokenCache:
+    """Кеш токен -> (пользователь, токен) в памяти процесса.
+
+    Хранит не больше TOKEN_CACHE_SIZE записей, вытесняя давно не
+    использованные; запись действительна TOKEN_CACHE_TTL секунд.
+    Изменения в текущем процессе (выход, изменение пользователя)
+    удаляют записи сразу (users.signals) и записывают в кеш из CACHES
+    время отзыва токенов пользователя. При попадании это время
+    сравнивается со временем проверки записи по базе, поэтому при общем
+    CACHES выход в другом процессе виден сразу, а при кеше в памяти
+    процесса - через TOKEN_CACHE_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        # меняется при каждом удалении записей: данные, прочитанные из базы
+        # до удаления, не попадут в кеш
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        expires, value, checked_at = entry
+        # токены пользователя могли быть отозваны в другом процессе после
+        # проверки записи по базе
+        revoked_at = cache.get(get_revoked_key(value[0].pk))
+        with self._lock:
+            if revoked_at is None or revoked_at < checked_at:
+                self.hits += 1
+                return value
+            self.misses += 1
+            if self._entries.get(key) is entry:
+                self._remove(key)
+                self.invalidations += 1
+            return None
+
+    def set(self, key, value, generation, checked_at):
+        """Добавляет запись, прочитанную из базы начиная с момента
+        checked_at (time.time()), если с получения generation записи не
+        удалялись.
+        """
+        size = settings.TOKEN_CACHE_SIZE
+        ttl = settings.TOKEN_CACHE_TTL
+        if not size or not ttl:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, checked_at)
+            self._user_keys[value[0].pk] = key
+            while len(self._entries) > size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._generation += 1
+            if self._remove(key):
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id):
+        if settings.TOKEN_CACHE_TTL:
+            # отметка хранится дольше записей, добавленных до отзыва
+            cache.set(
+                get_revoked_key(user_id), time.time(),
+                2 * settings.TOKEN_CACHE_TTL
+            )
+        with self._lock:
+            self._generation += 1
+            key = self._user_keys.get(user_id)
+            if key is not None and self._remove(key):
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': settings.TOKEN_CACHE_SIZE,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        user_id = entry[1][0].pk
+        if self._user_keys.get(user_id) == key:
+            del self._user_keys[user_id]
+        return True
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, которая не обращается к базе для токенов,
+    недавно проверенных этим процессом (token_cache); отзыв токенов
+    проверяется по кешу из CACHES.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, token = cached
+            # у каждого запроса своя копия: изменения request.user в одном
+            # запросе не видны другим
+            return copy.copy(user), token
+        generation = token_cache.generation
+        checked_at = time.time()
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, (copy.copy(user), token), generation, checked_at)
+        return user, token
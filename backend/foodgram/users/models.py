@@ -1,6 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+# поля пользователя, которые входят в представление автора рецепта:
+AUTHOR_FIELDS = frozenset(('email', 'username', 'first_name', 'last_name'))
+
 
 class User(AbstractUser):
     email = models.EmailField(
@@ -11,6 +14,14 @@ class User(AbstractUser):
     first_name = models.CharField('Имя', max_length=150)
     last_name = models.CharField('Фамилия', max_length=150)
     password = models.CharField('Пароль', max_length=150)
+    # счётчики обновляются сигналами organizer.signals и проверяются
+    # командой reconcile_counters:
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
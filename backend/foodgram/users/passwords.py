@@ -0,0 +1,69 @@
+import fcntl
+import os
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import (check_password, get_hasher,
+                                         identify_hasher, make_password)
+from rest_framework.exceptions import Throttled
+
+PASSWORD_CHECK_BUSY = ('Слишком много одновременных попыток входа, '
+                       'повторите запрос позже.')
+
+
+def verify_password(raw_password, encoded):
+    """Проверяет пароль; если хеш создан не основным алгоритмом или с
+    устаревшими параметрами (например, числом итераций), возвращает
+    также новый хеш пароля.
+    """
+    if not check_password(raw_password, encoded):
+        return False, None
+    preferred = get_hasher()
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return True, None
+    if (hasher.algorithm != preferred.algorithm
+            or preferred.must_update(encoded)):
+        return True, make_password(raw_password, hasher=preferred)
+    return True, None
+
+
+@contextmanager
+def password_check_slot():
+    """Занимает одно из PASSWORD_CHECK_CONCURRENCY мест для проверки
+    пароля; если все места заняты, сразу вызывает Throttled (ответ 429
+    с заголовком Retry-After), а не занимает процесс ожиданием.
+
+    Место - файл в PASSWORD_CHECK_LOCK_DIR, заблокированный flock: места
+    общие для всех процессов gunicorn на сервере, а блокировку процесса,
+    завершившегося во время проверки, снимает система.
+    """
+    concurrency = settings.PASSWORD_CHECK_CONCURRENCY
+    if not concurrency:
+        yield
+        return
+    lock_dir = settings.PASSWORD_CHECK_LOCK_DIR
+    os.makedirs(lock_dir, exist_ok=True)
+    # места перебираются в случайном порядке, чтобы одновременные
+    # запросы не проверяли одни и те же файлы первыми
+    for slot in random.sample(range(concurrency), concurrency):
+        descriptor = os.open(
+            os.path.join(lock_dir, f'slot-{slot}.lock'),
+            os.O_RDWR | os.O_CREAT, 0o600
+        )
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(descriptor)
+            continue
+        try:
+            yield
+        finally:
+            # закрытие файла снимает блокировку
+            os.close(descriptor)
+        return
+    raise Throttled(
+        wait=settings.PASSWORD_CHECK_RETRY_AFTER, detail=PASSWORD_CHECK_BUSY
+    )
@@ -1,7 +1,7 @@
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 
 from users.models import User
+from users.passwords import password_check_slot, verify_password
 
 
 class EmailPasswordSerializer(serializers.Serializer):
@@ -9,15 +9,25 @@ class EmailPasswordSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
     def validate(self, data):
-        is_user_exists = User.objects.filter(email=data.get('email')).exists()
-        if not is_user_exists:
+        # пользователь и его токен выбираются одним запросом:
+        user = User.objects.select_related('auth_token').filter(
+            email=data.get('email')
+        ).first()
+        if user is None:
             raise serializers.ValidationError({
                 'email': 'Неверно указан адрес электронной почты.'
             })
-        user = get_object_or_404(User, email=data.get('email'))
-        if not user.check_password(data.get('password')):
+        with password_check_slot():
+            is_correct, new_password = verify_password(
+                data.get('password'), user.password
+            )
+        if not is_correct:
             raise serializers.ValidationError({
                 'password': 'Пароль неправильный.'
             })
+        if new_password is not None:
+            # хеш пароля обновляется до текущих параметров хеширования
+            user.password = new_password
+            user.save(update_fields=['password'])
         data['user'] = user
         return data
@@ -0,0 +1,24 @@
+from functools import partial
+
+from django.db.models.signals import post_delete, post_save
+from django.db.transaction import on_commit
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.authentication import token_cache
+from users.models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    on_commit(partial(token_cache.invalidate_key, instance.key))
+    # отзыв виден процессам, закешировавшим токен (users.authentication)
+    on_commit(partial(token_cache.invalidate_user, instance.user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    # закешированный пользователь устарел: мог измениться пароль
+    # (set_password), is_active или права
+    on_commit(partial(token_cache.invalidate_user, instance.pk))
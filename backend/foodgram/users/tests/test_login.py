@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.tests.utils import PASSWORD, create_user
+from users.passwords import password_check_slot
+
+LOGIN_PATH = '/api/auth/token/login/'
+
+
+class LoginTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+
+    def login(self, password=PASSWORD):
+        return APIClient().post(
+            LOGIN_PATH, {'email': self.user.email, 'password': password}
+        )
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        # повторный вход возвращает тот же токен
+        self.assertEqual(
+            self.login().data['auth_token'], response.data['auth_token']
+        )
+
+    def test_wrong_password(self):
+        response = self.login('wrong')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.data)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.SHA1PasswordHasher',
+    ])
+    def test_outdated_hash_upgraded(self):
+        self.user.password = make_password(PASSWORD, hasher='sha1')
+        self.user.save(update_fields=['password'])
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+
+class PasswordCheckLimitTest(LoginTest):
+    """Одновременно проверяется не больше PASSWORD_CHECK_CONCURRENCY
+    паролей; остальные запросы сразу получают ответ 429.
+    """
+
+    def setUp(self):
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir, ignore_errors=True)
+        limit_settings = override_settings(
+            PASSWORD_CHECK_CONCURRENCY=1, PASSWORD_CHECK_LOCK_DIR=lock_dir,
+            PASSWORD_CHECK_RETRY_AFTER=2
+        )
+        limit_settings.enable()
+        self.addCleanup(limit_settings.disable)
+
+    def test_busy(self):
+        # место занято другой проверкой (в другом процессе блокировка
+        # файла действует так же)
+        with password_check_slot():
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        # после освобождения места вход снова возможен
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(PASSWORD_CHECK_CONCURRENCY=2)
+    def test_free_slot(self):
+        with password_check_slot():
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_slot_released_after_error(self):
+        self.assertEqual(self.login('wrong').status_code, 400)
+        self.assertEqual(self.login().status_code, 200)
@@ -0,0 +1,90 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from api.tests.utils import create_user
+from users.authentication import (CachedTokenAuthentication, get_revoked_key,
+                                  token_cache)
+
+ME_PATH = '/api/users/me/'
+LOGOUT_PATH = '/api/auth/token/logout/'
+
+
+@override_settings(TOKEN_CACHE_SIZE=2, TOKEN_CACHE_TTL=10)
+class TokenCacheTest(TestCase):
+    """Кеш проверенных токенов: вытеснение, срок действия записей и
+    отзыв токенов при выходе.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tokens = [
+            Token.objects.create(user=create_user(number))
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self, token, queries):
+        with self.assertNumQueries(queries):
+            user, _ = self.authentication.authenticate_credentials(token.key)
+        self.assertEqual(user.pk, token.user_id)
+
+    def test_eviction(self):
+        first, second, third = self.tokens
+        self.authenticate(first, 1)
+        self.authenticate(second, 1)
+        # first использован позже second: вытесняется second
+        self.authenticate(first, 0)
+        self.authenticate(third, 1)
+        self.assertEqual(token_cache.get_stats()['size'], 2)
+        self.authenticate(first, 0)
+        self.authenticate(second, 1)
+
+    def test_expiry(self):
+        token = self.tokens[0]
+        with mock.patch('users.authentication.time') as clock:
+            clock.time.return_value = time.time()
+            clock.monotonic.return_value = 100
+            self.authenticate(token, 1)
+            clock.monotonic.return_value = 109
+            self.authenticate(token, 0)
+            clock.monotonic.return_value = 110
+            self.authenticate(token, 1)
+
+    def test_logout(self):
+        token = self.tokens[0]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(client.get(ME_PATH).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post(LOGOUT_PATH).status_code, 200)
+        self.assertEqual(client.get(ME_PATH).status_code, 401)
+
+    def test_revoked_in_other_process(self):
+        token = self.tokens[0]
+        self.authenticate(token, 1)
+        invalidations = token_cache.get_stats()['invalidations']
+        # выход в другом процессе: токен удалён из базы, в общем кеше
+        # отмечено время отзыва, запись этого процесса осталась
+        Token.objects.filter(pk=token.pk).delete()
+        cache.set(get_revoked_key(token.user_id), time.time())
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(token.key)
+        self.assertEqual(
+            token_cache.get_stats()['invalidations'], invalidations + 1
+        )
+
+    def test_checked_after_revocation(self):
+        token = self.tokens[0]
+        cache.set(get_revoked_key(token.user_id), time.time() - 1)
+        self.authenticate(token, 1)
+        self.authenticate(token, 0)
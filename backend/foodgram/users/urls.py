@@ -1,8 +1,13 @@
 from django.urls import path
 
-from users.views import login, logout
+from users.views import login, logout, token_cache_stats
 
 urlpatterns = [
     path('auth/token/login/', login, name='login'),
-    path('auth/token/logout/', logout, name='logout')
+    path('auth/token/logout/', logout, name='logout'),
+    path(
+        'auth/token/cache_stats/',
+        token_cache_stats,
+        name='token_cache_stats'
+    ),
 ]
@@ -1,9 +1,10 @@
 from django.shortcuts import get_object_or_404
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from users.authentication import token_cache
 from users.permissions import UserPermissions
 from users.serializers import EmailPasswordSerializer
 
@@ -16,7 +17,11 @@ def login(request):
     )
     serializer.is_valid(raise_exception=True)
     user = serializer.validated_data.get('user')
-    token, created = Token.objects.get_or_create(user=user)
+    try:
+        # токен выбран вместе с пользователем (EmailPasswordSerializer)
+        token = user.auth_token
+    except Token.DoesNotExist:
+        token, created = Token.objects.get_or_create(user=user)
     return Response({'auth_token': token.key})
 
 
@@ -26,3 +31,10 @@ def logout(request):
     token = get_object_or_404(Token, user=request.user)
     token.delete()
     return Response()
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def token_cache_stats(request):
+    # статистика процесса, обработавшего запрос
+    return Response(token_cache.get_stats())